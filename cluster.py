@@ -0,0 +1,525 @@
+#!/usr/bin/env python3
+"""
+cluster.py  ―  複数ノードの Burn-in を 1 台から同時に動かす (コーディネーター + エージェント)
+  ・各ノードで agent を起動しておき、コーディネーターに TCP で接続させる
+  ・コーディネーターは時計のずれを測ってから全ノードに同じ開始時刻を配り、開始・ランプ・停止を揃える
+  ・エージェントは BurnInOrchestrator で負荷をかけ、テレメトリをまとめて送り返す
+  ・実行中は全ノードの一覧を表示し、最後にノードごとの合否を JSON レポートにまとめる
+
+プロトコル: TCP 上の改行区切り JSON (1 行 1 メッセージ、"type" で種類を表す)
+  agent → coord : hello {node, host, cpus} / pong {t0, t_agent} / ready / telemetry {samples}
+                  log {msg} / result {report} / error {msg}
+  coord → agent : ping {t0} / prepare {profile, ramp} / start {at} / set {levels} / stop
+
+例 (localhost で 3 ノード):
+  python cluster.py coordinator --nodes 3 --duration 30 --cpu 40 --ramp 10:60,20:20 --report cluster.json
+  python cluster.py agent --connect 127.0.0.1:7400 --name node1   (これを 3 つ)
+"""
+
+import argparse
+import importlib
+import json
+import os
+import socket
+import sys
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+
+try:
+    from lin_bench.orchestrator import BurnInOrchestrator, BurnInProfile, LIVE_LEVELS, STRESS_PRESETS, load_profile
+except ImportError:
+    from orchestrator import BurnInOrchestrator, BurnInProfile, LIVE_LEVELS, STRESS_PRESETS, load_profile
+try:
+    from system_info.telemetry import RingBuffer, get_sampler
+except ImportError:
+    from telemetry import RingBuffer, get_sampler
+
+DEFAULT_PORT = 7400
+PING_COUNT = 5
+TELEMETRY_SEC = 1.0         # エージェントのサンプリング周期
+BATCH_SEC = 5.0             # まとめて送る周期
+EXIT_PASS, EXIT_FAIL, EXIT_ERROR = 0, 1, 2
+
+
+# ────────────────────────────────────────────────────────────
+# 通信 (改行区切り JSON)
+# ────────────────────────────────────────────────────────────
+class Connection:
+    """送信はロックで直列化 (複数スレッドから send してよい)。受信は 1 スレッドで messages() を回す"""
+
+    def __init__(self, sock: socket.socket):
+        self.sock = sock
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._lock = threading.Lock()
+        self._reader = sock.makefile("r", encoding="utf-8")
+
+    def send(self, msg_type: str, **payload):
+        data = (json.dumps({"type": msg_type, **payload}, default=str) + "\n").encode()
+        with self._lock:
+            self.sock.sendall(data)
+
+    def messages(self):
+        for line in self._reader:
+            if line.strip():
+                yield json.loads(line)
+
+    def close(self):
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+
+
+def parse_ramp(spec: str | None) -> list[tuple[float, dict]]:
+    """
+    '10:60,20:20' → 開始 10 秒後に 60%、20 秒後に 20% (プロファイルで有効な cpu / gpu の両方)。
+    '10:cpu=60:gpu=30' のように個別指定も可 (0% で始まる負荷もランプで立ち上げられる)。
+    """
+    steps = []
+    for item in (spec or "").split(","):
+        if not item.strip():
+            continue
+        t, *levels = item.split(":")
+        values = {}
+        for lv in levels:
+            name, _, pct = lv.rpartition("=")
+            name = name or "all"
+            if name not in LIVE_LEVELS + ("all",):
+                raise ValueError(f"cannot ramp {name!r} (choose from {', '.join(LIVE_LEVELS)})")
+            values[name] = float(pct)
+        steps.append((float(t), values))
+    return sorted(steps, key=lambda s: s[0])
+
+
+# ────────────────────────────────────────────────────────────
+# エージェント (各ノード)
+# ────────────────────────────────────────────────────────────
+class Agent:
+    def __init__(self, host: str, port: int = DEFAULT_PORT, name: str | None = None):
+        self.host = host
+        self.port = port
+        self.name = name or socket.gethostname()
+        self.conn = None
+        self.orch = None
+        self.ramp = []
+        self.sampler = None
+
+    def serve_forever(self):
+        """接続が切れたら張り直して次の指示を待つ"""
+        backoff = 1.0
+        while True:
+            try:
+                self.conn = Connection(socket.create_connection((self.host, self.port), timeout=10))
+                self.conn.sock.settimeout(None)
+            except OSError as e:
+                print(f"[WARN] Cannot reach coordinator {self.host}:{self.port} ({e}), retrying in {backoff:g} s")
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+                continue
+            backoff = 1.0
+            print(f"[INFO] Connected to coordinator {self.host}:{self.port} as {self.name}")
+            try:
+                self.serve(self.conn)
+            except (OSError, ValueError) as e:
+                print(f"[WARN] Connection lost: {e}")
+            if self.orch is not None and not self.orch.done.is_set():
+                print("[INFO] Coordinator gone, stopping local burn-in")
+                self.orch.stop()
+            self.conn.close()
+            time.sleep(1.0)
+
+    def serve(self, conn: Connection):
+        conn.send("hello", node=self.name, host=socket.gethostname(), cpus=os.cpu_count())
+        for msg in conn.messages():
+            kind = msg["type"]
+            if kind == "ping":
+                conn.send("pong", t0=msg["t0"], t_agent=time.time())
+            elif kind == "prepare":
+                self._prepare(msg)
+            elif kind == "start":
+                threading.Thread(target=self._start_at, args=(msg["at"],), daemon=True).start()
+            elif kind == "set" and self.orch is not None:
+                enabled = [n for n in LIVE_LEVELS if n in self.orch.live or getattr(self.orch.profile, n) > 0]
+                for name, pct in self._expand(msg["levels"], enabled).items():
+                    self.orch.set_level(name, pct)
+            elif kind == "stop" and self.orch is not None:
+                threading.Thread(target=self.orch.stop, daemon=True).start()
+
+    def _log(self, message: str):
+        print(message, flush=True)
+        try:
+            self.conn.send("log", msg=message)
+        except OSError:
+            pass
+
+    def _prepare(self, msg):
+        try:
+            profile = BurnInProfile.from_dict(msg["profile"])
+        except (TypeError, ValueError) as e:
+            self.conn.send("error", msg=f"invalid profile: {e}")
+            return
+        enabled = [name for name in LIVE_LEVELS if getattr(profile, name) > 0]
+        self.ramp = [(t, self._expand(levels, enabled)) for t, levels in msg.get("ramp", [])]
+        live = {name for _, levels in self.ramp for name in levels}
+        # 重いバックエンドは開始時刻の前に読み込んでおく (開始がずれないように)
+        if profile.gpu > 0 or profile.vram > 0 or "gpu" in live:
+            try:
+                from startup import cuda_device_ids
+                if cuda_device_ids():
+                    try:
+                        importlib.import_module("gpu_load.gpu_load")
+                    except ImportError:
+                        importlib.import_module("gpu_load")
+            except ImportError as e:
+                self._log(f"[WARN] GPU backend unavailable: {e}")
+        self.sampler = get_sampler(TELEMETRY_SEC)
+        self.orch = BurnInOrchestrator(profile, log=self._log, on_finish=self._finished,
+                                       sampler=self.sampler, live=live)
+        self.conn.send("ready")
+
+    @staticmethod
+    def _expand(levels: dict, enabled: list[str]) -> dict:
+        """"all" をプロファイルで有効な負荷に展開する"""
+        levels = dict(levels)
+        pct = levels.pop("all", None)
+        if pct is not None:
+            for name in enabled:
+                levels.setdefault(name, pct)
+        return levels
+
+    def _start_at(self, at: float):
+        delay = at - time.time()
+        if delay > 0:
+            time.sleep(delay)
+        self.orch.start()
+        threading.Thread(target=self._telemetry_loop, args=(self.orch,), daemon=True).start()
+        for t, levels in self.ramp:
+            if self.orch.stop_event.wait(max(0.0, at + t - time.time())):
+                return
+            for name, pct in levels.items():
+                self.orch.set_level(name, pct)
+
+    def _telemetry_loop(self, orch: BurnInOrchestrator):
+        batch, last_send = [], time.time()
+        while not orch.done.wait(TELEMETRY_SEC):
+            snap = self.sampler.latest()
+            batch.append({
+                "t": time.time(),
+                "cpu": snap.get("cpu", {}).get("percent"),
+                "mem": snap.get("memory", {}).get("percent"),
+                "gpu_w": self.sampler.gpu_power_total(),
+                "cpu_target": orch.levels["cpu"].value,
+                "gpu_target": orch.levels["gpu"].value,
+            })
+            if time.time() - last_send >= BATCH_SEC:
+                self._send_batch(batch)
+                batch, last_send = [], time.time()
+        self._send_batch(batch)
+
+    def _send_batch(self, batch):
+        if batch:
+            try:
+                self.conn.send("telemetry", samples=batch)
+            except OSError:
+                pass
+
+    def _finished(self, report):
+        try:
+            self.conn.send("result", report=report)
+        except OSError:
+            pass
+
+
+# ────────────────────────────────────────────────────────────
+# コーディネーター (操作端末)
+# ────────────────────────────────────────────────────────────
+@dataclass
+class NodeState:
+    name: str
+    addr: str
+    cpus: int | None = None
+    state: str = "connected"        # connected → ready → running → done / lost / error
+    offset: float = 0.0             # エージェント時計 − コーディネーター時計 [s]
+    rtt: float | None = None
+    latest: dict = field(default_factory=dict)
+    report: dict | None = None
+    error: str | None = None
+    telemetry: RingBuffer = field(default_factory=lambda: RingBuffer(3600), repr=False)
+    conn: Connection | None = field(default=None, repr=False)
+    _pongs: list = field(default_factory=list, repr=False)
+
+
+class Coordinator:
+    """
+    coord = Coordinator(port=7400).listen()
+    coord.wait_for_agents(40)
+    report = coord.run(profile, ramp=parse_ramp("60:80"))
+    """
+
+    def __init__(self, host: str = "0.0.0.0", port: int = DEFAULT_PORT, log=print):
+        self.host = host
+        self.port = port
+        self.log = log
+        self.nodes: dict[str, NodeState] = {}
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self.server = None
+
+    def listen(self):
+        self.server = socket.create_server((self.host, self.port), reuse_port=False)
+        self.port = self.server.getsockname()[1]
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+        self.log(f"[INFO] Coordinator listening on {self.host}:{self.port}")
+        return self
+
+    def close(self):
+        if self.server:
+            self.server.close()
+        for node in list(self.nodes.values()):
+            if node.conn:
+                node.conn.close()
+
+    def _accept_loop(self):
+        while True:
+            try:
+                sock, addr = self.server.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._handle, args=(Connection(sock), f"{addr[0]}:{addr[1]}"),
+                             daemon=True).start()
+
+    def _handle(self, conn: Connection, addr: str):
+        node = None
+        try:
+            for msg in conn.messages():
+                kind = msg["type"]
+                if kind == "hello":
+                    node = self._register(msg, addr, conn)
+                    continue
+                if node is None:
+                    continue
+                with self._changed:
+                    if kind == "pong":
+                        now = time.time()
+                        node._pongs.append((now - msg["t0"], msg["t_agent"] - (msg["t0"] + now) / 2))
+                    elif kind == "ready":
+                        node.state = "ready"
+                    elif kind == "telemetry":
+                        for sample in msg["samples"]:
+                            node.telemetry.append(sample)
+                        node.latest = msg["samples"][-1]
+                    elif kind == "result":
+                        node.report = msg["report"]
+                        node.state = "done"
+                    elif kind == "error":
+                        node.error, node.state = msg["msg"], "error"
+                    self._changed.notify_all()
+                if kind == "log":
+                    self.log(f"[{node.name}] {msg['msg']}")
+                elif kind == "error":
+                    self.log(f"[ERROR] {node.name}: {msg['msg']}")
+        except (OSError, ValueError):
+            pass
+        if node is not None:
+            with self._changed:
+                if node.state not in ("done", "error"):
+                    node.state = "lost"
+                    self.log(f"[WARN] Lost connection to {node.name}")
+                self._changed.notify_all()
+
+    def _register(self, msg, addr, conn) -> NodeState:
+        with self._changed:
+            name, k = msg["node"], 2
+            while name in self.nodes and self.nodes[name].state not in ("lost", "done", "error"):
+                name, k = f"{msg['node']}#{k}", k + 1     # localhost で同名のエージェントを区別
+            node = NodeState(name=name, addr=addr, cpus=msg.get("cpus"), conn=conn)
+            self.nodes[name] = node
+            self._changed.notify_all()
+        self.log(f"[INFO] Agent {name} connected from {addr} ({node.cpus} CPUs)")
+        return node
+
+    def _wait(self, predicate, timeout: float) -> bool:
+        with self._changed:
+            return self._changed.wait_for(predicate, timeout)
+
+    def _active(self) -> list[NodeState]:
+        return [n for n in self.nodes.values() if n.state not in ("lost", "error")]
+
+    def wait_for_agents(self, count: int, timeout: float = 300.0) -> bool:
+        return self._wait(lambda: len(self._active()) >= count, timeout)
+
+    def _broadcast(self, msg_type: str, nodes=None, **payload):
+        for node in self._active() if nodes is None else nodes:
+            try:
+                node.conn.send(msg_type, **payload)
+            except OSError:
+                node.state = "lost"
+
+    def sync_clocks(self, nodes):
+        """ping を PING_COUNT 回送り、RTT 最小の往復から時計のずれを求める"""
+        for node in nodes:
+            node._pongs = []
+        for _ in range(PING_COUNT):
+            self._broadcast("ping", nodes, t0=time.time())
+            time.sleep(0.05)
+        self._wait(lambda: all(len(n._pongs) >= PING_COUNT or n.state == "lost" for n in nodes), 5.0)
+        for node in nodes:
+            if node._pongs:
+                node.rtt, node.offset = min(node._pongs)
+
+    def set_levels(self, **levels):
+        """全ノードの負荷率を即時変更 (例: coord.set_levels(cpu=80) / coord.set_levels(all=50))"""
+        self._broadcast("set", [n for n in self._active() if n.state == "running"], levels=levels)
+
+    def stop(self):
+        self._broadcast("stop", [n for n in self._active() if n.state == "running"])
+
+    def run(self, profile: BurnInProfile, ramp=(), start_delay: float = 3.0,
+            ready_timeout: float = 120.0, live_view=None, view_sec: float = 2.0) -> dict:
+        nodes = self._active()
+        for node in nodes:
+            node.report, node.state = None, "connected"
+        self._broadcast("prepare", nodes, profile=asdict(profile), ramp=list(ramp))
+        if not self._wait(lambda: all(n.state != "connected" for n in nodes), ready_timeout):
+            for n in nodes:
+                if n.state == "connected":
+                    n.state, n.error = "error", "not ready in time"
+        nodes = [n for n in nodes if n.state == "ready"]
+        self.sync_clocks(nodes)
+        start_at = time.time() + start_delay
+        for node in nodes:
+            node.state = "running"
+            self._broadcast("start", [node], at=start_at + node.offset)
+        self.log(f"[INFO] Burn-in on {len(nodes)} nodes starts in {start_delay:g} s "
+                 f"(max clock offset {max((abs(n.offset) for n in nodes), default=0) * 1000:.1f} ms)")
+
+        deadline = start_at + profile.duration + 60.0
+        finished = lambda: all(n.state in ("done", "lost", "error") for n in nodes)
+        while not self._wait(finished, view_sec):
+            if live_view:
+                live_view(self)
+            if time.time() > deadline:
+                self.log("[WARN] Timed out waiting for node results")
+                break
+        return self.report()
+
+    def report(self) -> dict:
+        per_node = {}
+        for name, node in self.nodes.items():
+            passed = node.state == "done" and bool(node.report and node.report.get("passed"))
+            per_node[name] = {
+                "addr": node.addr, "state": node.state, "passed": passed, "error": node.error,
+                "offset_ms": node.offset * 1000, "rtt_ms": node.rtt * 1000 if node.rtt is not None else None,
+                "results": node.report.get("results") if node.report else None,
+                "telemetry": node.telemetry.snapshot(),
+            }
+        return {"nodes": per_node, "passed": bool(per_node) and all(n["passed"] for n in per_node.values())}
+
+    def status_table(self) -> str:
+        """全ノードの一覧 (ライブ表示用)"""
+        def fmt(v, spec=".1f"):
+            return "-" if v is None else format(v, spec)
+        lines = [f"{'node':16s} {'state':9s} {'cpu%':>6s} {'target':>6s} {'mem%':>6s} {'gpu W':>7s}"]
+        for name, node in sorted(self.nodes.items()):
+            t = node.latest
+            lines.append(f"{name:16s} {node.state:9s} {fmt(t.get('cpu')):>6s} {fmt(t.get('cpu_target'), 'g'):>6s} "
+                         f"{fmt(t.get('mem')):>6s} {fmt(t.get('gpu_w')):>7s}")
+        return "\n".join(lines)
+
+
+# ────────────────────────────────────────────────────────────
+# コマンドライン
+# ────────────────────────────────────────────────────────────
+def _host_port(text: str) -> tuple[str, int]:
+    host, _, port = text.rpartition(":")
+    return host or "127.0.0.1", int(port or DEFAULT_PORT)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Multi-host burn-in (coordinator / agent)")
+    sub = parser.add_subparsers(dest="role", required=True)
+
+    agent = sub.add_parser("agent", help="run on each node under test")
+    agent.add_argument("--connect", default=f"127.0.0.1:{DEFAULT_PORT}", help="coordinator host:port")
+    agent.add_argument("--name", help="node name (default: hostname)")
+
+    coord = sub.add_parser("coordinator", help="run on the operator machine")
+    coord.add_argument("--bind", default=f"0.0.0.0:{DEFAULT_PORT}", help="listen host:port")
+    coord.add_argument("--nodes", type=int, required=True, help="number of agents to wait for")
+    coord.add_argument("--wait", type=float, default=300.0, help="seconds to wait for agents")
+    coord.add_argument("--profile", help="JSON profile (BurnInProfile fields)")
+    coord.add_argument("--stress", choices=list(STRESS_PRESETS), help="GUI stress preset for CPU/GPU/VRAM")
+    coord.add_argument("--duration", type=int, help="test duration in seconds")
+    coord.add_argument("--cpu", type=int, help="CPU load %%")
+    coord.add_argument("--gpu", type=int, help="GPU load %%")
+    coord.add_argument("--kernel", help="CPU kernel (see cpu_kernels.KERNELS)")
+    coord.add_argument("--workload", help="GPU tensor workload (see gpu_kernels.WORKLOADS)")
+    coord.add_argument("--gpu-mode", choices=["eager", "graph"], help="graph: replay CUDA graphs on several streams")
+    coord.add_argument("--gpu-processes", action="store_true", default=None,
+                       help="run each GPU's load in its own worker process")
+    coord.add_argument("--vram", type=int, help="VRAM load %%")
+    coord.add_argument("--vram-verify", action="store_true", default=None,
+                       help="write and verify test patterns in the VRAM load")
+    coord.add_argument("--storage", action="store_true", default=None, help="run the storage test")
+    coord.add_argument("--ramp", help="level changes after start, e.g. 60:80,120:cpu=30:gpu=50")
+    coord.add_argument("--start-delay", type=float, default=3.0, help="seconds between barrier and start")
+    coord.add_argument("--report", help="write the combined JSON report to this path")
+    args = parser.parse_args(argv)
+
+    if args.role == "agent":
+        host, port = _host_port(args.connect)
+        try:
+            Agent(host, port, args.name).serve_forever()
+        except KeyboardInterrupt:
+            pass
+        return EXIT_PASS
+
+    try:
+        data = vars(load_profile(args.profile)) if args.profile else {}
+        if args.stress:
+            level = STRESS_PRESETS[args.stress]
+            data.update({"cpu": level, "gpu": level, "vram": level})
+        for arg, name in (("duration", "duration"), ("cpu", "cpu"), ("gpu", "gpu"),
+                          ("kernel", "cpu_kernel"), ("workload", "gpu_workload"),
+                          ("gpu_mode", "gpu_mode"), ("gpu_processes", "gpu_processes"),
+                          ("vram", "vram"), ("vram_verify", "vram_verify"), ("storage", "storage")):
+            if getattr(args, arg) is not None:
+                data[name] = getattr(args, arg)
+        profile = BurnInProfile.from_dict(data)
+        ramp = parse_ramp(args.ramp)
+    except (OSError, ValueError, TypeError) as e:
+        print(f"[ERROR] Invalid profile: {e}", file=sys.stderr)
+        return EXIT_ERROR
+
+    host, port = _host_port(args.bind)
+    coordinator = Coordinator(host, port).listen()
+    try:
+        if not coordinator.wait_for_agents(args.nodes, args.wait):
+            print(f"[ERROR] Only {len(coordinator._active())} of {args.nodes} agents connected", file=sys.stderr)
+            return EXIT_ERROR
+        try:
+            report = coordinator.run(profile, ramp, args.start_delay,
+                                     live_view=lambda c: print(c.status_table() + "\n", flush=True))
+        except KeyboardInterrupt:
+            print("[INFO] Interrupted, stopping all nodes...")
+            coordinator.stop()
+            coordinator._wait(lambda: all(n.state != "running" for n in coordinator.nodes.values()), 30)
+            report = coordinator.report()
+    finally:
+        coordinator.close()
+
+    print(coordinator.status_table())
+    for name, node in sorted(report["nodes"].items()):
+        print(f"  {name:16s} {'PASS' if node['passed'] else 'FAIL'}"
+              + (f"  ({node['error']})" if node["error"] else ""))
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2, default=str)
+        print(f"[INFO] Report written to {args.report}")
+    return EXIT_PASS if report["passed"] else EXIT_FAIL
+
+
+if __name__ == "__main__":
+    sys.exit(main())
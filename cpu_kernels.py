@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+cpu_kernels.py  ―  CPU 負荷カーネル集 (apply_cpu_load の busy 区間で回す)
+  ・spin   : perf_counter の空回し (従来動作)
+  ・gemm   : NumPy/BLAS 行列積 (AVX/FMA)            → GFLOP/s
+  ・triad  : STREAM triad a = b + s*c (メモリ帯域)  → GB/s
+  ・chase  : 1 本の依存チェーンのポインタ追跡 (メモリレイテンシ) → M アクセス/s
+  ・hash   : splitmix64 整数ハッシュ (整数 ALU)      → G ハッシュ/s (帯域ではないので GB/s と比べない)
+各カーネルは 1 ステップが数 ms 以内になるサイズで回し、busy 時間を守る。
+BLAS のスレッド数は threadpoolctl があれば実行時に 1 本へ絞る (無ければ環境変数のみ)。
+"""
+
+import os
+import sys
+import time
+
+try:
+    from threadpoolctl import threadpool_limits
+except ImportError:
+    threadpool_limits = None
+
+MEMINFO = "/proc/meminfo"
+CHASE_MAX_BYTES = 64 << 20       # ポインタ追跡表の上限 (LLC より十分大きく、初期化は数秒以内)
+CHASE_MIN_BYTES = 4 << 20
+CHASE_MEM_SHARE = 0.25           # 空きメモリのうち全ワーカーの追跡表に使ってよい割合
+
+KERNELS = {
+    "spin":  "busy-wait on perf_counter (no work accounting)",
+    "gemm":  "NumPy GEMM, FPU/AVX/FMA bound",
+    "triad": "STREAM triad, memory-bandwidth bound",
+    "chase": "random pointer chase, cache/TLB thrashing",
+    "hash":  "splitmix64 integer hashing, integer ALU bound",
+}
+
+
+class SpinKernel:
+    name = "spin"
+    unit = ""
+    scale = 1e9                   # 仕事量 → unit への換算
+
+    def step(self) -> float:
+        return 0.0
+
+    def run(self, budget: float, evt=None) -> float:
+        """budget 秒だけ step() を回し、こなした仕事量 (FLOP または byte) を返す"""
+        work = 0.0
+        deadline = time.perf_counter() + budget
+        while time.perf_counter() < deadline and not (evt is not None and evt.is_set()):
+            work += self.step()
+        return work
+
+
+class GemmKernel(SpinKernel):
+    name = "gemm"
+    unit = "GFLOP/s"
+
+    def __init__(self, n: int = 384):
+        import numpy as np
+        rng = np.random.default_rng(0)
+        self.a = rng.random((n, n), dtype=np.float32)
+        self.b = rng.random((n, n), dtype=np.float32)
+        self.c = np.empty((n, n), dtype=np.float32)
+        self.flops = 2.0 * n ** 3
+
+    def step(self) -> float:
+        import numpy as np
+        np.matmul(self.a, self.b, out=self.c)
+        return self.flops
+
+
+class TriadKernel(SpinKernel):
+    name = "triad"
+    unit = "GB/s"
+
+    def __init__(self, n: int = 1 << 22, chunk: int = 1 << 18):
+        import numpy as np
+        self.a = np.zeros(n)
+        self.b = np.ones(n)
+        self.c = np.full(n, 2.0)
+        self.tmp = np.empty(chunk)
+        self.chunk = chunk
+        self.pos = 0
+
+    def step(self) -> float:
+        import numpy as np
+        i, j = self.pos, self.pos + self.chunk
+        np.multiply(self.c[i:j], 3.0, out=self.tmp)
+        np.add(self.b[i:j], self.tmp, out=self.a[i:j])
+        self.pos = 0 if j >= len(self.a) else j
+        return 24.0 * self.chunk          # STREAM の数え方: 読み 2 + 書き 1 (float64)
+
+
+class ChaseKernel(SpinKernel):
+    name = "chase"
+    unit = "Maccess/s"
+    scale = 1e6
+
+    def __init__(self, n: int | None = None, workers: int = 1, hops: int = 4096):
+        import numpy as np
+        if n is None:
+            n = chase_entries(workers)
+        # 1 周の巡回置換 (Sattolo 相当) にして短いループに落ちないようにする。
+        # 作業用の順列も int32 にして、確保のピークを表 2 本分に抑える
+        order = np.arange(n, dtype=np.int32)
+        np.random.default_rng(0).shuffle(order)
+        self.table = np.empty(n, dtype=np.int32)
+        self.table[order[:-1]] = order[1:]
+        self.table[order[-1]] = order[0]
+        del order
+        self.links = memoryview(self.table)
+        self.pos = 0
+        self.hops = hops
+
+    def step(self) -> float:
+        # 次の読み出し先は直前に読んだ値で決まるので、アクセスは 1 本ずつ直列になる
+        links, pos = self.links, self.pos
+        for _ in range(self.hops):
+            pos = links[pos]
+        self.pos = pos
+        return float(self.hops)
+
+
+def available_memory() -> int | None:
+    """/proc/meminfo の MemAvailable (byte)。読めなければ None"""
+    try:
+        with open(MEMINFO) as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def chase_entries(workers: int = 1) -> int:
+    """ワーカー 1 本あたりのポインタ追跡表の要素数 (int32)。空きメモリを workers で分ける"""
+    budget = CHASE_MAX_BYTES
+    free = available_memory()
+    if free is not None:
+        # 初期化中は表と順列の 2 本分を確保する
+        budget = min(budget, int(free * CHASE_MEM_SHARE / max(1, workers) / 2))
+    return max(CHASE_MIN_BYTES, budget) // 4
+
+
+class HashKernel(SpinKernel):
+    name = "hash"
+    unit = "Ghash/s"
+
+    def __init__(self, n: int = 1 << 16):
+        import numpy as np
+        self.x = np.arange(n, dtype=np.uint64)
+        self.tmp = np.empty(n, dtype=np.uint64)
+        self.c0 = np.uint64(0x9E3779B97F4A7C15)
+        self.c1 = np.uint64(0xBF58476D1CE4E5B9)
+        self.c2 = np.uint64(0x94D049BB133111EB)
+
+    def step(self) -> float:
+        import numpy as np
+        x, t = self.x, self.tmp
+        with np.errstate(over="ignore"):
+            np.add(x, self.c0, out=x)
+            np.right_shift(x, np.uint64(30), out=t); np.bitwise_xor(x, t, out=x)
+            np.multiply(x, self.c1, out=x)
+            np.right_shift(x, np.uint64(27), out=t); np.bitwise_xor(x, t, out=x)
+            np.multiply(x, self.c2, out=x)
+            np.right_shift(x, np.uint64(31), out=t); np.bitwise_xor(x, t, out=x)
+        return float(len(x))              # 1 要素 = 1 ハッシュ
+
+
+_CLASSES = {k.name: k for k in (SpinKernel, GemmKernel, TriadKernel, ChaseKernel, HashKernel)}
+
+
+def make_kernel(name: str = "spin", workers: int = 1):
+    """
+    ワーカープロセス内で呼ぶこと。BLAS のスレッドを 1 本に絞る。
+    親で NumPy が読み込まれていると環境変数は効かないので、threadpoolctl で実行時に絞る。
+    workers は同時に動くワーカー数 (chase の表の大きさを空きメモリから決めるのに使う)。
+    """
+    if name not in _CLASSES:
+        raise ValueError(f"unknown CPU kernel: {name!r} (choose from {', '.join(KERNELS)})")
+    if name == "spin":
+        return SpinKernel()
+    if threadpool_limits is not None:
+        threadpool_limits(1)
+    elif "numpy" in sys.modules:
+        print("[WARN] threadpoolctl not installed; BLAS may use several threads per CPU-load worker")
+    for var in ("OPENBLAS_NUM_THREADS", "OMP_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ.setdefault(var, "1")
+    if name == "chase":
+        return ChaseKernel(workers=workers)
+    return _CLASSES[name]()
+
+
+def unit_of(name: str) -> str:
+    return _CLASSES[name].unit if name in _CLASSES else ""
+
+
+def scale_of(name: str) -> float:
+    return _CLASSES[name].scale if name in _CLASSES else 1e9
+
+
+if __name__ == "__main__":
+    for name in KERNELS:
+        k = make_kernel(name)
+        t0 = time.perf_counter()
+        work = k.run(1.0)
+        dt = time.perf_counter() - t0
+        rate = f"{work / dt / k.scale:.2f} {k.unit}" if k.unit else "-"
+        print(f"{name:6s} {rate:>14s}   {KERNELS[name]}")
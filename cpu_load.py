@@ -3,17 +3,209 @@
 cpu_load.py  ―  Burn-in／単独負荷用　CPU ストレステスト
   ・multiprocessing.Event で停止シグナルを安全に共有
   ・優先度を下げて OS 応答性を確保
+  ・/proc/stat のコア別差分を PI 制御して指定負荷率を維持
+  ・placement 指定でトポロジーに沿ってワーカーをコア固定 (cpu_topology.py)
+  ・kernel 指定で busy 区間に NumPy 負荷カーネルを回す (cpu_kernels.py)
 """
 
 import os
+import queue
+import signal
 import subprocess
+import sys
 import time
-from multiprocessing import Event, Process, cpu_count
+from collections import deque
+from multiprocessing import Event, Process, Queue, Value, cpu_count
+
+try:
+    from cpu_load.cpu_kernels import KERNELS, make_kernel, scale_of, unit_of
+    from cpu_load.cpu_topology import pin_current_process, placement_cpus
+except ImportError:
+    from cpu_kernels import KERNELS, make_kernel, scale_of, unit_of
+    from cpu_topology import pin_current_process, placement_cpus
+
+PROC_STAT = "/proc/stat"
+SLICE_SEC = 0.1          # 100 ms スライス
+REPORT_SEC = 1.0         # 誤差レポート間隔
+DEFAULT_TOLERANCE = 2.0  # 許容誤差 (±%)
+SETTLE_SEC = 2.0         # 目標変更後、誤差を評価しない時間 (0.5 s の計測窓 + レポート間隔)
+
+
+# ────────────────────────────────────────────────────────────
+# 0) /proc/stat 計測 ＋ PI 制御
+# ────────────────────────────────────────────────────────────
+def read_core_times(path: str = PROC_STAT) -> dict[int, tuple[int, int]]:
+    """cpuN 行ごとの (busy, total) jiffies を返す"""
+    times = {}
+    with open(path) as f:
+        for line in f:
+            if not line.startswith("cpu") or line.startswith("cpu "):
+                continue
+            name, *fields = line.split()
+            if not name[3:].isdigit():
+                continue
+            values = [int(v) for v in fields]
+            idle = values[3] + (values[4] if len(values) > 4 else 0)   # idle + iowait
+            total = sum(values[:8])                                      # guest は user に含まれる
+            times[int(name[3:])] = (total - idle, total)
+    return times
+
+
+def core_utilization(before: dict, after: dict, core: int) -> float | None:
+    """2 つのスナップショット間のコア使用率 (0.0〜1.0)。tick 不足なら None"""
+    if core not in before or core not in after:
+        return None
+    busy = after[core][0] - before[core][0]
+    total = after[core][1] - before[core][1]
+    if total <= 0:
+        return None
+    return min(1.0, max(0.0, busy / total))
+
+
+def cores_utilization(before: dict, after: dict, cores) -> float | None:
+    """複数コアの平均使用率 (0.0〜1.0)"""
+    values = [u for u in (core_utilization(before, after, c) for c in cores) if u is not None]
+    return sum(values) / len(values) if values else None
+
+
+def current_cpu() -> int:
+    """このスレッドが現在走っている論理 CPU 番号 (/proc/thread-self/stat の 39 番目)"""
+    try:
+        with open("/proc/thread-self/stat") as f:
+            stat = f.read()
+        return int(stat.rsplit(")", 1)[1].split()[36])
+    except (OSError, IndexError, ValueError):
+        return 0
+
+
+class DutyCycleController:
+    """
+    目標使用率に対する PI 制御器。
+    出力はスライス内の busy 比率 (0.0〜1.0)。目標値をフィードフォワードとして
+    用い、積分項はクランプ時に止める (anti-windup)。
+    """
+
+    def __init__(self, target: float, kp: float = 0.4, ki: float = 0.15,
+                 min_duty: float = 0.0, max_duty: float = 1.0):
+        self.target = target
+        self.kp = kp
+        self.ki = ki
+        self.min_duty = min_duty
+        self.max_duty = max_duty
+        self.integral = 0.0
+        self.duty = target
+
+    def update(self, measured: float) -> float:
+        error = self.target - measured
+        integral = self.integral + error
+        duty = self.target + self.kp * error + self.ki * integral
+        if self.min_duty <= duty <= self.max_duty:
+            self.integral = integral
+        self.duty = min(self.max_duty, max(self.min_duty, duty))
+        return self.duty
+
+
+class LoadErrorLog:
+    """ワーカーから届いた (時刻, コア, 実測%, duty[, 仕事量, busy 秒]) を集計し誤差の推移を保持する"""
+
+    def __init__(self, target_percent: float, tolerance: float = DEFAULT_TOLERANCE,
+                 unit: str = "", scale: float = 1e9):
+        self.target = float(target_percent)
+        self.tolerance = tolerance
+        self.unit = unit
+        self.scale = scale      # 仕事量 → unit への換算 (GFLOP/s, GB/s は 1e9、TFLOP/s は 1e12)
+        self.t0 = time.time()
+        self.samples: list[tuple[float, int, float, float]] = []   # (経過秒, コア, 誤差%, duty)
+        self.work = 0.0
+        self.busy = 0.0
+        self.work_log = None    # track_work() 後は (受信時刻, 仕事量) を残す
+        self.changed = float("-inf")    # 最後に目標が変わった時刻
+        self.settling = 0       # 目標変更直後で評価から外したサンプル数
+
+    def track_work(self):
+        """区間ごとのスループット (throughput_between) を出せるように仕事量の時刻を残す"""
+        self.work_log = []
+        return self
+
+    def set_target(self, target: float, t: float | None = None):
+        """実行中の目標変更。変更から SETTLE_SEC 以内のサンプルは古い目標で制御された区間を含むので評価しない"""
+        target = float(target)
+        if target != self.target:
+            self.target = target
+            self.changed = time.time() if t is None else t
+
+    def add(self, t: float, core: int, measured: float | None, duty: float,
+            work: float = 0.0, busy: float = 0.0) -> float | None:
+        """サンプルを集計し、評価した誤差 (%) を返す (評価しなかったときは None)"""
+        self.work += work
+        self.busy += busy
+        if self.work_log is not None and work:
+            self.work_log.append((t, work))
+        if measured is None:            # 開ループ時は仕事量だけ届く
+            return None
+        if t - self.changed < SETTLE_SEC:
+            self.settling += 1
+            return None
+        error = measured - self.target
+        self.samples.append((t - self.t0, core, error, duty))
+        return error
+
+    def throughput(self) -> dict:
+        """全ワーカー合計の達成スループット (unit 単位、scale で割った値)"""
+        if not self.unit or self.work <= 0:
+            return {}
+        elapsed = max(1e-9, time.time() - self.t0)
+        return {
+            "unit": self.unit,
+            "throughput": self.work / elapsed / self.scale,             # 壁時計あたり
+            "busy_throughput": self.work / max(1e-9, self.busy) / self.scale,   # busy 1 秒あたり (1 ワーカー平均)
+            "busy_seconds": self.busy,
+        }
+
+    def throughput_between(self, t0: float, t1: float) -> float | None:
+        """
+        壁時計 t0〜t1 (time.time()) の全ワーカー合計スループット (unit 単位)。
+        各レポートは直前 REPORT_SEC 分の仕事なので、t0 + REPORT_SEC より後に届いたものだけを数える
+        """
+        start = t0 + REPORT_SEC
+        if self.work_log is None or t1 <= start:
+            return None
+        return sum(w for t, w in self.work_log if start < t <= t1) / (t1 - start) / self.scale
+
+    def summary(self) -> dict:
+        result = {"target": self.target, "tolerance": self.tolerance, "samples": len(self.samples),
+                  "settling": self.settling}
+        result.update(self.throughput())
+        if not self.samples:
+            return result
+        errors = [e for _, _, e, _ in self.samples]
+        per_core: dict[int, list[float]] = {}
+        for (_, core, e, _) in self.samples:
+            per_core.setdefault(core, []).append(e)
+        result.update({
+            "mean_error": sum(errors) / len(errors),
+            "mean_abs_error": sum(abs(e) for e in errors) / len(errors),
+            "max_abs_error": max(abs(e) for e in errors),
+            "within_tolerance": sum(abs(e) <= self.tolerance for e in errors) / len(errors),
+            "per_core": {c: sum(v) / len(v) for c, v in sorted(per_core.items())},
+            "series": [(round(t, 3), c, round(e, 2)) for t, c, e, _ in self.samples],
+        })
+        return result
 
 # ────────────────────────────────────────────────────────────
 # 1) x86 アセンブラ版 (外部バイナリ mixed_load を呼ぶ)
 # ────────────────────────────────────────────────────────────
-def apply_cpu_load_x86(load_percentage: int, stop_event: Event, modulate: bool = False):
+def apply_cpu_load_x86(load_percentage: int, stop_event: Event, modulate: bool = False,
+                       placement: str | None = None, persistent: bool = True,
+                       level=None, closed_loop: bool = True,
+                       tolerance: float = DEFAULT_TOLERANCE, on_report=None):
+    """
+    mixed_load を各ワーカーから起動して負荷をかける。
+    persistent=True (既定) では mixed_load を停止まで 1 本だけ起動し続け、
+    SIGSTOP/SIGCONT のゲートで busy/idle 比を作る (再起動による負荷の谷が出ない)。
+    level に make_load_level() の共有値を渡すと、実行中に強度を変更できる。
+    persistent=False は従来の再起動ループ。
+    """
     binary_path = os.path.join(os.path.dirname(__file__), "mixed_load")
     if not (os.path.exists(binary_path) and os.access(binary_path, os.X_OK)):
         print("[ERROR] mixed_load binary not found or not executable"); return
@@ -38,52 +230,224 @@ def apply_cpu_load_x86(load_percentage: int, stop_event: Event, modulate: bool =
                 proc.terminate(); proc.wait()
             time.sleep(0.5 * (2 if modulate else 1))
 
-    _launch_processes(worker, stop_event)
+    if not persistent:
+        _launch_processes(worker, stop_event, placement=placement)
+        return
+
+    if level is None:
+        level = make_load_level(load_percentage)
+    use_pi = closed_loop and not modulate and os.path.exists(PROC_STAT)
+    reports = Queue() if use_pi else None
+
+    def spawn():
+        # 強度は mixed_load 側ではなくゲートで作るので常に 100 で起動。
+        # nice を下げるのは子だけ (ゲート側が遅れると SIGSTOP が間に合わない)
+        return subprocess.Popen([binary_path, "100"], preexec_fn=_lower_priority,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    def persistent_worker(evt: Event):
+        # terminate() されても finally で mixed_load を片付ける
+        signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+        proc = spawn()
+        cores = sorted(os.sched_getaffinity(0))
+        ctrl = DutyCycleController(level.value / 100.0)
+        window = deque([read_core_times()], maxlen=5) if use_pi else None
+        acc, n, last_report = 0.0, 0, time.time()
+        running = True
+        try:
+            while not evt.is_set():
+                if proc.poll() is not None:     # 異常終了時のみ再起動
+                    proc = spawn(); running = True
+                ctrl.target = min(1.0, max(0.0, level.value / 100.0))
+                duty = ctrl.duty if use_pi else ctrl.target
+                if modulate:
+                    duty /= 2
+                busy = SLICE_SEC * duty
+                t0 = time.perf_counter()
+                if busy > 0:
+                    if not running:
+                        proc.send_signal(signal.SIGCONT); running = True
+                    time.sleep(busy)
+                if busy < SLICE_SEC:
+                    if running:
+                        proc.send_signal(signal.SIGSTOP); running = False
+                    time.sleep(max(0.0, SLICE_SEC - (time.perf_counter() - t0)))
+
+                if not use_pi:
+                    continue
+                window.append(read_core_times())
+                measured = cores_utilization(window[0], window[-1], cores)
+                if measured is None:
+                    continue
+                ctrl.update(measured)
+                acc += measured; n += 1
+                if time.time() - last_report >= REPORT_SEC:
+                    reports.put((time.time(), cores[0] if len(cores) == 1 else -1,
+                                 acc / n * 100.0, ctrl.duty))
+                    acc, n, last_report = 0.0, 0, time.time()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if proc.poll() is None:
+                proc.send_signal(signal.SIGCONT)   # 停止中のままだと terminate が届かない
+                proc.terminate(); proc.wait()
+
+    return _run_reported(persistent_worker, stop_event, load_percentage, tolerance,
+                         reports, on_report, placement, level=level)
+
+
+def _lower_priority():
+    try: os.nice(10)
+    except OSError: pass
+
+
+def make_load_level(load_percentage: float):
+    """実行中のワーカーと共有する負荷率 (%)。.value を書き換えると次のスライスから反映"""
+    return Value("d", float(load_percentage))
 
 
 # ────────────────────────────────────────────────────────────
 # 2) 純 Python 計算版
 # ────────────────────────────────────────────────────────────
-def apply_cpu_load(load_percentage: int, stop_event: Event, modulate: bool = False):
-    work_ratio = load_percentage / 100.0
-    interval   = 0.1                       # 100 ms スライス
-    work_time  = interval * work_ratio
-    idle_time  = interval - work_time
+def apply_cpu_load(load_percentage: int, stop_event: Event, modulate: bool = False,
+                   closed_loop: bool = True, tolerance: float = DEFAULT_TOLERANCE,
+                   on_report=None, placement: str | None = None, kernel: str = "spin",
+                   level=None, error_log: LoadErrorLog | None = None):
+    """
+    load_percentage (%) の負荷を全コアにかける。
+    closed_loop=True ではワーカーが毎スライス /proc/stat のコア使用率を読み、
+    PI 制御で busy/idle 比を補正する (modulate 指定時は意図的な揺らぎなので開ループ)。
+    placement は cpu_topology.POLICIES のポリシー ("physical", "socket:0" など)。閉ループで未指定なら
+    "all" (1 ワーカー 1 CPU に固定)。各ワーカーは自分の走っているコアの使用率で制御するので、固定しないと
+    移動のたびに別のコアを測り、2 つのワーカーが同じコアを取り合って制御することになる。
+    kernel は cpu_kernels.KERNELS のいずれか。busy 区間でそのカーネルを回す。
+    level に make_load_level() の共有値を渡すと、実行中に負荷率を変更できる。
+    戻り値は LoadErrorLog.summary() (開ループ時は samples=0、spin 以外は達成スループット付き)。
+    error_log に LoadErrorLog を渡すとそこに集計する (途中の区間のスループットを見たいとき)。
+    """
+    if kernel not in KERNELS:
+        raise ValueError(f"unknown CPU kernel: {kernel!r} (choose from {', '.join(KERNELS)})")
+    if level is None:
+        level = make_load_level(load_percentage)
+    interval   = SLICE_SEC
+    use_pi = closed_loop and not modulate and os.path.exists(PROC_STAT)
+    reports = Queue() if use_pi or kernel != "spin" else None
+    if use_pi and not placement:
+        placement = "all"
+    cpus = placement_cpus(placement)
+    workers = len(cpus) if cpus is not None else cpu_count() or 1
 
     def worker(evt: Event):
+        load = make_kernel(kernel, workers)
+        ctrl = DutyCycleController(level.value / 100.0)
+        window = deque([read_core_times()], maxlen=5) if use_pi else None   # 直近 0.5 s で評価
+        acc, n, work, busy_sum, last_report = 0.0, 0, 0.0, 0.0, time.time()
         try:
             while not evt.is_set():
+                work_ratio = min(1.0, max(0.0, level.value / 100.0))
+                ctrl.target = work_ratio
                 t0 = time.perf_counter()
-                # busy loop で work_time だけ回す
-                while (time.perf_counter() - t0) < work_time and not evt.is_set():
-                    pass
+                # busy 区間はカーネルを回す (spin は従来どおりの空回し)
+                work += load.run(interval * (ctrl.duty if use_pi else work_ratio), evt)
+                busy = time.perf_counter() - t0
+                busy_sum += busy
                 # 残り時間はスリープ
-                time.sleep(max(0, idle_time) * (2 if modulate else 1))
+                time.sleep(max(0.0, interval - busy) * (2 if modulate else 1))
+
+                measured = None
+                if use_pi:
+                    window.append(read_core_times())
+                    core = current_cpu()
+                    measured = core_utilization(window[0], window[-1], core)
+                    if measured is not None:
+                        ctrl.update(measured)
+                        acc += measured; n += 1
+                if reports is not None and time.time() - last_report >= REPORT_SEC:
+                    reports.put((time.time(), current_cpu(), acc / n * 100.0 if n else None,
+                                 ctrl.duty, work, busy_sum))
+                    acc, n, work, busy_sum, last_report = 0.0, 0, 0.0, 0.0, time.time()
         except KeyboardInterrupt:
             pass
 
-    _launch_processes(worker, stop_event)
+    return _run_reported(worker, stop_event, load_percentage, tolerance, reports,
+                         on_report, placement, level=level, unit=unit_of(kernel), error_log=error_log,
+                         scale=scale_of(kernel))
 
 
 # ────────────────────────────────────────────────────────────
 # 共通：プロセス起動＆停止監視
 # ────────────────────────────────────────────────────────────
-def _launch_processes(target, stop_event: Event):
-    n_proc = cpu_count() or 1
-    print(f"[DEBUG] Launching {n_proc} CPU-load processes")
-    procs: list[Process] = [Process(target=target, args=(stop_event,)) for _ in range(n_proc)]
+def _launch_processes(target, stop_event: Event, reports: Queue = None, on_item=None,
+                      placement: str | None = None):
+    cpus = placement_cpus(placement)
+    if cpus is None:
+        n_proc = cpu_count() or 1
+        print(f"[DEBUG] Launching {n_proc} CPU-load processes")
+        procs: list[Process] = [Process(target=target, args=(stop_event,)) for _ in range(n_proc)]
+    else:
+        print(f"[DEBUG] Launching {len(cpus)} CPU-load processes pinned to {cpus} ({placement})")
+        procs = [Process(target=_run_pinned, args=(target, cpu, stop_event)) for cpu in cpus]
     for p in procs: p.start()
 
     try:
         while not stop_event.is_set():
-            time.sleep(0.5)
+            _drain(reports, on_item, timeout=0.5)
     except KeyboardInterrupt:
         stop_event.set()
 
-    # 終了待ち
+    # 終了待ち (ワーカー自身の後始末を待ってから terminate)
+    deadline = time.time() + 2 * SLICE_SEC + 1.0
     for p in procs:
+        p.join(timeout=max(0.0, deadline - time.time()))
         if p.is_alive(): p.terminate()
         p.join()
+    _drain(reports, on_item, timeout=0)
+
+
+def _run_reported(target, stop_event: Event, load_percentage: float, tolerance: float,
+                  reports: Queue, on_report, placement: str | None, level=None,
+                  unit: str = "", error_log: LoadErrorLog | None = None, scale: float = 1e9) -> dict:
+    """ワーカーを起動し、誤差レポートを集計して summary を返す"""
+    log = error_log or LoadErrorLog(load_percentage, tolerance, unit, scale)
+
+    def collect(item):
+        if level is not None:
+            log.set_target(level.value)
+        error = log.add(*item)
+        if on_report and error is not None:
+            on_report(item[1], error)
+
+    _launch_processes(target, stop_event, reports=reports, on_item=collect, placement=placement)
+
+    summary = log.summary()
+    if summary["samples"]:
+        print(f"[INFO] CPU load {log.target:g}%: mean |err| {summary['mean_abs_error']:.2f}%, "
+              f"max {summary['max_abs_error']:.2f}%, "
+              f"{summary['within_tolerance'] * 100:.0f}% of samples within ±{tolerance}%")
+    if "throughput" in summary:
+        print(f"[INFO] CPU kernel throughput: {summary['throughput']:.2f} {unit} "
+              f"({summary['busy_throughput']:.2f} {unit} per worker busy second)")
+    return summary
+
+
+def _run_pinned(target, cpu: int, evt: Event):
+    pin_current_process(cpu)
+    target(evt)
+
+
+def _drain(reports: Queue, on_item, timeout: float):
+    """ワーカーのレポートを回収 (reports が無ければ単に待つ)"""
+    if reports is None:
+        time.sleep(timeout)
+        return
+    deadline = time.time() + timeout
+    while True:
+        try:
+            item = reports.get(timeout=max(0.0, deadline - time.time()))
+        except (queue.Empty, OSError, EOFError):
+            return
+        if on_item:
+            on_item(item)
 
 
 # ────────────────────────────────────────────────────────────
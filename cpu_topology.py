@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+cpu_topology.py  ―  CPU トポロジー読み取り＆ワーカー配置
+  ・/sys/devices/system/cpu からパッケージ / NUMA / SMT / L3 ドメインを取得
+  ・配置ポリシーに従って論理 CPU のリストを作り、ワーカーを 1 コアずつ固定する
+"""
+
+import os
+from dataclasses import dataclass, field
+
+SYS_CPU = "/sys/devices/system/cpu"
+
+# 配置ポリシー (":" の後ろに番号を取るものがある)
+POLICIES = {
+    "all":      "every logical CPU",
+    "physical": "physical cores only (one SMT thread per core)",
+    "socket":   "one socket  (socket:N)",
+    "numa":     "NUMA node N (numa:N)",
+    "l3":       "one L3 / CCX domain (l3:N)",
+}
+
+
+def parse_cpu_list(text: str) -> list[int]:
+    """'0-3,8,10-11' 形式を [0,1,2,3,8,10,11] に展開"""
+    cpus = []
+    for part in text.strip().split(","):
+        if not part:
+            continue
+        if "-" in part:
+            lo, hi = part.split("-")
+            cpus.extend(range(int(lo), int(hi) + 1))
+        else:
+            cpus.append(int(part))
+    return cpus
+
+
+def _read(path: str, default: str = "") -> str:
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return default
+
+
+@dataclass
+class LogicalCPU:
+    cpu: int
+    package: int = 0
+    core: int = 0
+    node: int = 0
+    l3: int = 0
+    siblings: list[int] = field(default_factory=list)
+
+
+@dataclass
+class CPUTopology:
+    cpus: dict[int, LogicalCPU]
+
+    @classmethod
+    def from_sysfs(cls, root: str = SYS_CPU) -> "CPUTopology":
+        """sysfs (テスト時はフィクスチャのディレクトリ) からトポロジーを組み立てる"""
+        online = _read(os.path.join(root, "online"))
+        ids = parse_cpu_list(online) if online else sorted(
+            int(d[3:]) for d in os.listdir(root) if d.startswith("cpu") and d[3:].isdigit())
+
+        l3_domains: dict[tuple[int, ...], int] = {}
+        cpus = {}
+        for cpu in ids:
+            base = os.path.join(root, f"cpu{cpu}")
+            topo = os.path.join(base, "topology")
+            info = LogicalCPU(
+                cpu=cpu,
+                package=int(_read(os.path.join(topo, "physical_package_id"), "0")),
+                core=int(_read(os.path.join(topo, "core_id"), str(cpu))),
+                siblings=parse_cpu_list(_read(os.path.join(topo, "thread_siblings_list"), str(cpu))),
+            )
+            # NUMA ノードは cpuN/nodeM のシンボリックリンクで分かる
+            try:
+                nodes = [d for d in os.listdir(base) if d.startswith("node") and d[4:].isdigit()]
+                info.node = int(nodes[0][4:]) if nodes else 0
+            except OSError:
+                pass
+            # L3 を共有する CPU 集合ごとに通し番号を振る (AMD では CCX 単位になる)
+            shared = _l3_shared(base) or (cpu,)
+            info.l3 = l3_domains.setdefault(shared, len(l3_domains))
+            cpus[cpu] = info
+        return cls(cpus)
+
+    # ── 集計 ───────────────────────────────────────────────
+    def packages(self) -> list[int]:
+        return sorted({c.package for c in self.cpus.values()})
+
+    def nodes(self) -> list[int]:
+        return sorted({c.node for c in self.cpus.values()})
+
+    def l3_domains(self) -> list[int]:
+        return sorted({c.l3 for c in self.cpus.values()})
+
+    def physical_cores(self) -> list[int]:
+        """SMT 兄弟のうち番号が最小のものだけを返す"""
+        return sorted(c.cpu for c in self.cpus.values() if c.cpu == min(c.siblings or [c.cpu]))
+
+    def describe(self) -> str:
+        return (f"{len(self.cpus)} logical CPUs, {len(self.physical_cores())} cores, "
+                f"{len(self.packages())} socket(s), {len(self.nodes())} NUMA node(s), "
+                f"{len(self.l3_domains())} L3 domain(s)")
+
+    # ── 配置 ───────────────────────────────────────────────
+    def select(self, policy: str = "all") -> list[int]:
+        """
+        ポリシー文字列から固定先 CPU のリストを返す。
+        例: "all", "physical", "socket:1", "numa:0", "l3:2", "physical,socket:0"
+        """
+        selected = set(self.cpus)
+        for term in policy.split(","):
+            name, _, arg = term.strip().partition(":")
+            if name not in POLICIES:
+                raise ValueError(f"unknown placement policy: {name!r} (choose from {', '.join(POLICIES)})")
+            if name == "physical":
+                selected &= set(self.physical_cores())
+            elif name in ("socket", "numa", "l3"):
+                attr = {"socket": "package", "numa": "node", "l3": "l3"}[name]
+                index = int(arg or 0)
+                selected &= {c.cpu for c in self.cpus.values() if getattr(c, attr) == index}
+        if not selected:
+            raise ValueError(f"placement policy {policy!r} selects no CPUs ({self.describe()})")
+        return sorted(selected)
+
+
+def _l3_shared(cpu_dir: str) -> tuple[int, ...]:
+    cache_dir = os.path.join(cpu_dir, "cache")
+    try:
+        indexes = sorted(d for d in os.listdir(cache_dir) if d.startswith("index"))
+    except OSError:
+        return ()
+    for idx in indexes:
+        if _read(os.path.join(cache_dir, idx, "level")) == "3":
+            return tuple(parse_cpu_list(_read(os.path.join(cache_dir, idx, "shared_cpu_list"))))
+    return ()
+
+
+def placement_cpus(policy: str | None, root: str = SYS_CPU) -> list[int] | None:
+    """policy が None なら従来どおり未固定 (None を返す)。このプロセスが使えない CPU (cpuset 外) は除く"""
+    if not policy:
+        return None
+    cpus = CPUTopology.from_sysfs(root).select(policy)
+    try:
+        allowed = os.sched_getaffinity(0)
+    except AttributeError:
+        return cpus
+    return [c for c in cpus if c in allowed] or cpus
+
+
+def pin_current_process(cpu: int):
+    """呼び出し元プロセスを 1 つの論理 CPU に固定"""
+    try:
+        os.sched_setaffinity(0, {cpu})
+    except (AttributeError, OSError) as e:
+        print(f"[WARN] sched_setaffinity({cpu}) failed: {e}")
+
+
+if __name__ == "__main__":
+    topo = CPUTopology.from_sysfs()
+    print(topo.describe())
+    for c in topo.cpus.values():
+        print(f"  cpu{c.cpu}: socket={c.package} core={c.core} node={c.node} l3={c.l3} siblings={c.siblings}")
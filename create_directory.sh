@@ -12,10 +12,31 @@ mkdir -p lin_bench/sound_test
 
 # Move files to respective directories
 mv main.py lin_bench/
+mv startup.py lin_bench/
+mv sweep.py lin_bench/
+mv orchestrator.py lin_bench/
+mv loadpower_cli.py lin_bench/
+mv cluster.py lin_bench/
 mv cpu_load.py lin_bench/cpu_load/
+mv cpu_topology.py lin_bench/cpu_load/
+mv cpu_kernels.py lin_bench/cpu_load/
 mv gpu_load.py lin_bench/gpu_load/
+mv gpu_render.py lin_bench/gpu_load/
+mv gpu_kernels.py lin_bench/gpu_load/
+mv gpu_workers.py lin_bench/gpu_load/
+mv vram_fill.py lin_bench/gpu_load/
+mv vram_patterns.py lin_bench/gpu_load/
+mv gl_instanced.py lin_bench/gpu_load/
+mv gl_offscreen.py lin_bench/gpu_load/
 mv system_info.py lin_bench/system_info/
+mv telemetry.py lin_bench/system_info/
+mv recorder.py lin_bench/system_info/
 mv storage_test.py lin_bench/storage_load/
+mv storage_io.py lin_bench/storage_load/
+mv storage_aio.py lin_bench/storage_load/
+mv storage_patterns.py lin_bench/storage_load/
+mv storage_devices.py lin_bench/storage_load/
+mv storage_scheduler.py lin_bench/storage_load/
 mv noisetester.py lin_bench/storage_load/
 
 # Output status
@@ -0,0 +1,372 @@
+"""
+gl_instanced.py  ―  VBO / VAO + インスタンス描画による 3D 描画負荷 (OpenGL 3.3 core)
+  ・立方体 / 球 / 円錐のメッシュは最初に 1 回だけ VBO / IBO に載せる
+  ・インスタンスごとの位置・回転軸・位相・色・大きさもバッファに 1 回載せ、回転は頂点シェーダで計算
+  ・1 フレーム = メッシュ 3 種 × batches × passes 回の glDrawElementsInstancedBaseVertex (Python 側の頂点ループ無し)
+    passes > 1 は同じシーンを GL_LEQUAL で重ね描きするオーバードロー (フラグメント負荷を増やす)
+  ・ライティングはフラグメントシェーダ (Blinn-Phong)
+  ・インスタンス数は負荷率に比例 (instances_for_load)。report() で FPS と三角形/秒を出す
+  ・シーンは SceneGraph (seed 固定の乱数で配置)。時刻はフレーム番号 × FRAME_DT なので、
+    同じ seed なら実行環境によらず同じフレーム列になる (ベンチマークのスコアを機械間で比べられる)
+コンテキストは呼び出し側が用意する (pygame のウィンドウ、または gl_offscreen.OffscreenContext)。
+"""
+import ctypes
+import math
+import time
+
+import numpy as np
+from OpenGL.GL import *
+
+MAX_INSTANCES = 20000
+REPORT_SEC = 1.0
+FRAME_DT = 1.0 / 60.0                 # 1 フレームで進めるシーン時刻 [s] (実時間ではない)
+FLOATS_PER_VERTEX = 6                 # 位置 3 + 法線 3
+FLOATS_PER_INSTANCE = 11              # 位置 3 + (回転軸 3, 位相 1) + (色 3, 大きさ 1)
+
+VERTEX_SHADER = """
+#version 330 core
+layout(location = 0) in vec3 position;
+layout(location = 1) in vec3 normal;
+layout(location = 2) in vec3 offset;
+layout(location = 3) in vec4 axis_phase;
+layout(location = 4) in vec4 color_scale;
+uniform mat4 view_projection;
+uniform float time;
+out vec3 v_normal;
+out vec3 v_color;
+out vec3 v_world;
+
+mat3 rotation(vec3 axis, float angle) {
+    float s = sin(angle), c = cos(angle), t = 1.0 - c;
+    return mat3(t * axis.x * axis.x + c,          t * axis.x * axis.y + s * axis.z, t * axis.x * axis.z - s * axis.y,
+                t * axis.x * axis.y - s * axis.z, t * axis.y * axis.y + c,          t * axis.y * axis.z + s * axis.x,
+                t * axis.x * axis.z + s * axis.y, t * axis.y * axis.z - s * axis.x, t * axis.z * axis.z + c);
+}
+
+void main() {
+    mat3 r = rotation(normalize(axis_phase.xyz), time + axis_phase.w);
+    vec3 world = r * (position * color_scale.w) + offset;
+    v_normal = r * normal;
+    v_color = color_scale.rgb;
+    v_world = world;
+    gl_Position = view_projection * vec4(world, 1.0);
+}
+"""
+
+FRAGMENT_SHADER = """
+#version 330 core
+in vec3 v_normal;
+in vec3 v_color;
+in vec3 v_world;
+uniform vec3 light_position;
+uniform vec3 eye_position;
+out vec4 frag_color;
+
+void main() {
+    vec3 n = normalize(v_normal);
+    vec3 l = normalize(light_position - v_world);
+    vec3 h = normalize(l + normalize(eye_position - v_world));
+    float diffuse = max(dot(n, l), 0.0);
+    float specular = pow(max(dot(n, h), 0.0), 32.0);
+    frag_color = vec4(v_color * (0.15 + 0.85 * diffuse) + vec3(0.4) * specular, 1.0);
+}
+"""
+
+
+def instances_for_load(load_percentage, max_instances=MAX_INSTANCES):
+    """負荷率 (%) → インスタンス数"""
+    return max(1, int(max_instances * min(100.0, max(0.0, load_percentage)) / 100.0))
+
+
+######################################
+#  シーン (seed 固定の配置 + 一括変換)
+######################################
+class SceneGraph:
+    """
+    scene = SceneGraph(300, seed=0)
+    scene.kinds             # オブジェクトごとのメッシュ番号 (MESHES の順, メッシュごとに連続)
+    scene.transforms(t)     # 時刻 t のモデル行列 (N, 4, 4) を NumPy で一括計算
+    scene.instance_data()   # InstancedRenderer のインスタンスバッファ (回転はシェーダ側で同じ式)
+    同じ (count, seed) からは常に同じ配置・回転軸・位相・色・大きさが得られる。
+    """
+
+    def __init__(self, count, seed=0, extent=10.0, scale=(0.3, 0.7)):
+        count = max(1, int(count))
+        rng = np.random.default_rng(seed)
+        self.count = count
+        self.seed = seed
+        self.position = rng.uniform(-extent, extent, (count, 3))
+        axis = rng.normal(size=(count, 3)) + 1e-3
+        self.axis = axis / np.linalg.norm(axis, axis=1, keepdims=True)
+        self.phase = rng.uniform(0, 2 * math.pi, count)
+        self.color = rng.uniform(0.2, 1.0, (count, 3))
+        self.scale = rng.uniform(scale[0], scale[1], count)
+        self.kinds = np.arange(count) * len(MESHES) // count      # メッシュごとに連続した区間
+
+    def transforms(self, t) -> np.ndarray:
+        """各オブジェクトのモデル行列 (行優先, 列ベクトル用)。ロドリゲスの回転公式をまとめて計算する"""
+        angle = t + self.phase
+        c, s = np.cos(angle)[:, None, None], np.sin(angle)[:, None, None]
+        x, y, z = self.axis.T
+        zero = np.zeros(self.count)
+        cross = np.stack([np.stack([zero, -z, y], -1),
+                          np.stack([z, zero, -x], -1),
+                          np.stack([-y, x, zero], -1)], 1)
+        outer = self.axis[:, :, None] * self.axis[:, None, :]
+        m = np.zeros((self.count, 4, 4))
+        m[:, :3, :3] = (c * np.identity(3) + s * cross + (1 - c) * outer) * self.scale[:, None, None]
+        m[:, :3, 3] = self.position
+        m[:, 3, 3] = 1.0
+        return m
+
+    def instance_data(self) -> np.ndarray:
+        data = np.empty((self.count, FLOATS_PER_INSTANCE), np.float32)
+        data[:, 0:3] = self.position
+        data[:, 3:6] = self.axis
+        data[:, 6] = self.phase
+        data[:, 7:10] = self.color
+        data[:, 10] = self.scale
+        return data
+
+
+######################################
+#  メッシュ生成 (位置 + 法線, uint32 インデックス)
+######################################
+def cube_mesh(size=1.0):
+    h = size / 2
+    vertices, indices = [], []
+    for axis in range(3):
+        for sign in (-1.0, 1.0):
+            normal = [0.0, 0.0, 0.0]
+            normal[axis] = sign
+            u, v = [(1, 2), (0, 2), (0, 1)][axis]
+            base = len(vertices)
+            for du, dv in ((-1, -1), (1, -1), (1, 1), (-1, 1)):
+                p = [0.0, 0.0, 0.0]
+                p[axis], p[u], p[v] = sign * h, du * h, dv * h
+                vertices.append(p + normal)
+            indices += [base, base + 1, base + 2, base, base + 2, base + 3]
+    return np.array(vertices, np.float32), np.array(indices, np.uint32)
+
+
+def sphere_mesh(radius=0.5, slices=24, stacks=16):
+    theta = np.linspace(0, math.pi, stacks + 1)[:, None]
+    phi = np.linspace(0, 2 * math.pi, slices + 1)[None, :]
+    normal = np.stack(np.broadcast_arrays(np.sin(theta) * np.cos(phi), np.sin(theta) * np.sin(phi),
+                                          np.cos(theta)), -1).reshape(-1, 3)
+    vertices = np.hstack([normal * radius, normal]).astype(np.float32)
+    row = slices + 1
+    i, j = np.meshgrid(np.arange(stacks), np.arange(slices), indexing="ij")
+    a, b = (i * row + j).ravel(), ((i + 1) * row + j).ravel()
+    indices = np.stack([a, b, a + 1, a + 1, b, b + 1], -1).ravel()
+    return vertices, indices.astype(np.uint32)
+
+
+def cone_mesh(radius=0.5, height=1.0, slices=24):
+    phi = np.linspace(0, 2 * math.pi, slices + 1)
+    ring = np.stack([np.cos(phi) * radius, np.sin(phi) * radius, np.full_like(phi, -height / 2)], -1)
+    slope = np.stack([np.cos(phi) * height, np.sin(phi) * height, np.full_like(phi, radius)], -1)
+    slope /= np.linalg.norm(slope, axis=1, keepdims=True)
+    apex = np.tile([0.0, 0.0, height / 2], (slices + 1, 1))
+    down = np.tile([0.0, 0.0, -1.0], (slices + 1, 1))
+    centre = np.array([[0.0, 0.0, -height / 2, 0.0, 0.0, -1.0]])
+    vertices = np.vstack([np.hstack([ring, slope]), np.hstack([apex, slope]),
+                          np.hstack([ring, down]), centre]).astype(np.float32)
+    n = slices + 1
+    k = np.arange(slices)
+    side = np.stack([k, k + 1, n + k], -1).ravel()
+    cap = np.stack([np.full(slices, 3 * n), 2 * n + k + 1, 2 * n + k], -1).ravel()
+    return vertices, np.concatenate([side, cap]).astype(np.uint32)
+
+
+MESHES = {"cube": cube_mesh, "sphere": sphere_mesh, "cone": cone_mesh}
+
+
+######################################
+#  行列 (列優先で glUniformMatrix4fv に渡す)
+######################################
+def perspective(fovy_deg, aspect, near, far):
+    f = 1.0 / math.tan(math.radians(fovy_deg) / 2)
+    m = np.zeros((4, 4), np.float32)
+    m[0, 0], m[1, 1] = f / aspect, f
+    m[2, 2], m[2, 3] = (far + near) / (near - far), 2 * far * near / (near - far)
+    m[3, 2] = -1.0
+    return m
+
+
+def look_at(eye, target, up):
+    eye, target, up = (np.asarray(v, np.float32) for v in (eye, target, up))
+    f = target - eye
+    f /= np.linalg.norm(f)
+    s = np.cross(f, up)
+    s /= np.linalg.norm(s)
+    u = np.cross(s, f)
+    m = np.identity(4, np.float32)
+    m[0, :3], m[1, :3], m[2, :3] = s, u, -f
+    m[:3, 3] = -m[:3, :3] @ eye
+    return m
+
+
+def _compile(source, kind):
+    shader = glCreateShader(kind)
+    glShaderSource(shader, source)
+    glCompileShader(shader)
+    if not glGetShaderiv(shader, GL_COMPILE_STATUS):
+        raise RuntimeError(f"shader compile failed: {glGetShaderInfoLog(shader).decode(errors='replace')}")
+    return shader
+
+
+def _link(*shaders):
+    program = glCreateProgram()
+    for shader in shaders:
+        glAttachShader(program, shader)
+    glLinkProgram(program)
+    if not glGetProgramiv(program, GL_LINK_STATUS):
+        raise RuntimeError(f"program link failed: {glGetProgramInfoLog(program).decode(errors='replace')}")
+    for shader in shaders:
+        glDeleteShader(shader)
+    return program
+
+
+######################################
+#  インスタンス描画レンダラ
+######################################
+class InstancedRenderer:
+    """
+    renderer = InstancedRenderer(800, 600, instances_for_load(60))
+    while ...:
+        renderer.draw(t)            # t [s] で回転
+        swap / glFinish
+        renderer.report(print)      # REPORT_SEC ごとに FPS と三角形/秒
+    renderer.set_instances(n)       # 負荷率の変更 (インスタンスバッファだけ作り直す)
+    batches はメッシュごとの描画呼び出し数 (インスタンスを分割する)、passes はオーバードロー回数。
+    """
+
+    def __init__(self, width, height, instances, seed=0, batches=1, passes=1):
+        self.width, self.height = width, height
+        self.seed = seed
+        self.program = _link(_compile(VERTEX_SHADER, GL_VERTEX_SHADER),
+                             _compile(FRAGMENT_SHADER, GL_FRAGMENT_SHADER))
+        self._uniforms = {name: glGetUniformLocation(self.program, name)
+                          for name in ("view_projection", "time", "light_position", "eye_position")}
+
+        # メッシュを 1 本の VBO / IBO にまとめる: name → (インデックス数, IBO 内のバイト位置, 頂点の先頭)
+        vertices, indices, self.meshes = [], [], {}
+        base_vertex = index_offset = 0
+        for name, make in MESHES.items():
+            v, i = make()
+            self.meshes[name] = (len(i), index_offset * 4, base_vertex)
+            vertices.append(v)
+            indices.append(i)
+            base_vertex += len(v)
+            index_offset += len(i)
+        self.vbo, self.ibo, self.instance_vbo = glGenBuffers(3)
+        glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
+        glBufferData(GL_ARRAY_BUFFER, np.concatenate(vertices), GL_STATIC_DRAW)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.ibo)
+        glBufferData(GL_ELEMENT_ARRAY_BUFFER, np.concatenate(indices), GL_STATIC_DRAW)
+
+        # 描画呼び出しごとの VAO: 頂点属性は共通、インスタンス属性はその呼び出しの区間を指す
+        self._vao_pool = []
+        self.draws = []                   # [(メッシュ名, VAO, インスタンス数)]
+        self.instances = 0
+        self.batches = batches
+        self.passes = max(1, int(passes))
+        self.set_instances(instances, batches)
+
+        eye = np.array([0.0, 0.0, 32.0], np.float32)
+        view_projection = perspective(45.0, width / height, 0.1, 100.0) @ look_at(eye, (0, 0, 0), (0, 1, 0))
+        glUseProgram(self.program)
+        glUniformMatrix4fv(self._uniforms["view_projection"], 1, GL_TRUE, view_projection)
+        glUniform3f(self._uniforms["light_position"], 20.0, 20.0, 30.0)
+        glUniform3f(self._uniforms["eye_position"], *eye)
+        glViewport(0, 0, width, height)
+        glEnable(GL_DEPTH_TEST)
+        glEnable(GL_CULL_FACE)
+        glClearColor(0.3, 0.3, 0.3, 1.0)
+
+        self.frames = self.triangles = 0
+        self.t0 = self._last_report = time.perf_counter()
+        self._frames_at_report = self._triangles_at_report = 0
+
+    def set_instances(self, count, batches=None):
+        """
+        インスタンス数を変える (変化が無ければ何もしない)。SceneGraph.kinds のメッシュごとの連続区間を
+        それぞれ batches 個の描画呼び出しに分ける (固定機能描画と同じオブジェクトに同じメッシュ)
+        """
+        count = max(1, int(count))
+        batches = self.batches if batches is None else max(1, int(batches))
+        if count == self.instances and batches == self.batches and self.draws:
+            return
+        scene = SceneGraph(count, self.seed)
+        glBindBuffer(GL_ARRAY_BUFFER, self.instance_vbo)
+        glBufferData(GL_ARRAY_BUFFER, scene.instance_data(), GL_STATIC_DRAW)
+
+        names = list(self.meshes)
+        calls = len(names) * batches
+        if len(self._vao_pool) < calls:
+            self._vao_pool += list(np.atleast_1d(glGenVertexArrays(calls - len(self._vao_pool))))
+        self.draws = []
+        stride_v = FLOATS_PER_VERTEX * 4
+        stride_i = FLOATS_PER_INSTANCE * 4
+        parts = [(name, part) for kind, name in enumerate(names)
+                 for part in np.array_split(np.flatnonzero(scene.kinds == kind), batches) if len(part)]
+        for vao, (name, part) in zip(self._vao_pool, parts):
+            first = int(part[0])
+            self.draws.append((name, vao, len(part)))
+            glBindVertexArray(vao)
+            glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
+            glEnableVertexAttribArray(0)
+            glVertexAttribPointer(0, 3, GL_FLOAT, GL_FALSE, stride_v, ctypes.c_void_p(0))
+            glEnableVertexAttribArray(1)
+            glVertexAttribPointer(1, 3, GL_FLOAT, GL_FALSE, stride_v, ctypes.c_void_p(12))
+            glBindBuffer(GL_ARRAY_BUFFER, self.instance_vbo)
+            for location, size, offset in ((2, 3, 0), (3, 4, 12), (4, 4, 28)):
+                glEnableVertexAttribArray(location)
+                glVertexAttribPointer(location, size, GL_FLOAT, GL_FALSE, stride_i,
+                                      ctypes.c_void_p(first * stride_i + offset))
+                glVertexAttribDivisor(location, 1)
+            glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.ibo)
+        glBindVertexArray(0)
+        self.instances = count
+        self.batches = batches
+        self.triangles_per_pass = sum(self.meshes[name][0] // 3 * n for name, _, n in self.draws)
+
+    def draw(self, t, passes=None):
+        passes = self.passes if passes is None else max(1, int(passes))
+        glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+        glUseProgram(self.program)
+        glUniform1f(self._uniforms["time"], t)
+        for p in range(passes):
+            # 2 回目以降は同じ深度でも通して、全フラグメントをもう一度シェーディングさせる
+            glDepthFunc(GL_LESS if p == 0 else GL_LEQUAL)
+            for name, vao, instances in self.draws:
+                count, offset, base_vertex = self.meshes[name]
+                glBindVertexArray(vao)
+                glDrawElementsInstancedBaseVertex(GL_TRIANGLES, count, GL_UNSIGNED_INT, ctypes.c_void_p(offset),
+                                                  instances, base_vertex)
+        glBindVertexArray(0)
+        glDepthFunc(GL_LESS)
+        self.frames += 1
+        self.triangles += self.triangles_per_pass * passes
+
+    def report(self, log=print):
+        """REPORT_SEC ごとに直近の FPS と三角形/秒を出す"""
+        now = time.perf_counter()
+        if now - self._last_report < REPORT_SEC:
+            return
+        dt = now - self._last_report
+        fps = (self.frames - self._frames_at_report) / dt
+        tps = (self.triangles - self._triangles_at_report) / dt
+        log(f"[INFO] 3D render: {self.instances} instances, {fps:.1f} FPS, {tps / 1e6:.2f} M triangles/s")
+        self._last_report, self._frames_at_report, self._triangles_at_report = now, self.frames, self.triangles
+
+    def stats(self) -> dict:
+        elapsed = max(1e-9, time.perf_counter() - self.t0)
+        return {"instances": self.instances, "frames": self.frames, "seconds": elapsed,
+                "fps": self.frames / elapsed, "tris_per_sec": self.triangles / elapsed}
+
+    def delete(self):
+        glDeleteVertexArrays(len(self._vao_pool), self._vao_pool)
+        glDeleteBuffers(3, [self.vbo, self.ibo, self.instance_vbo])
+        glDeleteProgram(self.program)
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+gl_offscreen.py  ―  ウィンドウ無しの OpenGL コンテキスト (EGL / OSMesa)
+  ・EGL: GPU 番号に対応する EGL デバイスを選び、pbuffer を描画先にする (NVIDIA ヘッドレス / Mesa)
+         デバイスが列挙できなければ既定ディスプレイ (Mesa は surfaceless プラットフォーム)
+  ・OSMesa: メモリ上のバッファに描く純ソフトウェア実装 (llvmpipe)
+  ・apply_offscreen_load: FBO (指定解像度) にインスタンス描画し続ける描画負荷。pygame / ウィンドウ不要、
+    vsync も sleep も無く、fence で 2 フレーム先行までに抑えて GPU を途切れさせない。
+    負荷は解像度・オーバードロー (passes)・描画呼び出し数 (batches)・インスタンス数 (負荷率) で決まる。
+PyOpenGL はプラットフォームを最初の OpenGL.GL の import 時に決めるので、このモジュールは import 時に
+何もせず、OffscreenContext が要求された backend から PYOPENGL_PLATFORM を決めてから OpenGL を読み込む
+(同じプロセスで別のプラットフォームが既に読み込まれていればエラーにする)。
+"""
+
+import ctypes
+import os
+import sys
+from collections import deque
+
+BACKENDS = ("egl", "osmesa")
+FRAMES_IN_FLIGHT = 2
+
+
+def select_platform(backend=None) -> str:
+    """
+    OpenGL を読み込む前に PyOpenGL のプラットフォームを backend に合わせる。
+    backend 省略時は PYOPENGL_PLATFORM (未設定なら egl)。選んだ backend を返す
+    """
+    backend = backend or os.environ.get("PYOPENGL_PLATFORM") or "egl"
+    if backend not in BACKENDS:
+        raise ValueError(f"unknown offscreen backend: {backend!r} (choose from {', '.join(BACKENDS)})")
+    loaded = sys.modules.get("OpenGL.platform")
+    if loaded is not None:
+        current = type(loaded.PLATFORM).__name__.lower()
+        if not current.startswith(backend):
+            raise RuntimeError(f"PyOpenGL is already initialised for {current} in this process; "
+                               f"the {backend} backend needs PYOPENGL_PLATFORM={backend} before OpenGL is imported")
+        return backend
+    os.environ["PYOPENGL_PLATFORM"] = backend
+    if backend == "egl" and not os.environ.get("DISPLAY") and not os.environ.get("WAYLAND_DISPLAY"):
+        os.environ.setdefault("EGL_PLATFORM", "surfaceless")     # Mesa: X / Wayland 無しで初期化する
+    return backend
+
+
+class OffscreenContext:
+    """
+    ctx = OffscreenContext(640, 480, gpu_id=0)   # 作成してカレントにする
+    print(ctx.renderer)
+    ctx.release()
+    """
+
+    def __init__(self, width=640, height=480, gpu_id=0, backend=None):
+        self.width, self.height = width, height
+        self.backend = select_platform(backend)
+        if self.backend == "egl":
+            self._create_egl(gpu_id)
+        else:
+            self._create_osmesa()
+        from OpenGL.GL import GL_RENDERER, GL_VERSION, glGetString
+        self.renderer = glGetString(GL_RENDERER).decode()
+        self.version = glGetString(GL_VERSION).decode()
+
+    # ── EGL ──
+    def _egl_display(self, gpu_id):
+        from OpenGL import EGL
+        try:
+            from OpenGL.EGL.EXT.device_enumeration import eglQueryDevicesEXT
+            from OpenGL.EGL.EXT.platform_base import eglGetPlatformDisplayEXT
+            from OpenGL.EGL.EXT.platform_device import EGL_PLATFORM_DEVICE_EXT
+            devices = (EGL.EGLDeviceEXT * 16)()
+            count = EGL.EGLint()
+            if eglQueryDevicesEXT(16, devices, ctypes.pointer(count)) and gpu_id < count.value:
+                display = eglGetPlatformDisplayEXT(EGL_PLATFORM_DEVICE_EXT, devices[gpu_id], None)
+                if display and EGL.eglInitialize(display, None, None):
+                    return display
+        except Exception:
+            pass                         # 拡張が無い実装は既定ディスプレイにフォールバック
+        display = EGL.eglGetDisplay(EGL.EGL_DEFAULT_DISPLAY)
+        EGL.eglInitialize(display, None, None)
+        return display
+
+    def _create_egl(self, gpu_id):
+        from OpenGL import EGL
+        self.display = self._egl_display(gpu_id)
+        attrs = (EGL.EGLint * 13)(
+            EGL.EGL_SURFACE_TYPE, EGL.EGL_PBUFFER_BIT, EGL.EGL_RENDERABLE_TYPE, EGL.EGL_OPENGL_BIT,
+            EGL.EGL_RED_SIZE, 8, EGL.EGL_GREEN_SIZE, 8, EGL.EGL_BLUE_SIZE, 8, EGL.EGL_DEPTH_SIZE, 24,
+            EGL.EGL_NONE)
+        config, count = EGL.EGLConfig(), EGL.EGLint()
+        if not EGL.eglChooseConfig(self.display, attrs, ctypes.pointer(config), 1, ctypes.pointer(count)) \
+                or count.value == 0:
+            raise RuntimeError("no EGL config with pbuffer + desktop OpenGL")
+        surface_attrs = (EGL.EGLint * 5)(EGL.EGL_WIDTH, self.width, EGL.EGL_HEIGHT, self.height, EGL.EGL_NONE)
+        self.surface = EGL.eglCreatePbufferSurface(self.display, config, surface_attrs)
+        EGL.eglBindAPI(EGL.EGL_OPENGL_API)
+        context_attrs = (EGL.EGLint * 7)(
+            EGL.EGL_CONTEXT_MAJOR_VERSION, 3, EGL.EGL_CONTEXT_MINOR_VERSION, 3,
+            EGL.EGL_CONTEXT_OPENGL_PROFILE_MASK, EGL.EGL_CONTEXT_OPENGL_CORE_PROFILE_BIT, EGL.EGL_NONE)
+        self.context = EGL.eglCreateContext(self.display, config, EGL.EGL_NO_CONTEXT, context_attrs)
+        if not self.context or not EGL.eglMakeCurrent(self.display, self.surface, self.surface, self.context):
+            raise RuntimeError("could not make an EGL OpenGL 3.3 core context current")
+        EGL.eglSwapInterval(self.display, 0)
+
+    # ── OSMesa ──
+    def _create_osmesa(self):
+        from OpenGL import arrays, osmesa
+        from OpenGL.GL import GL_UNSIGNED_BYTE
+        attrs = arrays.GLintArray.asArray([
+            osmesa.OSMESA_FORMAT, osmesa.OSMESA_RGBA, osmesa.OSMESA_DEPTH_BITS, 24,
+            osmesa.OSMESA_PROFILE, osmesa.OSMESA_CORE_PROFILE,
+            osmesa.OSMESA_CONTEXT_MAJOR_VERSION, 3, osmesa.OSMESA_CONTEXT_MINOR_VERSION, 3, 0])
+        self.context = osmesa.OSMesaCreateContextAttribs(attrs, None)
+        self.buffer = arrays.GLubyteArray.zeros((self.height, self.width, 4))
+        if not self.context or not osmesa.OSMesaMakeCurrent(self.context, self.buffer, GL_UNSIGNED_BYTE,
+                                                            self.width, self.height):
+            raise RuntimeError("could not make an OSMesa OpenGL 3.3 core context current")
+
+    def release(self):
+        if self.backend == "egl":
+            from OpenGL import EGL
+            EGL.eglMakeCurrent(self.display, EGL.EGL_NO_SURFACE, EGL.EGL_NO_SURFACE, EGL.EGL_NO_CONTEXT)
+            EGL.eglDestroySurface(self.display, self.surface)
+            EGL.eglDestroyContext(self.display, self.context)
+            EGL.eglTerminate(self.display)
+        else:
+            from OpenGL import osmesa
+            osmesa.OSMesaDestroyContext(self.context)
+
+
+class FramebufferTarget:
+    """RGBA8 + 24 bit 深度のレンダーバッファを持つ FBO。bind() 以降の描画はここに入る"""
+
+    def __init__(self, width, height):
+        from OpenGL.GL import (GL_COLOR_ATTACHMENT0, GL_DEPTH_ATTACHMENT, GL_DEPTH_COMPONENT24,
+                               GL_FRAMEBUFFER, GL_FRAMEBUFFER_COMPLETE, GL_RENDERBUFFER, GL_RGBA8,
+                               glBindFramebuffer, glBindRenderbuffer, glCheckFramebufferStatus,
+                               glFramebufferRenderbuffer, glGenFramebuffers, glGenRenderbuffers,
+                               glRenderbufferStorage)
+        self.width, self.height = width, height
+        self.fbo = glGenFramebuffers(1)
+        self.color, self.depth = glGenRenderbuffers(2)
+        glBindFramebuffer(GL_FRAMEBUFFER, self.fbo)
+        for rbo, fmt, attachment in ((self.color, GL_RGBA8, GL_COLOR_ATTACHMENT0),
+                                     (self.depth, GL_DEPTH_COMPONENT24, GL_DEPTH_ATTACHMENT)):
+            glBindRenderbuffer(GL_RENDERBUFFER, rbo)
+            glRenderbufferStorage(GL_RENDERBUFFER, fmt, width, height)
+            glFramebufferRenderbuffer(GL_FRAMEBUFFER, attachment, GL_RENDERBUFFER, rbo)
+        status = glCheckFramebufferStatus(GL_FRAMEBUFFER)
+        if status != GL_FRAMEBUFFER_COMPLETE:
+            raise RuntimeError(f"framebuffer incomplete (0x{int(status):x}) at {width}x{height}")
+
+    def bind(self):
+        from OpenGL.GL import GL_FRAMEBUFFER, glBindFramebuffer, glViewport
+        glBindFramebuffer(GL_FRAMEBUFFER, self.fbo)
+        glViewport(0, 0, self.width, self.height)
+
+    def delete(self):
+        from OpenGL.GL import GL_FRAMEBUFFER, glBindFramebuffer, glDeleteFramebuffers, glDeleteRenderbuffers
+        glBindFramebuffer(GL_FRAMEBUFFER, 0)
+        glDeleteRenderbuffers(2, [self.color, self.depth])
+        glDeleteFramebuffers(1, [self.fbo])
+
+
+def parse_size(size) -> tuple[int, int]:
+    """"1920x1080" → (1920, 1080)"""
+    width, height = (int(v) for v in str(size).lower().split("x"))
+    if width <= 0 or height <= 0:
+        raise ValueError(f"invalid render size: {size!r}")
+    return width, height
+
+
+def apply_offscreen_load(load_percentage, stop_event, gpu_id, size="1920x1080", passes=1, batches=1,
+                         backend=None, level=None, log=print):
+    """
+    ウィンドウ無しの 3D 描画負荷。停止まで FBO に描き続け、InstancedRenderer.stats() を返す。
+    level (cpu_load.make_load_level() の共有値) を渡すと実行中にインスタンス数が追従する。
+    """
+    width, height = parse_size(size)
+    ctx = OffscreenContext(16, 16, gpu_id, backend)          # 描画先は FBO なので pbuffer は最小限
+    try:
+        from gpu_load.gl_instanced import FRAME_DT, InstancedRenderer, instances_for_load
+    except ImportError:
+        from gl_instanced import FRAME_DT, InstancedRenderer, instances_for_load
+    from OpenGL.GL import GL_SYNC_FLUSH_COMMANDS_BIT, GL_SYNC_GPU_COMMANDS_COMPLETE, \
+        glClientWaitSync, glDeleteSync, glFenceSync, glFinish
+
+    log(f"[INFO] Offscreen render on GPU {gpu_id}: {ctx.renderer} ({ctx.backend}), {width}x{height}, "
+        f"{passes} passes, {batches} batches")
+    target = FramebufferTarget(width, height)
+    target.bind()
+    renderer = InstancedRenderer(width, height, instances_for_load(load_percentage), batches=batches, passes=passes)
+    target.bind()                                            # レンダラの初期化でビューポートが変わっても FBO に戻す
+    fences = deque()
+    try:
+        while not stop_event.is_set():
+            if level is not None:
+                renderer.set_instances(instances_for_load(level.value))
+            renderer.draw(renderer.frames * FRAME_DT)
+            fences.append(glFenceSync(GL_SYNC_GPU_COMMANDS_COMPLETE, 0))
+            if len(fences) > FRAMES_IN_FLIGHT:
+                # 2 フレーム前の完了だけを待つ: キューを溜めすぎず、GPU も空けない
+                fence = fences.popleft()
+                glClientWaitSync(fence, GL_SYNC_FLUSH_COMMANDS_BIT, 1_000_000_000)
+                glDeleteSync(fence)
+            renderer.report(log)
+        glFinish()
+        stats = renderer.stats()
+        log(f"[INFO] Offscreen render on GPU {gpu_id} finished: {stats['fps']:.1f} FPS, "
+            f"{stats['tris_per_sec'] / 1e6:.2f} M triangles/s")
+        return stats
+    finally:
+        for fence in fences:
+            glDeleteSync(fence)
+        renderer.delete()
+        target.delete()
+        ctx.release()
+
+
+if __name__ == "__main__":
+    # ウィンドウ無しで描画負荷を計測: python gl_offscreen.py --load 50 --seconds 5 --size 1280x720
+    import argparse
+    import threading
+    parser = argparse.ArgumentParser(description="Offscreen instanced render load")
+    parser.add_argument("--backend", choices=BACKENDS, default=None)
+    parser.add_argument("--gpu", type=int, default=0)
+    parser.add_argument("--load", type=float, default=50.0, help="load %% (scales the instance count)")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--size", default="1920x1080")
+    parser.add_argument("--passes", type=int, default=1, help="overdraw passes per frame")
+    parser.add_argument("--batches", type=int, default=1, help="draw calls per mesh per pass")
+    args = parser.parse_args()
+    stop = threading.Event()
+    threading.Timer(args.seconds, stop.set).start()
+    apply_offscreen_load(args.load, stop, args.gpu, args.size, args.passes, args.batches, args.backend)
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+gpu_kernels.py  ―  GPU Tensor 負荷ワークロード集 (TensorLoadEngine の burst で回す)
+  ・fp32 / fp16 / bf16 : 正方 GEMM (fp16 / bf16 は Tensor Core 経路)   → TFLOP/s
+  ・int8               : int8 × int8 → int32 GEMM (torch._int_mm)      → TOP/s
+  ・batched            : 小さな GEMM を大量に (torch.bmm)                → TFLOP/s
+  ・conv               : 3x3 畳み込みスタックの forward                   → TFLOP/s
+  ・elementwise        : addcmul → mul → add の連鎖 (メモリ帯域律速)    → GB/s
+  ・training           : nn.Module (MLP) の forward / backward / SGD 更新 → TFLOP/s
+オペランドとモジュールは最初に 1 回だけ確保し、step() は演算を発行して仕事量を返すだけ。
+step() は CUDA graph に capture できる (capturable = False の training を除く)。
+script_loop() は steps 回の step() を TorchScript のループで回す関数を返す (CPU の graph モード用)。
+torch は各クラスの中で読み込む (WORKLOADS は GUI から torch 無しで参照できる)。
+CPU デバイスでも動く (サイズは小さくなる)。
+"""
+
+WORKLOADS = {
+    "fp32":        "FP32 GEMM",
+    "fp16":        "FP16 GEMM (tensor cores)",
+    "bf16":        "BF16 GEMM (tensor cores)",
+    "int8":        "INT8 GEMM (int32 accumulate)",
+    "batched":     "batched small GEMMs",
+    "conv":        "3x3 convolution stack",
+    "elementwise": "memory-bound elementwise chain",
+    "training":    "nn.Module forward/backward training step",
+}
+DEFAULT_WORKLOAD = "fp32"
+
+MODES = {
+    "eager": "launch every step from Python",
+    "graph": "replay captured CUDA graphs on several streams (TorchScript loop on CPU)",
+}
+DEFAULT_MODE = "eager"
+
+
+def _generator(device):
+    import torch
+    return torch.Generator(device=device).manual_seed(0)
+
+
+def _script(fn):
+    import warnings
+    import torch
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", FutureWarning)      # torch.jit は非推奨扱いだが CPU ではまだ一番軽い
+        return torch.jit.script(fn)
+
+
+class GemmWorkload:
+    unit, scale = "TFLOP/s", 1e12
+    capturable = True
+
+    def __init__(self, device, dtype_name="fp32", n=None):
+        import torch
+        dtype = {"fp32": torch.float32, "fp16": torch.float16, "bf16": torch.bfloat16}[dtype_name]
+        n = n or (8192 if device.type == "cuda" and dtype != torch.float32 else
+                  4096 if device.type == "cuda" else 512)
+        gen = _generator(device)
+        self.a = torch.randn((n, n), device=device, generator=gen).to(dtype)
+        self.b = torch.randn((n, n), device=device, generator=gen).to(dtype)
+        self.c = torch.empty((n, n), device=device, dtype=dtype)
+        self.work = 2.0 * n ** 3
+
+    def step(self) -> float:
+        import torch
+        torch.matmul(self.a, self.b, out=self.c)
+        return self.work
+
+    def script_loop(self):
+        import torch
+
+        def loop(a: torch.Tensor, b: torch.Tensor, c: torch.Tensor, steps: int):
+            for _ in range(steps):
+                torch.matmul(a, b, out=c)
+        fn = _script(loop)
+        return lambda steps: fn(self.a, self.b, self.c, steps)
+
+
+class Int8GemmWorkload:
+    unit, scale = "TOP/s", 1e12
+    capturable = True
+
+    def __init__(self, device, n=None):
+        import torch
+        n = n or (8192 if device.type == "cuda" else 512)      # _int_mm は 8 の倍数が必要
+        gen = _generator(device)
+        self.a = torch.randint(-128, 128, (n, n), device=device, dtype=torch.int8, generator=gen)
+        self.b = torch.randint(-128, 128, (n, n), device=device, dtype=torch.int8, generator=gen)
+        self.c = torch.empty((n, n), device=device, dtype=torch.int32)
+        self.work = 2.0 * n ** 3
+
+    def step(self) -> float:
+        import torch
+        torch._int_mm(self.a, self.b, out=self.c)
+        return self.work
+
+    def script_loop(self):
+        import torch
+
+        def loop(a: torch.Tensor, b: torch.Tensor, c: torch.Tensor, steps: int):
+            for _ in range(steps):
+                torch._int_mm(a, b, out=c)
+        fn = _script(loop)
+        return lambda steps: fn(self.a, self.b, self.c, steps)
+
+
+class BatchedGemmWorkload:
+    unit, scale = "TFLOP/s", 1e12
+    capturable = True
+
+    def __init__(self, device, batch=None, n=64):
+        import torch
+        batch = batch or (4096 if device.type == "cuda" else 256)
+        dtype = torch.float16 if device.type == "cuda" else torch.float32
+        gen = _generator(device)
+        self.a = torch.randn((batch, n, n), device=device, generator=gen).to(dtype)
+        self.b = torch.randn((batch, n, n), device=device, generator=gen).to(dtype)
+        self.c = torch.empty((batch, n, n), device=device, dtype=dtype)
+        self.work = 2.0 * batch * n ** 3
+
+    def step(self) -> float:
+        import torch
+        torch.bmm(self.a, self.b, out=self.c)
+        return self.work
+
+    def script_loop(self):
+        import torch
+
+        def loop(a: torch.Tensor, b: torch.Tensor, c: torch.Tensor, steps: int):
+            for _ in range(steps):
+                torch.bmm(a, b, out=c)
+        fn = _script(loop)
+        return lambda steps: fn(self.a, self.b, self.c, steps)
+
+
+class ConvWorkload:
+    unit, scale = "TFLOP/s", 1e12
+    capturable = True
+
+    def __init__(self, device, layers=4, channels=None, size=None, batch=None):
+        import torch
+        cuda = device.type == "cuda"
+        channels = channels or (256 if cuda else 32)
+        size = size or (56 if cuda else 28)
+        batch = batch or (32 if cuda else 4)
+        dtype = torch.float16 if cuda else torch.float32
+        torch.manual_seed(0)
+        self.net = torch.nn.Sequential(*[
+            torch.nn.Conv2d(channels, channels, 3, padding=1, bias=False) for _ in range(layers)
+        ]).to(device=device, dtype=dtype).eval()
+        self.x = torch.randn((batch, channels, size, size), device=device, generator=_generator(device)).to(dtype)
+        self.work = 2.0 * layers * batch * channels * channels * 9 * size * size
+
+    def step(self) -> float:
+        import torch
+        with torch.no_grad():
+            self.net(self.x)
+        return self.work
+
+    def script_loop(self):
+        import torch
+        net = _script(self.net)
+
+        def run(steps):
+            with torch.no_grad():
+                for _ in range(steps):
+                    net(self.x)
+        return run
+
+
+class ElementwiseWorkload:
+    unit, scale = "GB/s", 1e9
+    capturable = True
+
+    def __init__(self, device, numel=None):
+        import torch
+        numel = numel or (64 * 2**20 if device.type == "cuda" else 2**20)
+        gen = _generator(device)
+        self.a = torch.randn(numel, device=device, generator=gen)
+        self.b = torch.randn(numel, device=device, generator=gen)
+        self.c = torch.randn(numel, device=device, generator=gen)
+        self.y = torch.empty_like(self.a)
+        # addcmul: 3 読み + 1 書き / mul_: 1 読み + 1 書き / add_: 2 読み + 1 書き
+        self.work = float((4 + 2 + 3) * numel * self.a.element_size())
+
+    def step(self) -> float:
+        import torch
+        torch.addcmul(self.c, self.a, self.b, out=self.y)
+        self.y.mul_(0.5)
+        self.y.add_(self.a)
+        return self.work
+
+    def script_loop(self):
+        import torch
+
+        def loop(a: torch.Tensor, b: torch.Tensor, c: torch.Tensor, y: torch.Tensor, steps: int):
+            for _ in range(steps):
+                torch.addcmul(c, a, b, out=y)
+                y.mul_(0.5)
+                y.add_(a)
+        fn = _script(loop)
+        return lambda steps: fn(self.a, self.b, self.c, self.y, steps)
+
+
+class TrainingWorkload:
+    """MLP の forward / backward / SGD 更新 1 回を 1 step とする (CUDA では bf16 autocast)"""
+    unit, scale = "TFLOP/s", 1e12
+    capturable = False      # autograd + optimizer は graph capture せず eager で回す
+
+    def __init__(self, device, width=None, depth=4, batch=None):
+        import torch
+        cuda = device.type == "cuda"
+        width = width or (4096 if cuda else 256)
+        batch = batch or (2048 if cuda else 64)
+        torch.manual_seed(0)
+        layers = []
+        for _ in range(depth):
+            layers += [torch.nn.Linear(width, width), torch.nn.GELU()]
+        self.model = torch.nn.Sequential(*layers).to(device).train()
+        self.opt = torch.optim.SGD(self.model.parameters(), lr=1e-4)
+        gen = _generator(device)
+        self.x = torch.randn((batch, width), device=device, generator=gen)
+        self.target = torch.randn((batch, width), device=device, generator=gen)
+        self.device_type = device.type
+        self.autocast = cuda
+        # forward 2·B·W² と backward (入力勾配 + 重み勾配) 4·B·W² を層ごとに
+        self.work = 6.0 * depth * batch * width * width
+
+    def step(self) -> float:
+        import torch
+        with torch.autocast(self.device_type, dtype=torch.bfloat16, enabled=self.autocast):
+            loss = torch.nn.functional.mse_loss(self.model(self.x), self.target)
+        self.opt.zero_grad(set_to_none=False)
+        loss.backward()
+        self.opt.step()
+        return self.work
+
+    def script_loop(self):
+        return None
+
+
+def make_workload(name: str, device):
+    """name は WORKLOADS のいずれか。device は torch.device"""
+    if name in ("fp32", "fp16", "bf16"):
+        return GemmWorkload(device, name)
+    factories = {
+        "int8": Int8GemmWorkload,
+        "batched": BatchedGemmWorkload,
+        "conv": ConvWorkload,
+        "elementwise": ElementwiseWorkload,
+        "training": TrainingWorkload,
+    }
+    if name not in factories:
+        raise ValueError(f"unknown GPU workload: {name!r} (choose from {', '.join(WORKLOADS)})")
+    return factories[name](device)
+
+
+if __name__ == "__main__":
+    # 各ワークロードを 1 秒ずつ全力で回して達成値を表示
+    import sys
+    import time
+    import torch
+    device = torch.device(sys.argv[1] if len(sys.argv) > 1 else
+                          "cuda:0" if torch.cuda.is_available() else "cpu")
+    for name, desc in WORKLOADS.items():
+        try:
+            w = make_workload(name, device)
+        except (RuntimeError, ValueError) as e:
+            print(f"{name:12s} unavailable on {device}: {e}")
+            continue
+        w.step()
+        work, t0 = 0.0, time.perf_counter()
+        while time.perf_counter() - t0 < 1.0:
+            work += w.step()
+        if device.type == "cuda":
+            torch.cuda.synchronize(device)
+        rate = work / (time.perf_counter() - t0) / w.scale
+        print(f"{name:12s} {rate:10.3f} {w.unit:8s} {desc}")
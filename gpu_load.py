@@ -1,333 +1,380 @@
-import pygame
-from pygame.locals import *
-import sys
-from OpenGL.GL import *
-from OpenGL.GLU import *
+import os
 import threading
 import time
-import numpy as np
 import torch
 
+try:
+    from cpu_load.cpu_load import (DutyCycleController, LoadErrorLog, DEFAULT_TOLERANCE,
+                                   REPORT_SEC, SLICE_SEC)
+except ImportError:
+    from cpu_load import DutyCycleController, LoadErrorLog, DEFAULT_TOLERANCE, REPORT_SEC, SLICE_SEC
+try:
+    from gpu_load.vram_fill import TorchVramProvider, VramFiller
+    from gpu_load.vram_patterns import VramPatternTest
+except ImportError:
+    from vram_fill import TorchVramProvider, VramFiller
+    from vram_patterns import VramPatternTest
+try:
+    from gpu_load.gpu_kernels import DEFAULT_MODE, DEFAULT_WORKLOAD, MODES, WORKLOADS, make_workload
+except ImportError:
+    from gpu_kernels import DEFAULT_MODE, DEFAULT_WORKLOAD, MODES, WORKLOADS, make_workload
+
+# (1) OpenGL レンダリング負荷は gpu_render.py (pygame / OpenGL を使うときだけ読み込む)
 
-######################################
-#  OpenGL 用のライティング初期化
-######################################
-def initialize_lighting():
-    glEnable(GL_LIGHTING)
-    glEnable(GL_LIGHT0)
-    light_position = [10.0, 10.0, 10.0, 1.0]
-    glLightfv(GL_LIGHT0, GL_POSITION, light_position)
-    glLightfv(GL_LIGHT0, GL_DIFFUSE, [1.0, 1.0, 1.0, 1.0])
-    glLightfv(GL_LIGHT0, GL_SPECULAR, [1.0, 1.0, 1.0, 1.0])
-    glEnable(GL_COLOR_MATERIAL)
-
-######################################
-#  テクスチャ読み込み
-######################################
-def load_texture():
-    try:
-        print("Loading texture...")
-        texture_surface = pygame.image.load('texture.jpg')
-        print("Texture loaded successfully.")
-
-        texture_data = pygame.image.tostring(texture_surface, 'RGB', 1)
-        width = texture_surface.get_width()
-        height = texture_surface.get_height()
-
-        glEnable(GL_TEXTURE_2D)
-        texture_id = glGenTextures(1)
-        glBindTexture(GL_TEXTURE_2D, texture_id)
-        glTexImage2D(GL_TEXTURE_2D, 0, GL_RGB, width, height, 0,
-                     GL_RGB, GL_UNSIGNED_BYTE, texture_data)
-        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
-        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
-
-        print(f"Texture ID generated: {texture_id}")
-        return texture_id
-    except pygame.error as e:
-        print(f"Error loading texture: {e}")
-        return None
 
 ######################################
-#  回転する立体をまとめて描画する
-######################################
-def draw_rotating_shapes(texture_id, rotation_angle):
-    if texture_id:
-        glEnable(GL_TEXTURE_2D)
-        glBindTexture(GL_TEXTURE_2D, texture_id)
-    else:
-        glDisable(GL_TEXTURE_2D)
-
-    shapes = ["cube", "sphere", "cone"]
-    np.random.shuffle(shapes)
-
-    for shape in shapes:
-        glPushMatrix()
-        glTranslatef(np.random.uniform(-3, 3),
-                     np.random.uniform(-3, 3),
-                     np.random.uniform(-3, 3))
-        glRotatef(rotation_angle, 1, 1, 1)
-
-        if shape == "cube":
-            draw_cube()
-        elif shape == "sphere":
-            draw_sphere(0.5, 20, 20)
-        elif shape == "cone":
-            draw_cone(0.5, 1.0, 20, 20)
-        glPopMatrix()
-
-    error = glGetError()
-    if error != GL_NO_ERROR:
-        print(f"OpenGL Error (draw_shapes): {gluErrorString(error)}")
-
-######################################
-#  キューブ描画
-######################################
-def draw_cube():
-    vertices = [
-        (-1, -1, -1),
-        ( 1, -1, -1),
-        ( 1,  1, -1),
-        (-1,  1, -1),
-        (-1, -1,  1),
-        ( 1, -1,  1),
-        ( 1,  1,  1),
-        (-1,  1,  1)
-    ]
-
-    faces = [
-        (0, 1, 2, 3),
-        (4, 5, 6, 7),
-        (0, 4, 7, 3),
-        (1, 5, 6, 2),
-        (3, 2, 6, 7),
-        (0, 1, 5, 4)
-    ]
-
-    tex_coords = [
-        (0, 0),
-        (1, 0),
-        (1, 1),
-        (0, 1)
-    ]
-
-    glBegin(GL_QUADS)
-    for face in faces:
-        for i, vertex in enumerate(face):
-            glTexCoord2fv(tex_coords[i % len(tex_coords)])
-            glVertex3fv(vertices[vertex])
-    glEnd()
-
-    error = glGetError()
-    if error != GL_NO_ERROR:
-        print(f"OpenGL Error (draw_cube): {gluErrorString(error)}")
-
-######################################
-#  球体描画
-######################################
-def draw_sphere(radius, slices, stacks):
-    quadric = gluNewQuadric()
-    gluQuadricTexture(quadric, GL_TRUE)
-    glColor3f(0.0, 0.0, 1.0)
-    gluSphere(quadric, radius, slices, stacks)
-    gluDeleteQuadric(quadric)
-
-    error = glGetError()
-    if error != GL_NO_ERROR:
-        print(f"OpenGL Error (draw_sphere): {gluErrorString(error)}")
-
-######################################
-#  円錐描画
+#  (2) Tensor 計算で GPU に負荷
 ######################################
-def draw_cone(base, height, slices, stacks):
-    quadric = gluNewQuadric()
-    gluQuadricTexture(quadric, GL_TRUE)
-    glColor3f(1.0, 0.0, 0.0)
-    gluCylinder(quadric, base, 0.0, height, slices, stacks)
-    gluDeleteQuadric(quadric)
-
-    error = glGetError()
-    if error != GL_NO_ERROR:
-        print(f"OpenGL Error (draw_cone): {gluErrorString(error)}")
-
-#########################################################
-# (1) GPU 負荷 (OpenGL レンダリング) - 修正版
-#########################################################
-def apply_gpu_load(load_percentage, stop_event, gpu_id):
+class CudaGraphBurst:
     """
-    OpenGL を使って 3D 描画負荷をかける (修正版)。
-    - sys.exit() を使わず、stop_event またはウィンドウを閉じると終了。
-    - 再度テストしてもセグフォが起きにくいようにする。
+    ワークロードごとに step() を steps_per_graph 回ぶん CUDA graph に capture し、
+    各ワークロード専用のストリームで並行に replay する。
+    Python からの起動は replay 1 回 / グラフで、ホスト同期は呼び出しの最後の 1 回だけ。
     """
-    pygame.init()
-    screen = pygame.display.set_mode((800, 600), DOUBLEBUF | OPENGL)
-    pygame.display.set_caption(f"GPU Load Test (GPU {gpu_id})")
-
-    glMatrixMode(GL_PROJECTION)
-    glLoadIdentity()
-    gluPerspective(45, (800 / 600), 0.1, 50.0)
-    glMatrixMode(GL_MODELVIEW)
 
-    glEnable(GL_DEPTH_TEST)
-    glDepthFunc(GL_LESS)
-    initialize_lighting()
-    texture_id = load_texture()
-    rotation_angle = 0
-
-    if texture_id is None:
-        print("[DEBUG] Texture loading failed; proceeding without texture.")
-
-    glClearColor(0.3, 0.3, 0.3, 1.0)
-
-    while not stop_event.is_set():
-        # イベント処理
-        for event in pygame.event.get():
-            if event.type == QUIT:
-                # ウィンドウ閉じる操作が来たら stop_event を立ててループを抜ける
-                print("[DEBUG] Window close event -> stopping GPU load.")
-                stop_event.set()
-
-        glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
-        glLoadIdentity()
-
-        gluLookAt(
-            0.0, 0.0, 15.0,
-            0.0, 0.0, 0.0,
-            0.0, 1.0, 0.0
-        )
-
-        draw_rotating_shapes(texture_id, rotation_angle)
-        rotation_angle += load_percentage / 10.0
-
-        pygame.display.flip()
-        glFlush()
-        time.sleep(0.01)
-
-        error = glGetError()
-        if error != GL_NO_ERROR:
-            print(f"OpenGL Error (main loop): {gluErrorString(error)}")
-
-    # ループ終了時にウィンドウを閉じる
-    print("[DEBUG] Exiting GPU load loop. Doing pygame.quit() ...")
-    pygame.quit()
-    print("[DEBUG] Pygame quit. Thread returning now.")
-
-######################################
-#  (2) Tensor 計算で GPU に負荷
-######################################
-def tensor_calculation(load_percentage, stop_event, gpu_id):
-    torch.cuda.set_device(gpu_id)
-    while not stop_event.is_set():
-        a = torch.rand((8000, 8000), device='cuda')
-        b = torch.rand((8000, 8000), device='cuda')
-        _ = torch.matmul(a, b)
-        torch.cuda.synchronize()
-        time.sleep(1 / (load_percentage + 1))
+    def __init__(self, workloads, device, steps_per_graph=8):
+        self.device = device
+        self.streams = [torch.cuda.Stream(device) for _ in workloads]
+        self.graphs = []
+        self.work = 0.0                      # 1 ラウンド (全グラフを 1 回ずつ replay) の仕事量
+        main = torch.cuda.current_stream(device)
+        for workload, stream in zip(workloads, self.streams):
+            # capture 前に別ストリームでウォームアップ (cuBLAS のワークスペース確保など)
+            stream.wait_stream(main)
+            with torch.cuda.stream(stream):
+                for _ in range(3):
+                    workload.step()
+            main.wait_stream(stream)
+            graph = torch.cuda.CUDAGraph()
+            with torch.cuda.graph(graph, stream=stream):
+                for _ in range(steps_per_graph):
+                    self.work += workload.step()
+            self.graphs.append(graph)
+        self._start = torch.cuda.Event(enable_timing=True)
+        self._end = torch.cuda.Event(enable_timing=True)
+        self._done = [torch.cuda.Event() for _ in self.streams]
+
+    def __call__(self, rounds):
+        """rounds 回ずつ全グラフを replay し、(実行時間 [s], 仕事量) を返す"""
+        main = torch.cuda.current_stream(self.device)
+        self._start.record(main)
+        for stream, graph, done in zip(self.streams, self.graphs, self._done):
+            stream.wait_event(self._start)
+            with torch.cuda.stream(stream):
+                for _ in range(rounds):
+                    graph.replay()
+                done.record(stream)
+            main.wait_event(done)
+        self._end.record(main)
+        self._end.synchronize()
+        return self._start.elapsed_time(self._end) / 1000.0, rounds * self.work
+
+
+class TensorLoadEngine:
+    """
+    確保済みオペランドで step() をまとめて流す burst と idle を SLICE_SEC ごとに繰り返し、
+    burst 時間 / 経過時間 を PI 制御して目標使用率に合わせる。
+    burst の計時は CUDA では cuda.Event、CPU デバイスでは perf_counter。
+    workload は gpu_kernels.WORKLOADS の名前 (またはワークロードのインスタンス)。
+    mode="graph" では CUDA graph を streams 本のストリームで replay し (CudaGraphBurst)、
+    ホスト同期は制御周期ごとに 1 回にする。CPU デバイスでは TorchScript のループで回す。
+    capture / script できないワークロード (training) は eager のまま動かす。
+    """
 
-def apply_gpu_tensor_load(load_percentage, stop_event, gpu_ids):
+    def __init__(self, device="cuda:0", workload=DEFAULT_WORKLOAD, slice_sec=SLICE_SEC, burst_sec=0.005,
+                 mode=DEFAULT_MODE, streams=2):
+        if mode not in MODES:
+            raise ValueError(f"unknown tensor load mode: {mode!r} (choose from {', '.join(MODES)})")
+        self.device = torch.device(device)
+        self.is_cuda = self.device.type == "cuda"
+        if self.is_cuda:
+            torch.cuda.set_device(self.device)
+        # graph モードではストリームごとに別のオペランドを持たせる (同じ出力への書き込み競合を避ける)
+        copies = streams if mode == "graph" and self.is_cuda and isinstance(workload, str) else 1
+        workloads = [make_workload(workload, self.device) if isinstance(workload, str) else workload
+                     for _ in range(copies)]
+        self.workload = workloads[0]
+        self.slice_sec = slice_sec
+        self.burst_sec = burst_sec
+        if self.is_cuda:
+            self._start = torch.cuda.Event(enable_timing=True)
+            self._end = torch.cuda.Event(enable_timing=True)
+        self.mode = "eager"
+        self._burst = self._eager_burst
+        if mode == "graph":
+            self._setup_graph(workloads)
+        self.step_sec = self._calibrate()
+
+    def _setup_graph(self, workloads):
+        name = type(self.workload).__name__
+        if self.is_cuda:
+            if not getattr(self.workload, "capturable", False):
+                print(f"[WARN] {name} cannot be captured as a CUDA graph; running it eagerly")
+                return
+            self._burst = CudaGraphBurst(workloads, self.device)
+        else:
+            loop = self.workload.script_loop()
+            if loop is None:
+                print(f"[WARN] {name} has no TorchScript loop; running it eagerly")
+                return
+            self._burst = lambda steps: self._scripted_burst(loop, steps)
+        self.mode = "graph"
+        self.burst_sec = self.slice_sec      # 1 制御周期 = 1 burst = ホスト同期 1 回
+
+    def _scripted_burst(self, loop, steps):
+        t0 = time.perf_counter()
+        loop(steps)
+        return time.perf_counter() - t0, steps * self.workload.work
+
+    def _eager_burst(self, steps):
+        """steps 回の step() を流し、(実行時間 [s], 仕事量) を返す"""
+        work = 0.0
+        if self.is_cuda:
+            self._start.record()
+            for _ in range(steps):
+                work += self.workload.step()
+            self._end.record()
+            self._end.synchronize()
+            return self._start.elapsed_time(self._end) / 1000.0, work
+        t0 = time.perf_counter()
+        for _ in range(steps):
+            work += self.workload.step()
+        return time.perf_counter() - t0, work
+
+    def _calibrate(self):
+        self._burst(2)                      # ウォームアップ (cuBLAS の初期化など)
+        elapsed, _ = self._burst(3)
+        return max(elapsed / 3, 1e-6)
+
+    def run(self, load_percentage, stop_event, level=None, tolerance=DEFAULT_TOLERANCE,
+            on_report=None, label=None, on_slice=None, error_log=None):
+        """
+        停止まで負荷をかけ、LoadErrorLog.summary() を返す。
+        level (make_load_level() の共有値) を渡すと実行中に負荷率を変更できる。
+        実行中の集計は self.log (on_report から累積仕事量などを読める)。
+        error_log に LoadErrorLog を渡すとそこに集計する (unit / scale はワークロードのものに揃える)。
+        on_slice はスライスごとに呼ぶ (ワーカープロセスの心拍。GPU 呼び出しが返らなければ止まる)。
+        """
+        label = label if label is not None else (self.device.index or 0)
+        if error_log is None:
+            error_log = LoadErrorLog(load_percentage, tolerance)
+        log = self.log = error_log
+        log.unit, log.scale = self.workload.unit, self.workload.scale
+        ctrl = DutyCycleController(load_percentage / 100.0)
+        acc, n, work, busy_sum, last_report = 0.0, 0, 0.0, 0.0, time.time()
+        while not stop_event.is_set():
+            if level is not None:
+                ctrl.target = min(1.0, max(0.0, level.value / 100.0))
+                log.set_target(ctrl.target * 100.0)
+            t0 = time.perf_counter()
+            target_busy = self.slice_sec * ctrl.duty
+            busy = 0.0
+            while busy < target_busy and not stop_event.is_set():
+                # 残り時間に収まる step 数 (1 burst は burst_sec 程度で区切って停止に反応する)
+                remaining = target_busy - busy
+                steps = max(1, min(round(remaining / self.step_sec), round(self.burst_sec / self.step_sec) or 1))
+                elapsed, done = self._burst(steps)
+                self.step_sec = 0.8 * self.step_sec + 0.2 * elapsed / steps
+                busy += elapsed
+                work += done
+            time.sleep(max(0.0, self.slice_sec - (time.perf_counter() - t0)))
+            measured = busy / (time.perf_counter() - t0)
+            ctrl.update(measured)
+            if on_slice:
+                on_slice()
+            busy_sum += busy
+            acc += measured; n += 1
+            if time.time() - last_report >= REPORT_SEC:
+                error = log.add(time.time(), label, acc / n * 100.0, ctrl.duty, work, busy_sum)
+                if on_report and error is not None:
+                    on_report(label, error)
+                acc, n, work, busy_sum, last_report = 0.0, 0, 0.0, 0.0, time.time()
+        return log.summary()
+
+
+def tensor_calculation(load_percentage, stop_event, gpu_id, level=None, device=None,
+                       workload=DEFAULT_WORKLOAD, mode=DEFAULT_MODE, error_log=None):
+    engine = TensorLoadEngine(device or f"cuda:{gpu_id}", workload, mode=mode)
+    summary = engine.run(load_percentage, stop_event, level=level, label=gpu_id, error_log=error_log)
+    if summary["samples"]:
+        print(f"[INFO] GPU {gpu_id} {workload} ({engine.mode}) load {summary['target']:g}%: "
+              f"mean |err| {summary['mean_abs_error']:.2f}%, "
+              f"{summary.get('throughput', 0.0):.2f} {engine.workload.unit}")
+    return summary
+
+def apply_gpu_tensor_load(load_percentage, stop_event, gpu_ids, level=None, workload=DEFAULT_WORKLOAD,
+                          mode=DEFAULT_MODE, results=None, error_logs=None):
     """
     PyTorch の Tensor 演算を使って負荷をかける。
     停止時は stop_event をセットしてループを抜ける。
+    level (cpu_load.make_load_level() の共有値) を渡すと実行中に負荷率を変更できる。
+    workload は gpu_kernels.WORKLOADS のいずれか (fp16 / bf16 / int8 / training など)。
+    mode="graph" は CUDA graph の replay で起動コストと GIL の取り合いを減らす (多 GPU 向け)。
+    results に dict を渡すと "tensor:<GPU>" ごとの結果 (例外なら {"error": ...}) が入る。起動したスレッドのリストを返す。
+    error_logs ({GPU: LoadErrorLog}) を渡すと各 GPU の集計をそこに入れる (途中の区間のスループットを見たいとき)。
     """
-    print(f"Starting GPU Tensor Load with {load_percentage}% on GPUs: {gpu_ids}")
+    if workload not in WORKLOADS:
+        raise ValueError(f"unknown GPU workload: {workload!r} (choose from {', '.join(WORKLOADS)})")
+    if mode not in MODES:
+        raise ValueError(f"unknown tensor load mode: {mode!r} (choose from {', '.join(MODES)})")
+    print(f"Starting GPU Tensor Load ({workload}, {mode}) with {load_percentage}% on GPUs: {gpu_ids}")
+    threads = []
     for gpu_id in gpu_ids:
-        threading.Thread(
-            target=tensor_calculation,
-            args=(load_percentage, stop_event, gpu_id),
-            daemon=True
-        ).start()
+        threads.append(_start(results, f"tensor:{gpu_id}", tensor_calculation,
+                              load_percentage, stop_event, gpu_id, level, None, workload, mode,
+                              error_log=(error_logs or {}).get(gpu_id)))
+    return threads
 
 ######################################
 #  (3) 3D 描画 + Tensor 計算の複合負荷
 ######################################
-def apply_combined_load(load_percentage, stop_event, gpu_ids):
+def render_load(load_percentage, stop_event, gpu_id, level=None, offscreen=None, size="1920x1080",
+                passes=1, batches=1, backend=None):
+    """
+    3D 描画負荷を 1 GPU に。offscreen=None はディスプレイが無ければ FBO 描画 (gl_offscreen.py)、
+    あれば従来の pygame ウィンドウ (gpu_render.py)。level / size / passes / batches はどちらでも有効
+    (ウィンドウでは size がウィンドウの解像度)。backend は offscreen のみ。
+    """
+    if offscreen is None:
+        offscreen = not os.environ.get("DISPLAY") and not os.environ.get("WAYLAND_DISPLAY")
+    if offscreen:
+        try:
+            from gpu_load.gl_offscreen import apply_offscreen_load
+        except ImportError:
+            from gl_offscreen import apply_offscreen_load
+        return apply_offscreen_load(load_percentage, stop_event, gpu_id, size, passes, batches,
+                                    backend=backend, level=level)
+    try:
+        from gpu_load.gpu_render import apply_gpu_load
+    except ImportError:
+        from gpu_render import apply_gpu_load
+    return apply_gpu_load(load_percentage, stop_event, gpu_id, level=level, size=size,
+                          passes=passes, batches=batches)
+
+
+def apply_combined_load(load_percentage, stop_event, gpu_ids, level=None, workload=DEFAULT_WORKLOAD,
+                        mode=DEFAULT_MODE, render=None, results=None):
     """
     GPU 上で Tensor 計算 + OpenGL レンダリングを同時に行う。
     OpenGL スレッドでは sys.exit() せず、stop_event で終了管理。
+    pygame / OpenGL は描画スレッドで初めて読み込む (Tensor 負荷だけなら不要)。
+    render は render_load() の引数 (offscreen, size, passes, batches, backend)。
+    results に dict を渡すと "tensor:<GPU>" / "render:<GPU>" ごとの結果 (例外なら {"error": ...}) が入る。
+    起動したスレッドのリストを返す。
     """
+    threads = []
     for gpu_id in gpu_ids:
         # Tensor
-        threading.Thread(
-            target=tensor_calculation,
-            args=(load_percentage, stop_event, gpu_id),
-            daemon=True
-        ).start()
-
-        # OpenGL (修正版)
-        threading.Thread(
-            target=apply_gpu_load,
-            args=(load_percentage, stop_event, gpu_id),
-            daemon=True
-        ).start()
+        threads.append(_start(results, f"tensor:{gpu_id}", tensor_calculation,
+                              load_percentage, stop_event, gpu_id, level, None, workload, mode))
+        # OpenGL (ウィンドウ or オフスクリーン FBO)
+        threads.append(_start(results, f"render:{gpu_id}", render_load,
+                              load_percentage, stop_event, gpu_id, level, **(render or {})))
+    return threads
 
 
 ######################################
 #  (4) VRAM 負荷 (単純版: 電力しきい値なし)
 ######################################
-def apply_gpu_vram_load(vram_percentage, stop_event, gpu_ids):
+def apply_gpu_vram_load(vram_percentage, stop_event, gpu_ids, verify=False, results=None):
     """
     ユーザーがスライダーで指定した vram_percentage (%) を元に、
     停止されるまで VRAM を確保し続けるテスト。
     GPU 消費電力に依存せず単純に割り当てる。
+    verify=True では確保したスラブにパターンを書いて読み戻し続ける (vram_patterns.py)。
+    results に dict を渡すと GPU ごとの結果が入る。起動したスレッドのリストを返す。
     """
-    for gpu_id in gpu_ids:
-        threading.Thread(
-            target=allocate_vram_dynamic,
-            args=(vram_percentage, stop_event, gpu_id),
-            daemon=True
-        ).start()
-
-def allocate_vram_dynamic(vram_percentage, stop_event, gpu_id):
+    return [_start(results, gpu_id, allocate_vram_dynamic, vram_percentage, stop_event, gpu_id, verify)
+            for gpu_id in gpu_ids]
+
+def _start(results, key, func, *args, **kwargs):
+    """func をデーモンスレッドで動かし、戻り値を results[key] に入れる。スレッド名は key"""
+    t = threading.Thread(target=_store_result, args=(results, key, func) + args, kwargs=kwargs,
+                         name=str(key), daemon=True)
+    t.start()
+    return t
+
+def _store_result(results, key, func, *args, **kwargs):
+    # スレッドの例外は呼び出し側に届かないので {"error": ...} として残す
+    try:
+        result = func(*args, **kwargs)
+    except Exception as e:
+        print(f"[ERROR] GPU worker {key} failed: {type(e).__name__}: {e}")
+        result = {"error": f"{type(e).__name__}: {e}"}
+    if results is not None:
+        results[key] = result
+
+def allocate_vram_dynamic(vram_percentage, stop_event, gpu_id, verify=False, on_beat=None):
     """
-    (vram_percentage)% の VRAM をなるべく使うようにし、
-    超えたら解放、足りなければ追加確保。
-    停止指令でループを抜ける。
+    (vram_percentage)% の VRAM を数枚の大きなスラブで一気に確保し (vram_fill.VramFiller)、
+    停止指令まで保持する。他プロセスの増減で hysteresis を超えてずれたときだけ調整する。
+    verify=True では保持の代わりにパターンテストを繰り返し、不一致数と帯域を返す。
+    on_beat は保持の 1 周期 / パターンテストの 1 パスごとに呼ぶ (ワーカープロセスの心拍)。
     """
     device = torch.device(f'cuda:{gpu_id}')
     print(f"[INFO] Starting VRAM load on GPU {gpu_id} => target={vram_percentage}% of total memory.")
-
-    allocated_tensors = []
-
-    while not stop_event.is_set():
-        free_mem, total_mem = torch.cuda.mem_get_info(device=device)
-        used_mem = total_mem - free_mem
-        used_percent = (used_mem / total_mem) * 100.0
-
-        target_bytes = int(total_mem * (vram_percentage / 100.0))
-        current_alloc = used_mem  # 現在の使用量 (他プロセス含む)
-
-        if current_alloc < target_bytes:
-            to_allocate = target_bytes - current_alloc
-            chunk_size = to_allocate // 10
-            if chunk_size < 1:
-                chunk_size = 1
-            chunk_size_float = chunk_size // 4
-
-            if chunk_size_float > 0:
-                try:
-                    tensor = torch.zeros(chunk_size_float, dtype=torch.float32, device=device)
-                    allocated_tensors.append(tensor)
-                except RuntimeError as e:
-                    print(f"[WARN] OOM on GPU {gpu_id}: {e}")
-                    time.sleep(1.0)
-            time.sleep(0.1)
-
-        elif current_alloc > target_bytes:
-            to_free = current_alloc - target_bytes
-            freed = 0
-            while freed < to_free and allocated_tensors:
-                pop_t = allocated_tensors.pop()
-                freed += pop_t.numel() * 4
-                del pop_t
-            torch.cuda.empty_cache()
-            time.sleep(0.1)
-
+    tester = VramPatternTest(device) if verify else None      # スクラッチ領域は埋める前に確保
+    filler = VramFiller(TorchVramProvider(device), vram_percentage)
+    t0 = time.perf_counter()
+    err = filler.fill()
+    print(f"[INFO] GPU {gpu_id} VRAM filled in {(time.perf_counter() - t0) * 1000:.0f} ms: "
+          f"{filler.allocated / 2**30:.2f} GiB in {len(filler.slabs)} slabs (error {err:+.2f}%)")
+    summary = {"target": vram_percentage, "allocated": filler.allocated, "verify": verify}
+    try:
+        if tester is None:
+            filler.hold(stop_event, interval=1.0, on_tick=on_beat,
+                        on_adjust=lambda f: print(f"[INFO] GPU {gpu_id} VRAM re-adjusted: {f.allocated / 2**30:.2f} GiB"))
         else:
-            # ほぼ目標付近
-            time.sleep(0.2)
-
-    # 停止ボタン押下または終了
-    print(f"[INFO] Stopping VRAM load on GPU {gpu_id}. Freed all allocated tensors.")
-    del allocated_tensors
-    torch.cuda.empty_cache()
-    print(f"[INFO] GPU {gpu_id} memory freed.")
+            summary.update(_verify_vram(tester, filler, stop_event, gpu_id, on_beat))
+    finally:
+        # 停止ボタン押下または終了
+        filler.release_all()
+        print(f"[INFO] GPU {gpu_id} memory freed.")
+    return summary
+
+def _verify_vram(tester, filler, stop_event, gpu_id, on_beat=None):
+    """停止までパターンテストを繰り返す。1 巡ごとに不一致数と最低帯域を出す"""
+    rounds, errors, bad, read, write = 0, 0, [], [], []
+    while not stop_event.is_set():
+        results = tester.run(filler.slabs, stop_event=stop_event,
+                             on_pass=(lambda _: on_beat()) if on_beat else None)
+        if not results:
+            break
+        rounds += 1
+        round_errors = sum(r["errors"] for r in results)
+        errors += round_errors
+        read += [r["read_gbps"] for r in results]
+        write += [r["write_gbps"] for r in results]
+        print(f"[INFO] GPU {gpu_id} VRAM pattern round {rounds}: {round_errors} errors, "
+              f"read >= {min(r['read_gbps'] for r in results):.1f} GB/s, "
+              f"write >= {min(r['write_gbps'] for r in results):.1f} GB/s")
+        for r in results:
+            for slab, address, expected, actual, count in r["bad"]:
+                print(f"[ERROR] GPU {gpu_id} {r['pattern']}: slab {slab} address 0x{address:x} "
+                      f"expected {expected} got {actual} ({count} in chunk)")
+                if len(bad) < 64:
+                    bad.append((r["pattern"], slab, address, expected, actual, count))
+        filler.adjust()
+    return {"rounds": rounds, "errors": errors, "bad": bad,
+            "read_gbps": min(read, default=0.0), "write_gbps": min(write, default=0.0),
+            "mean_read_gbps": sum(read) / len(read) if read else 0.0,
+            "mean_write_gbps": sum(write) / len(write) if write else 0.0}
+
+
+if __name__ == "__main__":
+    # GPU の無い機械でも python gpu_load.py --device cpu で制御精度を確認できる
+    import argparse
+    parser = argparse.ArgumentParser(description="Tensor load engine self-test")
+    parser.add_argument("--device", default="cuda:0" if torch.cuda.is_available() else "cpu")
+    parser.add_argument("--load", type=float, default=50.0, help="target utilisation %%")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--workload", default=DEFAULT_WORKLOAD, choices=list(WORKLOADS))
+    parser.add_argument("--mode", default=DEFAULT_MODE, choices=list(MODES))
+    args = parser.parse_args()
+    stop = threading.Event()
+    threading.Timer(args.seconds, stop.set).start()
+    engine = TensorLoadEngine(args.device, args.workload, mode=args.mode)
+    print(f"[INFO] {args.device} ({engine.mode}): {engine.step_sec * 1000:.2f} ms per step")
+    summary = engine.run(args.load, stop, on_report=lambda gpu, err: print(f"  error {err:+.2f}%"))
+    print(f"[INFO] target {args.load:g}%: mean |err| {summary.get('mean_abs_error', float('nan')):.2f}%, "
+          f"{summary.get('throughput', 0.0):.2f} {engine.workload.unit}")
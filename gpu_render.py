@@ -0,0 +1,306 @@
+"""
+gpu_render.py  ―  OpenGL (pygame) による 3D 描画負荷
+  gpu_load.apply_combined_load から初回使用時に読み込まれる (pygame / PyOpenGL は重いので
+  GUI 起動時には読み込まない)。
+  描画は gl_instanced.InstancedRenderer (VBO / VAO + インスタンス描画、負荷率でインスタンス数が決まる)。
+  OpenGL 3.3 が使えないときだけ従来の固定機能描画 (draw_rotating_shapes) に戻る。
+  どちらも gl_instanced.SceneGraph の seed 固定シーンを描き、フレームごとに同じ内容になる。
+"""
+import pygame
+from pygame.locals import *
+import sys
+from OpenGL.GL import *
+from OpenGL.GLU import *
+import math
+import time
+import numpy as np
+
+try:
+    from gpu_load.gl_instanced import FRAME_DT, InstancedRenderer, SceneGraph, instances_for_load
+    from gpu_load.gl_offscreen import parse_size
+except ImportError:
+    from gl_instanced import FRAME_DT, InstancedRenderer, SceneGraph, instances_for_load
+    from gl_offscreen import parse_size
+
+LEGACY_MAX_OBJECTS = 300     # 固定機能描画のオブジェクト数の上限 (負荷率 100%)
+
+
+######################################
+#  OpenGL 用のライティング初期化
+######################################
+def initialize_lighting():
+    glEnable(GL_LIGHTING)
+    glEnable(GL_LIGHT0)
+    light_position = [10.0, 10.0, 10.0, 1.0]
+    glLightfv(GL_LIGHT0, GL_POSITION, light_position)
+    glLightfv(GL_LIGHT0, GL_DIFFUSE, [1.0, 1.0, 1.0, 1.0])
+    glLightfv(GL_LIGHT0, GL_SPECULAR, [1.0, 1.0, 1.0, 1.0])
+    glEnable(GL_COLOR_MATERIAL)
+
+######################################
+#  テクスチャ読み込み
+######################################
+def load_texture():
+    try:
+        print("Loading texture...")
+        texture_surface = pygame.image.load('texture.jpg')
+        print("Texture loaded successfully.")
+
+        texture_data = pygame.image.tostring(texture_surface, 'RGB', 1)
+        width = texture_surface.get_width()
+        height = texture_surface.get_height()
+
+        glEnable(GL_TEXTURE_2D)
+        texture_id = glGenTextures(1)
+        glBindTexture(GL_TEXTURE_2D, texture_id)
+        glTexImage2D(GL_TEXTURE_2D, 0, GL_RGB, width, height, 0,
+                     GL_RGB, GL_UNSIGNED_BYTE, texture_data)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+
+        print(f"Texture ID generated: {texture_id}")
+        return texture_id
+    except pygame.error as e:
+        print(f"Error loading texture: {e}")
+        return None
+
+######################################
+#  回転する立体をまとめて描画する
+######################################
+_shape_lists = {}             # GL コンテキスト → ディスプレイリスト (pygame.quit で消えるのでコンテキストごとに作る)
+
+
+def _shape_list_ids():
+    """
+    メッシュ番号 (SceneGraph.kinds) → ディスプレイリスト。
+    カレントのコンテキストで初めて呼ばれたときに 3 種をまとめて glBegin / GLU で記録する
+    """
+    from OpenGL import platform
+    context = platform.GetCurrentContext()
+    if context not in _shape_lists:
+        base = glGenLists(3)
+        for kind, draw in enumerate((draw_cube, lambda: draw_sphere(0.5, 20, 20),
+                                     lambda: draw_cone(0.5, 1.0, 20, 20))):
+            glNewList(base + kind, GL_COMPILE)
+            draw()
+            glEndList()
+        _shape_lists[context] = [base + kind for kind in range(3)]
+    return _shape_lists[context]
+
+
+def _release_shape_lists():
+    """カレントのコンテキストのディスプレイリストを消す (ウィンドウを閉じる前に呼ぶ)"""
+    from OpenGL import platform
+    lists = _shape_lists.pop(platform.GetCurrentContext(), None)
+    if lists:
+        glDeleteLists(lists[0], len(lists))
+
+
+def draw_rotating_shapes(texture_id, rotation_angle, scene=None):
+    """
+    scene (gl_instanced.SceneGraph) の全オブジェクトを rotation_angle [度] の姿勢で描く。
+    変換行列は scene.transforms() で一括計算し、オブジェクトごとの呼び出しは行列のロードと
+    ディスプレイリストだけ。scene 省略時は seed 0 の 3 オブジェクト。
+    """
+    if texture_id:
+        glEnable(GL_TEXTURE_2D)
+        glBindTexture(GL_TEXTURE_2D, texture_id)
+    else:
+        glDisable(GL_TEXTURE_2D)
+
+    if scene is None:
+        scene = SceneGraph(3, extent=3.0, scale=(1.0, 1.0))
+    # OpenGL は列優先なので転置して渡す
+    lists = _shape_list_ids()
+    glColor3f(1.0, 1.0, 1.0)             # 立方体は色を持たないので、前フレームの円錐の色を引き継がない
+    matrices = np.ascontiguousarray(scene.transforms(math.radians(rotation_angle)).transpose(0, 2, 1),
+                                    dtype=np.float32)
+    for matrix, kind in zip(matrices, scene.kinds.tolist()):
+        glPushMatrix()
+        glMultMatrixf(matrix)
+        glCallList(lists[kind])
+        glPopMatrix()
+
+    error = glGetError()
+    if error != GL_NO_ERROR:
+        print(f"OpenGL Error (draw_shapes): {gluErrorString(error)}")
+
+######################################
+#  キューブ描画
+######################################
+def draw_cube():
+    vertices = [
+        (-1, -1, -1),
+        ( 1, -1, -1),
+        ( 1,  1, -1),
+        (-1,  1, -1),
+        (-1, -1,  1),
+        ( 1, -1,  1),
+        ( 1,  1,  1),
+        (-1,  1,  1)
+    ]
+
+    faces = [
+        (0, 1, 2, 3),
+        (4, 5, 6, 7),
+        (0, 4, 7, 3),
+        (1, 5, 6, 2),
+        (3, 2, 6, 7),
+        (0, 1, 5, 4)
+    ]
+
+    tex_coords = [
+        (0, 0),
+        (1, 0),
+        (1, 1),
+        (0, 1)
+    ]
+
+    glBegin(GL_QUADS)
+    for face in faces:
+        for i, vertex in enumerate(face):
+            glTexCoord2fv(tex_coords[i % len(tex_coords)])
+            glVertex3fv(vertices[vertex])
+    glEnd()
+
+    error = glGetError()
+    if error != GL_NO_ERROR:
+        print(f"OpenGL Error (draw_cube): {gluErrorString(error)}")
+
+######################################
+#  球体描画
+######################################
+def draw_sphere(radius, slices, stacks):
+    quadric = gluNewQuadric()
+    gluQuadricTexture(quadric, GL_TRUE)
+    glColor3f(0.0, 0.0, 1.0)
+    gluSphere(quadric, radius, slices, stacks)
+    gluDeleteQuadric(quadric)
+
+    error = glGetError()
+    if error != GL_NO_ERROR:
+        print(f"OpenGL Error (draw_sphere): {gluErrorString(error)}")
+
+######################################
+#  円錐描画
+######################################
+def draw_cone(base, height, slices, stacks):
+    quadric = gluNewQuadric()
+    gluQuadricTexture(quadric, GL_TRUE)
+    glColor3f(1.0, 0.0, 0.0)
+    gluCylinder(quadric, base, 0.0, height, slices, stacks)
+    gluDeleteQuadric(quadric)
+
+    error = glGetError()
+    if error != GL_NO_ERROR:
+        print(f"OpenGL Error (draw_cone): {gluErrorString(error)}")
+
+#########################################################
+# (1) GPU 負荷 (OpenGL レンダリング) - 修正版
+#########################################################
+def apply_gpu_load(load_percentage, stop_event, gpu_id, seed=0, objects=None, level=None,
+                   size="800x600", passes=1, batches=1):
+    """
+    OpenGL を使って 3D 描画負荷をかける (修正版)。
+    - sys.exit() を使わず、stop_event またはウィンドウを閉じると終了。
+    - 再度テストしてもセグフォが起きにくいようにする。
+    - シーンは seed 固定。objects を省略すると負荷率から決める (固定機能描画では LEGACY_MAX_OBJECTS まで)。
+    - level (cpu_load.make_load_level() の共有値) を渡すと実行中にオブジェクト数が追従する。
+    - size はウィンドウの解像度、passes / batches は gl_instanced.InstancedRenderer のオーバードロー回数と描画呼び出し数。
+    """
+    width, height = parse_size(size)
+    pygame.init()
+    screen = pygame.display.set_mode((width, height), DOUBLEBUF | OPENGL)
+    pygame.display.set_caption(f"GPU Load Test (GPU {gpu_id})")
+
+    glMatrixMode(GL_PROJECTION)
+    glLoadIdentity()
+    gluPerspective(45, (width / height), 0.1, 50.0)
+    glMatrixMode(GL_MODELVIEW)
+
+    try:
+        renderer = InstancedRenderer(width, height, objects or instances_for_load(load_percentage), seed=seed,
+                                     batches=batches, passes=passes)
+    except Exception as e:
+        print(f"[WARN] Instanced renderer unavailable ({e}); using immediate-mode shapes.")
+    else:
+        _instanced_loop(renderer, stop_event, None if objects else level)
+        return
+
+    glEnable(GL_DEPTH_TEST)
+    glDepthFunc(GL_LESS)
+    initialize_lighting()
+    texture_id = load_texture()
+    rotation_angle = 0
+
+    if texture_id is None:
+        print("[DEBUG] Texture loading failed; proceeding without texture.")
+
+    glClearColor(0.3, 0.3, 0.3, 1.0)
+    scene = SceneGraph(objects or instances_for_load(load_percentage, LEGACY_MAX_OBJECTS), seed,
+                       extent=3.0, scale=(1.0, 1.0))
+
+    while not stop_event.is_set():
+        if level is not None and not objects and level.value != load_percentage:
+            load_percentage = level.value
+            scene = SceneGraph(instances_for_load(load_percentage, LEGACY_MAX_OBJECTS), seed,
+                               extent=3.0, scale=(1.0, 1.0))
+        # イベント処理
+        for event in pygame.event.get():
+            if event.type == QUIT:
+                # ウィンドウ閉じる操作が来たら stop_event を立ててループを抜ける
+                print("[DEBUG] Window close event -> stopping GPU load.")
+                stop_event.set()
+
+        glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+        glLoadIdentity()
+
+        gluLookAt(
+            0.0, 0.0, 15.0,
+            0.0, 0.0, 0.0,
+            0.0, 1.0, 0.0
+        )
+
+        draw_rotating_shapes(texture_id, rotation_angle, scene)
+        rotation_angle += load_percentage / 10.0
+
+        pygame.display.flip()
+        glFlush()
+        time.sleep(0.01)
+
+        error = glGetError()
+        if error != GL_NO_ERROR:
+            print(f"OpenGL Error (main loop): {gluErrorString(error)}")
+
+    # ループ終了時にウィンドウを閉じる (同じアドレスで次のコンテキストが作られても古いリストを使わない)
+    print("[DEBUG] Exiting GPU load loop. Doing pygame.quit() ...")
+    _release_shape_lists()
+    pygame.quit()
+    print("[DEBUG] Pygame quit. Thread returning now.")
+
+
+def _instanced_loop(renderer, stop_event, level=None):
+    """
+    InstancedRenderer で描画し続ける。1 秒ごとに FPS と三角形/秒を出す。
+    負荷はインスタンス数で決まるので待ちは入れない (sleep すると FPS の上限で三角形/秒が頭打ちになる)
+    """
+    while not stop_event.is_set():
+        if level is not None:
+            renderer.set_instances(instances_for_load(level.value))
+        for event in pygame.event.get():
+            if event.type == QUIT:
+                print("[DEBUG] Window close event -> stopping GPU load.")
+                stop_event.set()
+        renderer.draw(renderer.frames * FRAME_DT)
+        pygame.display.flip()
+        renderer.report(print)
+
+        error = glGetError()
+        if error != GL_NO_ERROR:
+            print(f"OpenGL Error (instanced loop): {gluErrorString(error)}")
+    stats = renderer.stats()
+    print(f"[INFO] 3D render finished: {stats['instances']} instances, {stats['fps']:.1f} FPS, "
+          f"{stats['tris_per_sec'] / 1e6:.2f} M triangles/s")
+    renderer.delete()
+    pygame.quit()
+    print("[DEBUG] Pygame quit. Thread returning now.")
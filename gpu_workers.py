@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+gpu_workers.py  ―  GPU 負荷をデバイスごとの子プロセスで実行する (プロセス分離モード)
+  ・spawn で起動する (CUDA は fork した子では初期化できない)。親プロセスは torch を読み込まない
+  ・制御チャネル (Pipe): 親 → 子に ("level", %) / ("stop",)、子 → 親に ("summary", dict) / ("error", str)
+  ・共有メモリのカウンタ (Array): 心拍・状態・実測負荷・誤差・スループット・累積 busy 秒
+  ・心拍は負荷ループ自身が打つ (GPU 呼び出しが返らなければ止まる)。止まったワーカーは終了させて失敗扱い
+  ・1 台が OOM やドライバ障害で落ちても、他のデバイスと親 (GUI) は動き続けクラッシュとして記録される
+  ・combined では描画スレッドが停止前に終わったら (ディスプレイ無し・GL エラー) そのワーカーを失敗にする
+"""
+
+import multiprocessing
+import threading
+import time
+
+KINDS = ("tensor", "combined", "vram")      # combined = Tensor + OpenGL (3D Render)
+
+# 共有カウンタの添字と状態値
+HEARTBEAT, STATE, MEASURED, ERROR, THROUGHPUT, BUSY, SAMPLES = range(7)
+N_COUNTERS = 7
+STARTING, RUNNING, DONE, FAILED = 0.0, 1.0, 2.0, 3.0
+STATE_NAMES = {STARTING: "starting", RUNNING: "running", DONE: "done", FAILED: "failed"}
+
+STALE_SEC = 15.0         # 実行中にこれ以上心拍が止まったら応答なしとみなして終了させる
+STARTUP_SEC = 120.0      # 起動中 (torch 読み込み・CUDA 初期化・較正) の猶予
+POLL_SEC = 0.5
+
+
+class _Level:
+    """子プロセス内の負荷率。TensorLoadEngine は level.value だけを読む"""
+
+    def __init__(self, value):
+        self.value = float(value)
+
+
+# ────────────────────────────────────────────────────────────
+# 子プロセス側
+# ────────────────────────────────────────────────────────────
+def _worker_main(kind, gpu_id, percentage, options, conn, counters):
+    stop = threading.Event()
+    level = _Level(percentage)
+    counters[HEARTBEAT] = time.time()
+
+    def control():
+        while not stop.is_set():
+            try:
+                msg = conn.recv()
+            except (EOFError, OSError):      # 親が終了した
+                break
+            if msg[0] == "level":
+                level.value = float(msg[1])
+            elif msg[0] == "stop":
+                break
+        stop.set()
+
+    threading.Thread(target=control, daemon=True).start()
+    try:
+        summary = _run_kind(kind, gpu_id, percentage, options, stop, level, counters)
+        counters[STATE] = DONE
+        conn.send(("summary", summary))
+    except BaseException as e:
+        counters[STATE] = FAILED
+        try:
+            conn.send(("error", f"{type(e).__name__}: {e}"))
+        except (OSError, ValueError):
+            pass
+        raise SystemExit(1)
+
+
+def _run_kind(kind, gpu_id, percentage, options, stop, level, counters) -> dict:
+    try:
+        from gpu_load.gpu_load import TensorLoadEngine, allocate_vram_dynamic
+    except ImportError:
+        from gpu_load import TensorLoadEngine, allocate_vram_dynamic
+
+    render, render_thread = {}, None
+
+    def beat():
+        # 描画スレッドが先に終わったら (ディスプレイ無し・GL エラーなど) ワーカーごと失敗させる
+        if render_thread is not None and not render_thread.is_alive() and not stop.is_set():
+            raise RuntimeError(f"render thread stopped: {render.get('error', 'exited before stop')}")
+        counters[HEARTBEAT] = time.time()
+
+    if kind == "vram":
+        counters[STATE] = RUNNING
+        beat()
+        return allocate_vram_dynamic(percentage, stop, gpu_id, verify=options.get("verify", False), on_beat=beat)
+
+    if kind == "combined":
+        try:
+            from gpu_load.gpu_load import render_load
+        except ImportError:
+            from gpu_load import render_load
+
+        def render_job():
+            try:
+                render["stats"] = render_load(percentage, stop, gpu_id, level, **(options.get("render") or {}))
+            except Exception as e:
+                render["error"] = f"{type(e).__name__}: {e}"
+
+        render_thread = threading.Thread(target=render_job, daemon=True)
+        render_thread.start()
+    engine = TensorLoadEngine(options.get("device") or f"cuda:{gpu_id}", options.get("workload", "fp32"),
+                              mode=options.get("mode", "eager"))
+    counters[STATE] = RUNNING
+    beat()
+
+    def report(label, err):
+        log = engine.log
+        counters[MEASURED] = log.target + err
+        counters[ERROR] = err
+        counters[THROUGHPUT] = log.throughput().get("throughput", 0.0)
+        counters[BUSY] = log.busy
+        counters[SAMPLES] = len(log.samples)
+
+    summary = engine.run(percentage, stop, level=level, on_report=report, label=gpu_id, on_slice=beat)
+    if render_thread is not None:
+        render_thread.join(timeout=5.0)
+        if "error" in render:
+            raise RuntimeError(f"render thread failed: {render['error']}")
+        summary["render"] = render.get("stats")
+    return summary
+
+
+# ────────────────────────────────────────────────────────────
+# 親プロセス側
+# ────────────────────────────────────────────────────────────
+class GpuWorkerPool:
+    """
+    pool = GpuWorkerPool("tensor", 80, [0, 1], workload="bf16").start()
+    pool.set_level(50)      # 実行中の負荷率変更 (制御チャネル経由)
+    pool.poll()             # クラッシュ / 応答なしの検出 (定期的に呼ぶ)
+    results = pool.stop()   # {gpu_id: {"state", "exitcode", "error", "summary", ...}}
+    options は子の TensorLoadEngine に渡す (workload, mode, device)。combined では render
+    (gpu_load.render_load の引数)、vram では verify。
+    """
+
+    def __init__(self, kind, percentage, gpu_ids, log=print, **options):
+        if kind not in KINDS:
+            raise ValueError(f"unknown GPU worker kind: {kind!r} (choose from {', '.join(KINDS)})")
+        self.kind = kind
+        self.percentage = percentage
+        self.gpu_ids = list(gpu_ids)
+        self.options = options
+        self.log = log
+        self.ctx = multiprocessing.get_context("spawn")
+        self.workers: dict[int, dict] = {}
+        self.stopping = False
+
+    def start(self):
+        for gpu_id in self.gpu_ids:
+            parent_conn, child_conn = self.ctx.Pipe()
+            counters = self.ctx.Array("d", N_COUNTERS, lock=False)
+            proc = self.ctx.Process(target=_worker_main, name=f"gpu{gpu_id}-{self.kind}", daemon=True,
+                                    args=(self.kind, gpu_id, self.percentage, self.options, child_conn, counters))
+            proc.start()
+            child_conn.close()
+            self.workers[gpu_id] = {"proc": proc, "conn": parent_conn, "counters": counters,
+                                    "started": time.time(), "state": "starting", "error": None,
+                                    "summary": None, "stale": False}
+        self.log(f"[INFO] Started {len(self.workers)} GPU {self.kind} worker processes: {self.gpu_ids}")
+        return self
+
+    def _send(self, worker, msg):
+        try:
+            worker["conn"].send(msg)
+        except (OSError, ValueError):
+            pass
+
+    def _receive(self, worker):
+        conn = worker["conn"]
+        try:
+            while conn.poll():
+                tag, value = conn.recv()
+                if tag == "summary":
+                    worker["summary"] = value
+                elif tag == "error":
+                    worker["error"] = value
+        except (EOFError, OSError):
+            pass
+
+    def set_level(self, percentage):
+        self.percentage = percentage
+        for worker in self.workers.values():
+            if worker["proc"].is_alive():
+                self._send(worker, ("level", percentage))
+
+    def poll(self):
+        """落ちたワーカーを検出し、心拍の止まったワーカーは終了させて失敗として記録する"""
+        now = time.time()
+        for gpu_id, worker in self.workers.items():
+            self._receive(worker)
+            if worker["state"] in ("crashed", "failed", "done"):
+                continue
+            proc, counters = worker["proc"], worker["counters"]
+            if not proc.is_alive():
+                if self.stopping and proc.exitcode == 0:
+                    worker["state"] = "done"
+                    continue
+                worker["state"] = "failed" if counters[STATE] == FAILED else "crashed"
+                reason = worker["error"] or _exit_reason(proc.exitcode)
+                self.log(f"[ERROR] GPU {gpu_id} {self.kind} worker {worker['state']}: {reason} "
+                         f"(other devices keep running)")
+                continue
+            state = STATE_NAMES.get(counters[STATE], "starting")
+            if state in ("done", "failed"):
+                continue                      # 終了処理中。結果はプロセスが終わってから記録する
+            worker["state"] = state
+            beat = counters[HEARTBEAT] or worker["started"]
+            limit = STALE_SEC if counters[STATE] == RUNNING else STARTUP_SEC
+            if worker["state"] in ("running", "starting") and now - beat > limit:
+                worker["error"] = f"not responding for {now - beat:.0f} s while {worker['state']}"
+                worker["stale"] = True
+                worker["state"] = "failed"
+                self.log(f"[ERROR] GPU {gpu_id} {self.kind} worker not responding for {now - beat:.0f} s, "
+                         f"terminating (other devices keep running)")
+                _terminate(proc)
+
+    def status(self) -> dict:
+        """共有カウンタの現在値 (GUI / テレメトリ向け)"""
+        now = time.time()
+        result = {}
+        for gpu_id, worker in self.workers.items():
+            c = worker["counters"]
+            result[gpu_id] = {
+                "state": worker["state"], "alive": worker["proc"].is_alive(),
+                "heartbeat_age": now - (c[HEARTBEAT] or worker["started"]),
+                "measured": c[MEASURED], "error": c[ERROR], "throughput": c[THROUGHPUT],
+                "busy_seconds": c[BUSY], "samples": int(c[SAMPLES]),
+            }
+        return result
+
+    def stop(self, timeout=10.0) -> dict:
+        self.stopping = True
+        for worker in self.workers.values():
+            self._send(worker, ("stop",))
+        deadline = time.time() + timeout
+        for gpu_id, worker in self.workers.items():
+            proc = worker["proc"]
+            proc.join(timeout=max(0.0, deadline - time.time()))
+            if proc.is_alive():
+                self.log(f"[WARN] GPU {gpu_id} {self.kind} worker did not stop, terminating")
+                _terminate(proc)
+        self.poll()
+        results = {}
+        for gpu_id, worker in self.workers.items():
+            self._receive(worker)
+            worker["conn"].close()
+            results[gpu_id] = {"state": worker["state"], "exitcode": worker["proc"].exitcode,
+                               "error": worker["error"], "summary": worker["summary"]}
+        return results
+
+    def failed(self) -> list[int]:
+        return [gpu_id for gpu_id, w in self.workers.items() if w["state"] in ("crashed", "failed")]
+
+
+def _terminate(proc, timeout=5.0):
+    """SIGTERM で止まらなければ (ドライバ呼び出し中など) SIGKILL"""
+    proc.terminate()
+    proc.join(timeout)
+    if proc.is_alive():
+        proc.kill()
+        proc.join()
+
+
+def _exit_reason(exitcode) -> str:
+    if exitcode is None:
+        return "still running"
+    if exitcode < 0:
+        import signal
+        try:
+            return f"killed by {signal.Signals(-exitcode).name}"
+        except ValueError:
+            return f"killed by signal {-exitcode}"
+    return f"exit code {exitcode}"
+
+
+def run_isolated(kind, percentage, stop_event, gpu_ids, level=None, log=print, **options) -> dict:
+    """
+    デバイスごとに子プロセスで負荷をかけ、stop_event まで監視して結果を返す (ブロックする)。
+    level (cpu_load.make_load_level() の共有値) の変更は制御チャネルで子に送る。
+    """
+    pool = GpuWorkerPool(kind, percentage, gpu_ids, log=log, **options).start()
+    last = level.value if level is not None else percentage
+    try:
+        while not stop_event.wait(POLL_SEC):
+            if level is not None and level.value != last:
+                last = level.value
+                pool.set_level(last)
+            pool.poll()
+    finally:
+        results = pool.stop()
+    for gpu_id, result in results.items():
+        summary = result["summary"] or {}
+        if summary.get("samples"):
+            log(f"[INFO] GPU {gpu_id} worker {result['state']}: mean |err| {summary['mean_abs_error']:.2f}%, "
+                f"{summary.get('throughput', 0.0):.2f} {summary.get('unit', '')}")
+    return results
+
+
+if __name__ == "__main__":
+    # GPU の無い機械でも CPU デバイスでプロセス分離と制御チャネルを確認できる
+    import argparse
+    parser = argparse.ArgumentParser(description="Process-per-GPU worker self-test")
+    parser.add_argument("--kind", default="tensor", choices=KINDS)
+    parser.add_argument("--gpus", default="0", help="comma separated GPU ids")
+    parser.add_argument("--device", help="override the device (e.g. cpu)")
+    parser.add_argument("--load", type=float, default=50.0)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--workload", default="fp32")
+    parser.add_argument("--mode", default="eager")
+    args = parser.parse_args()
+    stop = threading.Event()
+    threading.Timer(args.seconds, stop.set).start()
+    results = run_isolated(args.kind, args.load, stop, [int(g) for g in args.gpus.split(",")],
+                           device=args.device, workload=args.workload, mode=args.mode)
+    for gpu_id, result in results.items():
+        print(f"  GPU {gpu_id}: {result['state']} (exit {result['exitcode']}) {result['error'] or ''}")
@@ -9,6 +9,48 @@ import numpy as np
 import time
 import threading
 
+FRAME_CAPACITY = 1 << 18     # 記録するフレーム時間の上限 (超えたら古いものから上書き)
+STUTTER_FACTOR = 2.0         # 中央値のこの倍を超えたフレームをカクつきとして数える
+ROWS_PER_FRAME = 8           # 2D ベンチマークで 1 フレームに描く行数
+
+
+class FrameTimer:
+    """
+    timer = FrameTimer()
+    ... timer.tick() (1 フレーム描くごと) ...
+    timer.stats()  # {"frames", "seconds", "fps", "p50_ms", "p95_ms", "p99_ms", "stutters"}
+    フレーム時間は最初に確保した配列に書き込む (フレーム中に確保しない)。
+    """
+
+    def __init__(self, capacity=FRAME_CAPACITY):
+        self.times = np.empty(capacity, dtype=np.float64)
+        self.frames = 0
+        self.t0 = self.last = time.perf_counter()
+
+    def tick(self):
+        now = time.perf_counter()
+        self.times[self.frames % len(self.times)] = now - self.last
+        self.last = now
+        self.frames += 1
+
+    def stats(self) -> dict:
+        seconds = self.last - self.t0
+        recorded = self.times[:min(self.frames, len(self.times))]
+        if not len(recorded):
+            return {"frames": 0, "seconds": seconds, "fps": 0.0, "p50_ms": 0.0, "p95_ms": 0.0,
+                    "p99_ms": 0.0, "stutters": 0}
+        p50, p95, p99 = np.percentile(recorded, (50, 95, 99)) * 1000.0
+        return {"frames": self.frames, "seconds": seconds, "fps": self.frames / max(seconds, 1e-9),
+                "p50_ms": p50, "p95_ms": p95, "p99_ms": p99,
+                "stutters": int(np.count_nonzero(recorded > STUTTER_FACTOR * p50 / 1000.0))}
+
+
+def format_stats(name, stats) -> str:
+    return (f"{name}: {stats['frames']} frames in {stats['seconds']:.2f} s, {stats['fps']:.1f} FPS, "
+            f"frame time p50 {stats['p50_ms']:.2f} / p95 {stats['p95_ms']:.2f} / p99 {stats['p99_ms']:.2f} ms, "
+            f"{stats['stutters']} stutters (> {STUTTER_FACTOR:g}x median)\n")
+
+
 class LoadTestApp:
     def __init__(self, root):
         self.root = root
@@ -62,23 +104,25 @@ class LoadTestApp:
             duration = float('inf')
         else:
             duration = self.duration_slider.get() * 60  # Convert minutes to seconds
-        start_time = time.time()
-        end_time = start_time + duration
-
-        line_images = []
-        for y in range(height):
-            line_image = image.crop((0, 0, width, y + 1))
-            line_tk_image = ImageTk.PhotoImage(line_image)
-            line_images.append(line_tk_image)
-
-        while time.time() < end_time:
-            for y, line_tk_image in enumerate(line_images):
-                canvas.create_image(0, 0, anchor=tk.NW, image=line_tk_image)
-                top.update()
-            canvas.delete("all")
-
-        total_time = time.time() - start_time
-        info_area.insert(tk.END, f"2D Image Draw Benchmark: {total_time:.2f} seconds\n")
+        timer = FrameTimer()
+        end_time = time.perf_counter() + duration
+
+        # 1 フレーム = ROWS_PER_FRAME 行の帯を 1 枚切り出して描く。表示中の帯 (画像 1 枚分) だけを保持する
+        bands = []
+        y = 0
+        while timer.last < end_time:
+            if y >= height:
+                canvas.delete("all")
+                bands.clear()
+                y = 0
+            band = ImageTk.PhotoImage(image.crop((0, y, width, min(height, y + ROWS_PER_FRAME))))
+            canvas.create_image(0, y, anchor=tk.NW, image=band)
+            bands.append(band)
+            y += ROWS_PER_FRAME
+            top.update()
+            timer.tick()
+
+        info_area.insert(tk.END, format_stats("2D Image Draw Benchmark", timer.stats()))
         top.destroy()  # 追加: ウィンドウを閉じる
 
     def run_3d_draw_benchmark(self, info_area):
@@ -92,8 +136,8 @@ class LoadTestApp:
             duration = float('inf')
         else:
             duration = self.duration_slider.get() * 60  # Convert minutes to seconds
-        start_time = time.time()
-        end_time = start_time + duration
+        timer = FrameTimer()
+        end_time = time.perf_counter() + duration
 
         def create_32_polyhedron():
             vertices = [
@@ -145,20 +189,18 @@ class LoadTestApp:
                     glVertex3f(*vertices[vertex])
             glEnd()
 
-        while time.time() < end_time:
+        # 待ち時間無しで描き続ける (フレーム時間はスワップ完了まで)
+        while timer.last < end_time:
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
-                    pygame.quit()
-                    return
-
+                    end_time = 0
             glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
             glRotatef(1, 3, 1, 1)
             create_32_polyhedron()
             pygame.display.flip()
-            pygame.time.wait(10)
+            timer.tick()
 
-        total_time = time.time() - start_time
-        info_area.insert(tk.END, f"3D Draw Benchmark: {total_time:.2f} seconds\n")
+        info_area.insert(tk.END, format_stats("3D Draw Benchmark", timer.stats()))
         pygame.quit()
 
     def exit_app(self):
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+loadpower_cli.py  ―  Burn-in テストのヘッドレス実行 (Tk / ディスプレイ不要)
+  ・GUI と同じ BurnInOrchestrator を使うので、負荷レベルと合否判定は GUI と一致する
+  ・JSON レポートを書き出し、終了コードで合否を返す (0: 合格, 1: 不合格, 2: 実行エラー)
+
+例:
+  python loadpower_cli.py --stress Mid --duration 600 --storage --network --report burnin.json
+  python loadpower_cli.py --profile profile.json --record 10
+  python loadpower_cli.py --duration 60 --cpu 50 --kernel gemm --placement physical
+
+profile.json は BurnInProfile のフィールド名をそのまま使う:
+  {"duration": 600, "cpu": 60, "cpu_kernel": "gemm", "gpu": 60, "vram": 60, "storage": true}
+"""
+
+import argparse
+import json
+import signal
+import sys
+
+from orchestrator import BurnInOrchestrator, BurnInProfile, STRESS_PRESETS, load_profile
+
+EXIT_PASS, EXIT_FAIL, EXIT_ERROR = 0, 1, 2
+
+# コマンドライン引数 → プロファイルのフィールド (指定されたものだけ上書き)
+OVERRIDES = {
+    "duration": "duration", "cpu": "cpu", "cpu_type": "cpu_type", "kernel": "cpu_kernel",
+    "placement": "cpu_placement", "tolerance": "cpu_tolerance", "gpu": "gpu", "gpu_type": "gpu_type",
+    "workload": "gpu_workload", "gpu_mode": "gpu_mode", "gpu_processes": "gpu_processes",
+    "offscreen": "render_offscreen", "render_size": "render_size", "overdraw": "render_overdraw",
+    "batches": "render_batches", "vram": "vram", "vram_verify": "vram_verify", "storage": "storage",
+    "block_size": "storage_block_size", "queue_depth": "storage_queue_depth", "io_pattern": "storage_pattern",
+    "read_pct": "storage_read_pct", "file_size": "storage_file_size", "io_backend": "storage_backend",
+    "direct": "storage_direct", "verify_data": "storage_verify", "per_controller": "storage_per_controller",
+    "per_hub": "storage_per_hub", "network": "network", "target": "network_target",
+    "sound": "sound", "sound_threshold": "sound_threshold", "record": "record_rate",
+    "record_path": "record_path",
+}
+
+
+def build_profile(args) -> BurnInProfile:
+    data = {}
+    if args.profile:
+        data.update(vars(load_profile(args.profile)))
+    elif args.stress:
+        level = STRESS_PRESETS[args.stress]
+        data.update({"cpu": level, "gpu": level, "vram": level})
+    for arg, field in OVERRIDES.items():
+        value = getattr(args, arg)
+        if value is not None:
+            data[field] = value
+    return BurnInProfile.from_dict(data)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Headless burn-in test")
+    parser.add_argument("--profile", help="JSON profile (BurnInProfile fields)")
+    parser.add_argument("--stress", choices=list(STRESS_PRESETS), help="GUI stress preset for CPU/GPU/VRAM")
+    parser.add_argument("--duration", type=int, help="test duration in seconds")
+    parser.add_argument("--cpu", type=int, help="CPU load %%")
+    parser.add_argument("--cpu-type", choices=["Standard", "x86"])
+    parser.add_argument("--kernel", help="CPU kernel (see cpu_kernels.KERNELS)")
+    parser.add_argument("--placement", help="CPU placement policy (see cpu_topology.POLICIES)")
+    parser.add_argument("--tolerance", type=float, help="allowed mean |error| of CPU load in %%")
+    parser.add_argument("--gpu", type=int, help="GPU load %%")
+    parser.add_argument("--gpu-type", choices=["3D Render", "Model Training"])
+    parser.add_argument("--workload", help="GPU tensor workload (see gpu_kernels.WORKLOADS)")
+    parser.add_argument("--gpu-mode", choices=["eager", "graph"], help="graph: replay CUDA graphs on several streams")
+    parser.add_argument("--gpu-processes", action="store_true", default=None,
+                        help="run each GPU's load in its own worker process")
+    parser.add_argument("--offscreen", action=argparse.BooleanOptionalAction, default=None,
+                        help="render the 3D load into an offscreen framebuffer (default: when no display)")
+    parser.add_argument("--render-size", help="offscreen render resolution, e.g. 1920x1080")
+    parser.add_argument("--overdraw", type=int, help="offscreen render passes per frame")
+    parser.add_argument("--batches", type=int, help="draw calls per mesh per pass")
+    parser.add_argument("--vram", type=int, help="VRAM load %%")
+    parser.add_argument("--vram-verify", action="store_true", default=None,
+                        help="write and verify test patterns in the VRAM load")
+    parser.add_argument("--storage", action="store_true", default=None, help="run the storage test")
+    parser.add_argument("--block-size", help="storage I/O block size, e.g. 4K or 1M")
+    parser.add_argument("--queue-depth", type=int, help="storage I/Os in flight per device")
+    parser.add_argument("--io-pattern", choices=["seq", "rand"], help="sequential or random storage I/O")
+    parser.add_argument("--read-pct", type=int, help="share of storage I/Os that are reads (0-100)")
+    parser.add_argument("--file-size", help="storage test file size per device, e.g. 4G")
+    parser.add_argument("--io-backend", choices=["threads", "aio"], help="storage I/O submission: thread pool or Linux AIO")
+    parser.add_argument("--direct", action="store_true", default=None, help="bypass the page cache with O_DIRECT")
+    parser.add_argument("--verify-data", action=argparse.BooleanOptionalAction, default=None,
+                        help="check every block read back against the generated pattern (default on)")
+    parser.add_argument("--per-controller", type=int, help="storage devices tested at once per USB controller (0: no limit)")
+    parser.add_argument("--per-hub", type=int, help="storage devices tested at once per external hub (0: no limit)")
+    parser.add_argument("--network", action="store_true", default=None, help="run the network test")
+    parser.add_argument("--target", help="network test target address")
+    parser.add_argument("--sound", action="store_true", default=None, help="run the sound loopback test")
+    parser.add_argument("--sound-threshold", type=float)
+    parser.add_argument("--record", type=float, help="record telemetry at this rate in Hz")
+    parser.add_argument("--record-path", help="recording directory (default burnin_YYYYmmdd_HHMMSS)")
+    parser.add_argument("--report", help="write the JSON report to this path")
+    args = parser.parse_args(argv)
+
+    try:
+        profile = build_profile(args)
+    except (OSError, ValueError, TypeError) as e:
+        print(f"[ERROR] Invalid profile: {e}", file=sys.stderr)
+        return EXIT_ERROR
+
+    orch = BurnInOrchestrator(profile, log=lambda msg: print(msg, flush=True),
+                              storage_progress=lambda index, percent: None)
+    # Ctrl-C / SIGTERM でも後始末してレポートを書く
+    signal.signal(signal.SIGTERM, lambda *_: orch.stop_event.set())
+    orch.start()
+    try:
+        report = orch.wait()
+    except KeyboardInterrupt:
+        print("[INFO] Interrupted, stopping workers...")
+        orch.stop()
+        report = orch.wait()
+
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2, default=str)
+        print(f"[INFO] Report written to {args.report}")
+    for name, result in report["results"].items():
+        print(f"  {name:8s} {result['status']}")
+    if any(r["status"] == "error" for r in report["results"].values()):
+        return EXIT_ERROR
+    return EXIT_PASS if report["passed"] else EXIT_FAIL
+
+
+if __name__ == "__main__":
+    sys.exit(main())
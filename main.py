@@ -1,14 +1,16 @@
+import startup
+startup.install()  # 以降の import 時間を記録する
+
 import os
 import subprocess
 import tkinter as tk
 from tkinter import ttk
 from cpu_load.cpu_load import apply_cpu_load  # 修正: apply_cpu_loadを正しくインポート
-from gpu_load.gpu_load import apply_gpu_tensor_load, apply_combined_load, apply_gpu_vram_load
-from system_info.system_info import get_cpu_info, get_gpu_info, get_psu_power
+from system_info.system_info import get_cpu_info, get_gpu_info
+from system_info.telemetry import get_sampler
+from gpu_load.gpu_kernels import WORKLOADS, DEFAULT_WORKLOAD
 import threading
 import time
-import psutil  # 追加: リアルタイムのCPUとメモリ情報を取得するためにpsutilを使用
-import torch
 from tkinter import messagebox
 import random
 import string
@@ -21,6 +23,10 @@ sys.path.append(os.path.join(os.path.dirname(__file__), "storage_load"))
 sys.path.append(os.path.join(os.path.dirname(__file__), "system_info"))
 
 
+# torch / pygame / OpenGL は初回使用時に読み込む (GPU があれば起動後にバックグラウンドで先読み)
+gpu_backend = startup.LazyBackend("gpu_load.gpu_load")
+
+
 # Circular import solution - move StorageTestApp import inside the relevant function
 class LoadTestApp:
     def __init__(self, root):
@@ -33,6 +39,7 @@ class LoadTestApp:
         self.gpu_load = tk.IntVar()
         self.gpu_vram_load = tk.IntVar()
         self.gpu_load_type = tk.StringVar(value="3D Render")
+        self.gpu_workload = tk.StringVar(value=DEFAULT_WORKLOAD)
 
         # ボタンとスライダーを2列に並べるためのフレーム作成
         controls_frame = tk.Frame(root)
@@ -55,6 +62,9 @@ class LoadTestApp:
         self.gpu_load_3d.grid(column=1, row=3, padx=10, pady=10)
         self.gpu_load_tensor = ttk.Radiobutton(controls_frame, text="Model Training", variable=self.gpu_load_type, value="Model Training")
         self.gpu_load_tensor.grid(column=2, row=3, padx=10, pady=10)
+        self.gpu_workload_combo = ttk.Combobox(controls_frame, textvariable=self.gpu_workload,
+                                               values=list(WORKLOADS), state="readonly", width=12)
+        self.gpu_workload_combo.grid(column=3, row=3, padx=10, pady=10)
 
         self.start_button = ttk.Button(controls_frame, text="Start Load", command=self.apply_load)
         self.start_button.grid(column=0, row=4, padx=10, pady=10)
@@ -88,14 +98,18 @@ class LoadTestApp:
         self.gpu_vram_label = tk.Label(root, text="VRAM Usage: N/A", font=("Helvetica", 14))
         self.gpu_vram_label.grid(column=0, row=5, columnspan=2, pady=10)
 
+        self.telemetry = get_sampler()
         self.display_system_info()
         self.start_update_thread()
 
     def display_system_info(self):
-        cpu_info = get_cpu_info()
-        gpu_info = get_gpu_info()
-        self.info_area.insert(tk.END, "CPU Info:\n" + cpu_info + "\n")
-        self.info_area.insert(tk.END, "GPU Info:\n" + gpu_info + "\n")
+        # lscpu / nvidia-smi はウィンドウ表示を待たせないよう別スレッドで実行
+        def fetch():
+            cpu_info = get_cpu_info()
+            gpu_info = get_gpu_info()
+            self.root.after(0, lambda: (self.info_area.insert(tk.END, "CPU Info:\n" + cpu_info + "\n"),
+                                        self.info_area.insert(tk.END, "GPU Info:\n" + gpu_info + "\n")))
+        threading.Thread(target=fetch, daemon=True).start()
 
     def apply_load(self):
         self.stop_event = threading.Event()
@@ -106,7 +120,7 @@ class LoadTestApp:
         gpu_load_type = self.gpu_load_type.get()
 
         self.info_area.insert(tk.END, f"\nCPU Load: {cpu_load_percentage}%\n")
-        self.info_area.insert(tk.END, f"GPU Load: {gpu_load_percentage}% ({gpu_load_type})\n")
+        self.info_area.insert(tk.END, f"GPU Load: {gpu_load_percentage}% ({gpu_load_type}, {self.gpu_workload.get()})\n")
         self.info_area.insert(tk.END, f"GPU VRAM Load: {gpu_vram_percentage}%\n")
         
         if cpu_load_percentage > 0:
@@ -114,7 +128,7 @@ class LoadTestApp:
             self.cpu_thread.start()
 
         if gpu_load_percentage > 0:
-            gpu_ids = list(range(torch.cuda.device_count()))
+            gpu_ids = startup.cuda_device_ids()
             if gpu_load_type == "3D Render":
                 self.gpu_thread = threading.Thread(target=self.run_gpu_load, args=(gpu_load_percentage, gpu_ids), daemon=True)
             else:
@@ -122,7 +136,7 @@ class LoadTestApp:
             self.gpu_thread.start()
 
         if gpu_vram_percentage > 0:
-            gpu_ids = list(range(torch.cuda.device_count()))  # ここでgpu_idsを再定義
+            gpu_ids = startup.cuda_device_ids()  # ここでgpu_idsを再定義
             self.gpu_vram_thread = threading.Thread(target=self.run_gpu_vram_load, args=(gpu_vram_percentage, gpu_ids), daemon=True)
             self.gpu_vram_thread.start()
 
@@ -130,28 +144,33 @@ class LoadTestApp:
         apply_cpu_load(cpu_load_percentage, self.stop_event)
 
     def run_gpu_load(self, gpu_load_percentage, gpu_ids):
-        apply_combined_load(gpu_load_percentage, self.stop_event, gpu_ids)
+        gpu_backend.apply_combined_load(gpu_load_percentage, self.stop_event, gpu_ids,
+                                        workload=self.gpu_workload.get())
 
     def run_gpu_tensor_load(self, gpu_load_percentage, gpu_ids):
-        apply_gpu_tensor_load(gpu_load_percentage, self.stop_event, gpu_ids)
+        gpu_backend.apply_gpu_tensor_load(gpu_load_percentage, self.stop_event, gpu_ids,
+                                          workload=self.gpu_workload.get())
 
     def run_gpu_vram_load(self, vram_percentage, gpu_ids):
-        apply_gpu_vram_load(vram_percentage, self.stop_event, gpu_ids)
+        gpu_backend.apply_gpu_vram_load(vram_percentage, self.stop_event, gpu_ids)
 
     def update_system_info(self):
         while True:
-            gpu_info = get_gpu_info()
-            psu_power = get_psu_power()
+            # 計測はバックグラウンドのサンプラーが担当 (nvidia-smi を毎回起動しない)
+            snap = self.telemetry.latest()
+            gpu_info = self.telemetry.format_gpu_info()
+            power = self.telemetry.gpu_power_total()
+            psu_power = f"GPU Power Draw: {power:.1f} W" if power is not None else "PSU Power: N/A"
 
             # CPUとメモリの使用率を取得して表示
-            cpu_usage = psutil.cpu_percent(interval=1)
-            memory_usage = psutil.virtual_memory().percent
-            vram_usage = torch.cuda.memory_allocated() / torch.cuda.get_device_properties(0).total_memory * 100
+            cpu_usage = snap.get("cpu", {}).get("percent") or 0.0
+            memory_usage = snap.get("memory", {}).get("percent") or 0.0
+            vram_usage = self.telemetry.vram_percent() or 0.0
 
             self.info_area.insert(tk.END, "\nUpdated System Info:\n" + gpu_info + "\n")
             self.psu_power_label.config(text=psu_power)
-            self.cpu_usage_label.config(text=f"CPU Usage: {cpu_usage}%")
-            self.memory_usage_label.config(text=f"Memory Usage: {memory_usage}%")
+            self.cpu_usage_label.config(text=f"CPU Usage: {cpu_usage:.1f}%")
+            self.memory_usage_label.config(text=f"Memory Usage: {memory_usage:.1f}%")
             self.gpu_vram_label.config(text=f"VRAM Usage: {vram_usage:.2f}%")
 
             if vram_usage > 90:  # 90%を超えたら警告を表示
@@ -179,7 +198,14 @@ class LoadTestApp:
         
         storage_test_app = StorageTestApp(storage_window)  # サブウィンドウでStorageTestAppを初期化
 
+def _after_first_draw():
+    startup.report()
+    if startup.gpu_present():
+        gpu_backend.preload()
+
+
 if __name__ == "__main__":
     root = tk.Tk()
     app = LoadTestApp(root)
+    root.after_idle(_after_first_draw)
     root.mainloop()
@@ -1,4 +1,7 @@
 #!/usr/bin/env python3
+import startup
+startup.install()  # 以降の import 時間を記録する
+
 import os
 import sys
 import subprocess
@@ -6,13 +9,13 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 import threading
 import multiprocessing
-import time
-import psutil
-import torch
 
 from cpu_load.cpu_load import apply_cpu_load, apply_cpu_load_x86
-from gpu_load.gpu_load import apply_gpu_tensor_load, apply_combined_load, apply_gpu_vram_load
-from system_info.system_info import get_cpu_info, get_gpu_info, get_psu_power
+from system_info.system_info import get_cpu_info, get_gpu_info
+from system_info.telemetry import get_sampler
+from gpu_load.gpu_kernels import WORKLOADS, DEFAULT_WORKLOAD, DEFAULT_MODE
+from gpu_load.gpu_workers import run_isolated
+from orchestrator import BurnInOrchestrator, BurnInProfile
 
 # StorageTest 関連のインポート
 try:
@@ -29,89 +32,9 @@ except ImportError:
     run_network_test_loop = None
     NetworkTestApp = None
 
-# グローバルな同期イベント（Burn‑in テスト用）
-global start_event
-start_event = threading.Event()
-
-
-def run_cpu_load_wrapper(cpu_func, cpu_load_percentage, stop_event):
-    start_event.wait()
-    cpu_func(cpu_load_percentage, stop_event)
 
-
-def run_gpu_load_wrapper(gpu_func, gpu_load_percentage, gpu_ids, stop_event):
-    start_event.wait()
-    gpu_func(gpu_load_percentage, stop_event, gpu_ids)
-
-
-def run_sound_test_wrapper(stop_event, info_area, sound_threshold, delay_time=3, test_duration=120):
-    start_event.wait()
-    time.sleep(delay_time)
-    if test_duration < 120:
-        try:
-            from sound_test.noisetester import play_and_record_main
-        except ImportError:
-            if info_area.winfo_exists():
-                info_area.insert(tk.END, "[Sound Loop] Sound test module not found. Skipping sound test.\n")
-                info_area.see(tk.END)
-            return
-        try:
-            mean_corr = play_and_record_main()
-            if info_area.winfo_exists():
-                info_area.insert(tk.END, f"[Sound Loop] Single run mean correlation: {mean_corr:.4f}\n")
-                if mean_corr < sound_threshold:
-                    info_area.insert(tk.END, "[Sound Loop] Warning: Low correlation detected.\n")
-                else:
-                    info_area.insert(tk.END, "[Sound Loop] Sound test passed.\n")
-                info_area.see(tk.END)
-        except Exception as e:
-            if info_area.winfo_exists():
-                info_area.insert(tk.END, f"[Sound Loop] Exception: {e}\n")
-        return
-    else:
-        while not stop_event.is_set():
-            try:
-                from sound_test.noisetester import play_and_record_main
-            except ImportError:
-                if info_area.winfo_exists():
-                    info_area.insert(tk.END, "[Sound Loop] Sound test module not found. Skipping sound test.\n")
-                    info_area.see(tk.END)
-                return
-            try:
-                mean_corr = play_and_record_main()
-                if info_area.winfo_exists():
-                    info_area.insert(tk.END, f"[Sound Loop] Mean correlation: {mean_corr:.4f}\n")
-                    if mean_corr < sound_threshold:
-                        info_area.insert(tk.END, "[Sound Loop] Warning: Low correlation detected.\n")
-                    else:
-                        info_area.insert(tk.END, "[Sound Loop] Sound test passed.\n")
-                    info_area.see(tk.END)
-            except Exception as e:
-                if info_area.winfo_exists():
-                    info_area.insert(tk.END, f"[Sound Loop] Exception: {e}\n")
-            for _ in range(3):
-                if stop_event.is_set():
-                    break
-                time.sleep(1)
-
-
-def run_storage_test_wrapper(storage_instance, progress_callback, duration, stop_event):
-    start_event.wait()
-    storage_instance.run_storage_test(progress_callback, duration)
-
-
-def run_network_test_wrapper(stop_event, net_area, test_interval=5):
-    # ネットワークテストの連続実行用関数を使用する
-    if run_network_test_loop is None:
-        net_area.insert(tk.END, "[Network Test] Network test module not found. Skipping network test.\n")
-        net_area.see(tk.END)
-        return
-    # ここでは、ターゲット IP をデフォルト（例: "8.8.8.8"）として実行します
-    target_ip = "8.8.8.8"
-    run_network_test_loop(stop_event, target_ip, test_interval, callback=lambda result: (
-        net_area.insert(tk.END, f"[Network Test] Result: {result}\n"),
-        net_area.see(tk.END)
-    ))
+# torch / pygame / OpenGL は初回使用時に読み込む (GPU があれば起動後にバックグラウンドで先読み)
+gpu_backend = startup.LazyBackend("gpu_load.gpu_load")
 
 
 def create_burnin_popup(root):
@@ -144,6 +67,10 @@ class LoadTestApp:
         self.gpu_vram_load = tk.IntVar(value=0)
         self.gpu_load_type = tk.StringVar(value="3D Render")
         self.cpu_load_type = tk.StringVar(value="Standard")
+        self.gpu_workload = tk.StringVar(value=DEFAULT_WORKLOAD)   # Model Training 時の Tensor ワークロード
+        self.gpu_mode = tk.StringVar(value=DEFAULT_MODE)           # "graph": CUDA graph replay
+        self.gpu_processes = tk.BooleanVar(value=False)            # GPU ごとに子プロセスで実行
+        self.vram_verify = tk.BooleanVar(value=False)              # VRAM にパターンを書いて検証
 
         # Burn‑in テスト関連
         self.burnin_duration = tk.IntVar(value=50)  # テスト時間（秒）
@@ -155,9 +82,10 @@ class LoadTestApp:
         self.cpu_threads = []
         self.cpu_processes = []
         self.gpu_threads = []
-        self.sound_test_thread = None
-        self.storage_test_thread = None
-        self.network_test_thread = None
+
+        # Burn‑in はオーケストレーターに任せる (CLI と共通)。時系列は record_rate [Hz] で記録
+        self.orchestrator = None
+        self.record_rate = 10.0
 
         # UI レイアウト
         controls_frame = tk.Frame(root)
@@ -180,11 +108,21 @@ class LoadTestApp:
         ttk.Label(controls_frame, text="GPU VRAM Load (%)").grid(column=0, row=3, padx=10, pady=5)
         self.gpu_vram_slider = ttk.Scale(controls_frame, from_=0, to=100, variable=self.gpu_vram_load)
         self.gpu_vram_slider.grid(column=1, row=3, padx=10, pady=5)
+        self.vram_verify_check = ttk.Checkbutton(controls_frame, text="Verify Patterns", variable=self.vram_verify)
+        self.vram_verify_check.grid(column=2, row=3, padx=10, pady=5)
         ttk.Label(controls_frame, text="GPU Load Type").grid(column=0, row=4, padx=10, pady=5)
         self.gpu_load_3d = ttk.Radiobutton(controls_frame, text="3D Render", variable=self.gpu_load_type, value="3D Render")
         self.gpu_load_3d.grid(column=1, row=4, padx=10, pady=5)
         self.gpu_load_tensor = ttk.Radiobutton(controls_frame, text="Model Training", variable=self.gpu_load_type, value="Model Training")
         self.gpu_load_tensor.grid(column=2, row=4, padx=10, pady=5)
+        self.gpu_workload_combo = ttk.Combobox(controls_frame, textvariable=self.gpu_workload,
+                                               values=list(WORKLOADS), state="readonly", width=12)
+        self.gpu_workload_combo.grid(column=3, row=4, padx=10, pady=5)
+        self.gpu_graph_check = ttk.Checkbutton(controls_frame, text="CUDA Graph", variable=self.gpu_mode,
+                                               onvalue="graph", offvalue="eager")
+        self.gpu_graph_check.grid(column=4, row=4, padx=10, pady=5)
+        self.gpu_process_check = ttk.Checkbutton(controls_frame, text="Process per GPU", variable=self.gpu_processes)
+        self.gpu_process_check.grid(column=5, row=4, padx=10, pady=5)
 
         # テストボタン
         self.start_button = ttk.Button(controls_frame, text="Start Load", command=self.apply_load)
@@ -225,6 +163,7 @@ class LoadTestApp:
         self.gpu_vram_label = tk.Label(root, text="VRAM Usage: N/A", font=("Helvetica", 14))
         self.gpu_vram_label.grid(column=0, row=5, columnspan=6, pady=10)
 
+        self.telemetry = get_sampler()
         self.display_system_info()
         self.start_update_loop()
 
@@ -283,101 +222,58 @@ class LoadTestApp:
     def run_burn_in_test(self):
         try:
             duration = int(self.burnin_duration.get())
+            stress = self.stress_level.get()
+            profile = BurnInProfile.preset(stress, duration,
+                                           cpu_type=self.cpu_load_type.get(), gpu_type=self.gpu_load_type.get(),
+                                           gpu_workload=self.gpu_workload.get(), gpu_mode=self.gpu_mode.get(),
+                                           gpu_processes=self.gpu_processes.get(), vram_verify=self.vram_verify.get(),
+                                           storage=StorageTest is not None, network=True, sound=True,
+                                           sound_threshold=self.sound_threshold, record_rate=self.record_rate)
         except Exception:
-            messagebox.showerror("Input Error", "Invalid burn‑in duration.")
-            return
-        stress = self.stress_level.get()
-        if stress == "Low":
-            cpu_val, gpu_val, vram_val = 30, 30, 30
-        elif stress == "Mid":
-            cpu_val, gpu_val, vram_val = 60, 60, 60
-        elif stress == "High":
-            cpu_val, gpu_val, vram_val = 80, 80, 80
-        else:
-            messagebox.showerror("Input Error", "Invalid stress level.")
+            messagebox.showerror("Input Error", "Invalid burn‑in duration or stress level.")
             return
 
         self.burn_in_mode = True
-        self.cpu_load.set(cpu_val)
-        self.gpu_load.set(gpu_val)
-        self.gpu_vram_load.set(vram_val)
+        self.cpu_load.set(profile.cpu)
+        self.gpu_load.set(profile.gpu)
+        self.gpu_vram_load.set(profile.vram)
         self.update_status(f"\nStarting Burn‑in Test for {duration} sec at {stress} level...\n")
-
-        self.stop_event = multiprocessing.Event()
-        self.burnin_stop_event.clear()
-        global start_event
-        start_event.clear()
-
-        # CPU Load Test
-        if self.cpu_load.get() > 0:
-            if self.cpu_load_type.get() == "x86":
-                p = multiprocessing.Process(target=run_cpu_load_wrapper, args=(apply_cpu_load_x86, self.cpu_load.get(), self.stop_event))
-                self.cpu_processes.append(p)
-                p.start()
-            else:
-                t = threading.Thread(target=run_cpu_load_wrapper, args=(apply_cpu_load, self.cpu_load.get(), self.stop_event), daemon=True)
-                self.cpu_threads.append(t)
-                t.start()
-        # GPU Load Test
-        if self.gpu_load.get() > 0:
-            gpu_ids = list(range(torch.cuda.device_count()))
-            if self.gpu_load_type.get() == "3D Render":
-                t = threading.Thread(target=run_gpu_load_wrapper, args=(apply_combined_load, self.gpu_load.get(), gpu_ids, self.stop_event), daemon=True)
-            else:
-                t = threading.Thread(target=run_gpu_load_wrapper, args=(apply_gpu_tensor_load, self.gpu_load.get(), gpu_ids, self.stop_event), daemon=True)
-            self.gpu_threads.append(t)
-            t.start()
-        # GPU VRAM Load Test
-        if self.gpu_vram_load.get() > 0:
-            gpu_ids = list(range(torch.cuda.device_count()))
-            t = threading.Thread(target=run_gpu_load_wrapper, args=(apply_gpu_vram_load, self.gpu_vram_load.get(), gpu_ids, self.stop_event), daemon=True)
-            self.gpu_threads.append(t)
-            t.start()
-
-        # Storage Test
-        if StorageTest is not None:
-            self.storage_test_instance = StorageTest(gui_callback=self.update_status)
-            self.storage_test_instance.detect_usb_devices()
-            self.storage_test_thread = threading.Thread(target=run_storage_test_wrapper,
-                                                        args=(self.storage_test_instance, self._update_storage_progress, duration, self.stop_event),
-                                                        daemon=True)
-            self.storage_test_thread.start()
-        else:
+        if StorageTest is None:
             self.update_status("[WARN] StorageTest module not found. Skipping storage test.")
 
-        # Network Test: Continuous execution in burn‑in mode
-        if run_network_test_wrapper:
-            self.network_test_thread = threading.Thread(target=run_network_test_wrapper,
-                                                          args=(self.stop_event, self.info_area, 5),
-                                                          daemon=True)
-            self.network_test_thread.start()
-        else:
-            self.update_status("[WARN] Network test module not found. Skipping network test.\n")
-
         # Create a popup window for burn‑in progress (for sound test progress)
         self.burnin_popup, self.burnin_progress = create_burnin_popup(self.root)
-        # Sound Test: run in a dedicated thread for burn‑in mode
-        self.sound_test_thread = threading.Thread(target=run_sound_test_wrapper,
-                                                    args=(self.stop_event, self.burnin_progress, self.sound_threshold, 3, duration),
-                                                    daemon=True)
-        self.sound_test_thread.start()
-
-        # Start all tests simultaneously
-        start_event.set()
-        threading.Thread(target=self._burn_in_timer, args=(duration,), daemon=True).start()
+        self.orchestrator = BurnInOrchestrator(profile, log=self._burn_in_log,
+                                               storage_progress=self._update_storage_progress,
+                                               on_finish=self._burn_in_finished, sampler=self.telemetry)
+        self.orchestrator.start()
+
+    def _burn_in_log(self, message):
+        # ワーカースレッドから呼ばれるので Tk 操作はメインループに回す
+        def write():
+            area = self.burnin_progress if message.startswith("[Sound") else self.info_area
+            if area.winfo_exists():
+                area.insert(tk.END, message + "\n")
+                area.see(tk.END)
+        self.root.after(0, write)
 
     def _update_storage_progress(self, index, percent):
-        self.update_status(f"[Storage] Device {index+1} progress: {percent:.1f}%")
-
-    def _burn_in_timer(self, duration):
-        time.sleep(duration)
-        self.stop_all_tests()
-        self.burn_in_mode = False
-        self.update_status("\nBurn‑in Test completed.\n")
-        self.root.after(0, lambda: messagebox.showinfo("Burn‑in Test", "Burn‑in Test completed."))
-        if hasattr(self, 'burnin_popup') and self.burnin_popup.winfo_exists():
-            self.burnin_popup.destroy()
-        self.root.after(100, self.reset_system_info)
+        self._burn_in_log(f"[Storage] Device {index+1} progress: {percent:.1f}%")
+
+    def _burn_in_finished(self, report):
+        def finish():
+            self.burn_in_mode = False
+            self.orchestrator = None
+            failed = [name for name, r in report["results"].items() if r["status"] not in ("pass", "skipped")]
+            self.update_status("\nBurn‑in Test completed.\n")
+            if failed:
+                messagebox.showwarning("Burn‑in Test", f"Burn‑in Test completed with failures: {', '.join(failed)}")
+            else:
+                messagebox.showinfo("Burn‑in Test", "Burn‑in Test completed.")
+            if hasattr(self, 'burnin_popup') and self.burnin_popup.winfo_exists():
+                self.burnin_popup.destroy()
+            self.root.after(100, self.reset_system_info)
+        self.root.after(0, finish)
 
     def reset_system_info(self):
         self.info_area.delete("1.0", tk.END)
@@ -396,7 +292,7 @@ class LoadTestApp:
         gpu_load_type = self.gpu_load_type.get()
 
         self.update_status(f"\nCPU Load: {cpu_load_percentage}% ({cpu_load_type})\n")
-        self.update_status(f"GPU Load: {gpu_load_percentage}% ({gpu_load_type})\n")
+        self.update_status(f"GPU Load: {gpu_load_percentage}% ({gpu_load_type}, {self.gpu_workload.get()}, {self.gpu_mode.get()})\n")
         self.update_status(f"GPU VRAM Load: {gpu_vram_percentage}%\n")
 
         if cpu_load_percentage > 0:
@@ -408,40 +304,67 @@ class LoadTestApp:
                 t = threading.Thread(target=apply_cpu_load, args=(cpu_load_percentage, self.stop_event), daemon=True)
                 self.cpu_threads.append(t)
                 t.start()
+        if self.gpu_processes.get():
+            self._start_gpu_processes(gpu_load_percentage, gpu_load_type, gpu_vram_percentage)
+            return
         if gpu_load_percentage > 0:
-            gpu_ids = list(range(torch.cuda.device_count()))
+            gpu_ids = startup.cuda_device_ids()
             if gpu_load_type == "3D Render":
-                t = threading.Thread(target=apply_combined_load, args=(gpu_load_percentage, self.stop_event, gpu_ids), daemon=True)
+                t = threading.Thread(target=self._run_gpu_backend, args=("apply_combined_load", gpu_load_percentage, self.stop_event, gpu_ids),
+                                     kwargs={"workload": self.gpu_workload.get(), "mode": self.gpu_mode.get()}, daemon=True)
             else:
-                t = threading.Thread(target=apply_gpu_tensor_load, args=(gpu_load_percentage, self.stop_event, gpu_ids), daemon=True)
+                t = threading.Thread(target=self._run_gpu_backend, args=("apply_gpu_tensor_load", gpu_load_percentage, self.stop_event, gpu_ids),
+                                     kwargs={"workload": self.gpu_workload.get(), "mode": self.gpu_mode.get()}, daemon=True)
+            self.gpu_threads.append(t)
+            t.start()
+        if gpu_vram_percentage > 0:
+            gpu_ids = startup.cuda_device_ids()
+            t = threading.Thread(target=self._run_gpu_backend, args=("apply_gpu_vram_load", gpu_vram_percentage, self.stop_event, gpu_ids),
+                                 kwargs={"verify": self.vram_verify.get()}, daemon=True)
             self.gpu_threads.append(t)
             t.start()
+
+    def _run_gpu_backend(self, func_name, *args, **kwargs):
+        # gpu_load (torch / pygame / OpenGL) の読み込みはワーカースレッド側で行う
+        getattr(gpu_backend, func_name)(*args, **kwargs)
+
+    def _start_gpu_processes(self, gpu_load_percentage, gpu_load_type, gpu_vram_percentage):
+        # デバイスごとの子プロセスで実行するので、1 台が落ちても GUI と他の GPU は止まらない
+        gpu_ids = startup.cuda_device_ids()
+        jobs = []
+        if gpu_load_percentage > 0:
+            kind = "combined" if gpu_load_type == "3D Render" else "tensor"
+            jobs.append((kind, gpu_load_percentage, {"workload": self.gpu_workload.get(), "mode": self.gpu_mode.get()}))
         if gpu_vram_percentage > 0:
-            gpu_ids = list(range(torch.cuda.device_count()))
-            t = threading.Thread(target=apply_gpu_vram_load, args=(gpu_vram_percentage, self.stop_event, gpu_ids), daemon=True)
+            jobs.append(("vram", gpu_vram_percentage, {"verify": self.vram_verify.get()}))
+        for kind, percentage, options in jobs:
+            t = threading.Thread(target=run_isolated, args=(kind, percentage, self.stop_event, gpu_ids),
+                                 kwargs={"log": self._burn_in_log, **options}, daemon=True)
             self.gpu_threads.append(t)
             t.start()
 
     # ============== System Information Display ==============
     def display_system_info(self):
-        cpu_info = get_cpu_info()
-        gpu_info = get_gpu_info()
-        self.update_status("CPU Info:\n" + cpu_info + "\n")
-        self.update_status("GPU Info:\n" + gpu_info + "\n")
+        # lscpu / nvidia-smi はウィンドウ表示を待たせないよう別スレッドで実行
+        def fetch():
+            cpu_info = get_cpu_info()
+            gpu_info = get_gpu_info()
+            self.root.after(0, lambda: (self.update_status("CPU Info:\n" + cpu_info + "\n"),
+                                        self.update_status("GPU Info:\n" + gpu_info + "\n")))
+        threading.Thread(target=fetch, daemon=True).start()
 
     def update_system_info(self):
-        psu_power = get_psu_power()
-        cpu_usage = psutil.cpu_percent(interval=1)
-        memory_usage = psutil.virtual_memory().percent
-        if torch.cuda.device_count() > 0:
-            vram_usage = (torch.cuda.memory_allocated() / torch.cuda.get_device_properties(0).total_memory) * 100
-        else:
-            vram_usage = 0
-        self.psu_power_label.config(text=psu_power)
-        self.cpu_usage_label.config(text=f"CPU Usage: {cpu_usage}%")
-        self.memory_usage_label.config(text=f"Memory Usage: {memory_usage}%")
-        self.gpu_vram_label.config(text=f"VRAM Usage: {vram_usage:.2f}%")
-        self.root.after(5000, self.update_system_info)
+        # 計測はバックグラウンドのサンプラーが行うので、ここでは最新値を読むだけ (Tk を止めない)
+        snap = self.telemetry.latest()
+        power = self.telemetry.gpu_power_total()
+        cpu_usage = snap.get("cpu", {}).get("percent")
+        memory_usage = snap.get("memory", {}).get("percent")
+        vram_usage = self.telemetry.vram_percent()
+        self.psu_power_label.config(text=f"GPU Power Draw: {power:.1f} W" if power is not None else "PSU Power: N/A")
+        self.cpu_usage_label.config(text=f"CPU Usage: {cpu_usage:.1f}%" if cpu_usage is not None else "CPU Usage: N/A")
+        self.memory_usage_label.config(text=f"Memory Usage: {memory_usage:.1f}%" if memory_usage is not None else "Memory Usage: N/A")
+        self.gpu_vram_label.config(text=f"VRAM Usage: {vram_usage:.2f}%" if vram_usage is not None else "VRAM Usage: N/A")
+        self.root.after(1000, self.update_system_info)
 
     def start_update_loop(self):
         self.update_system_info()
@@ -450,6 +373,8 @@ class LoadTestApp:
         if self.stop_event:
             self.stop_event.set()
         self.burnin_stop_event.set()
+        if self.orchestrator is not None:
+            threading.Thread(target=self.orchestrator.stop, daemon=True).start()
         self.update_status("\nStop signal sent. Waiting for tests to terminate...\n")
         threading.Thread(target=self._join_all_threads, daemon=True).start()
 
@@ -464,13 +389,6 @@ class LoadTestApp:
         for thread in self.gpu_threads:
             if thread.is_alive():
                 thread.join(timeout=5)
-        if self.storage_test_thread and self.storage_test_thread.is_alive():
-            self.storage_test_instance.stop_test()
-            self.storage_test_thread.join(timeout=5)
-        if self.sound_test_thread and self.sound_test_thread.is_alive():
-            self.sound_test_thread.join(timeout=5)
-        if self.network_test_thread and self.network_test_thread.is_alive():
-            self.network_test_thread.join(timeout=5)
         self.root.after(0, lambda: self.update_status("\nAll tests have been stopped.\n"))
 
     def exit_app(self):
@@ -481,8 +399,15 @@ class LoadTestApp:
         sys.exit(0)
 
 
+def _after_first_draw():
+    startup.report()
+    if startup.gpu_present():
+        gpu_backend.preload()
+
+
 if __name__ == "__main__":
     root = tk.Tk()
     app = LoadTestApp(root)
     app.start_update_loop()
+    root.after_idle(_after_first_draw)
     root.mainloop()
@@ -0,0 +1,439 @@
+#!/usr/bin/env python3
+"""
+orchestrator.py  ―  Burn-in テストの共通オーケストレーション (GUI / CLI 共用)
+  ・BurnInProfile: 時間と各ワーカーの負荷レベルを宣言的に記述 (JSON で読み書き可能)
+  ・BurnInOrchestrator: 必要なワーカーだけを起動し、開始を揃え、時間が来たら止めて
+    合否付きのレポートを作る。使わないバックエンド (torch / pygame / OpenGL / 録音) は読み込まない
+"""
+
+import json
+import re
+import multiprocessing
+import threading
+import time
+from dataclasses import asdict, dataclass, fields
+
+try:
+    from cpu_load.cpu_load import apply_cpu_load, apply_cpu_load_x86, make_load_level, DEFAULT_TOLERANCE
+except ImportError:
+    from cpu_load import apply_cpu_load, apply_cpu_load_x86, make_load_level, DEFAULT_TOLERANCE
+try:
+    from gpu_load.gpu_kernels import MODES as GPU_MODES, WORKLOADS as GPU_WORKLOADS
+except ImportError:
+    from gpu_kernels import MODES as GPU_MODES, WORKLOADS as GPU_WORKLOADS
+try:
+    from storage_load.storage_io import BACKENDS as IO_BACKENDS, PATTERNS as IO_PATTERNS, IoJob, parse_size
+except ImportError:
+    from storage_io import BACKENDS as IO_BACKENDS, PATTERNS as IO_PATTERNS, IoJob, parse_size
+from startup import cuda_device_ids
+
+STRESS_PRESETS = {"Low": 30, "Mid": 60, "High": 80}
+LIVE_LEVELS = ("cpu", "gpu")           # 実行中に set_level() で変更できる負荷
+GPU_TYPES = ("3D Render", "Model Training")
+CPU_TYPES = ("Standard", "x86")
+WORKER_JOIN_TIMEOUT = 20                # 停止後に負荷スレッドの終了を待つ秒数
+JOB_JOIN_TIMEOUT = 30                   # 停止後に各ジョブの結果を待つ秒数 (WORKER_JOIN_TIMEOUT より長く)
+
+
+@dataclass
+class BurnInProfile:
+    duration: int = 60
+    cpu: int = 0
+    cpu_type: str = "Standard"
+    cpu_kernel: str = "spin"
+    cpu_placement: str | None = None
+    cpu_tolerance: float = DEFAULT_TOLERANCE
+    gpu: int = 0
+    gpu_type: str = "Model Training"
+    gpu_workload: str = "fp32"        # gpu_kernels.WORKLOADS (Model Training / 3D Render の Tensor 部分)
+    gpu_mode: str = "eager"           # gpu_kernels.MODES ("graph": CUDA graph replay)
+    gpu_processes: bool = False       # GPU / VRAM 負荷をデバイスごとの子プロセスで実行 (gpu_workers.py)
+    render_offscreen: bool | None = None   # 3D Render を FBO に描く (None: ディスプレイが無ければ自動)
+    render_size: str = "1920x1080"    # 3D 描画の解像度 (オフスクリーンの FBO またはウィンドウ)
+    render_overdraw: int = 1          # 1 フレームに全画面を描き重ねる回数
+    render_batches: int = 1           # メッシュごとの draw call 分割数
+    vram: int = 0
+    vram_verify: bool = False         # VRAM にパターンを書いて読み戻す (vram_patterns.py)
+    storage: bool = False
+    storage_block_size: str = "1M"    # storage_io.IoJob (ブロックサイズ / キュー深さ / seq・rand / 読み込み % / ファイル)
+    storage_queue_depth: int = 4
+    storage_pattern: str = "seq"
+    storage_read_pct: int = 50
+    storage_file_size: str = "1G"
+    storage_backend: str = "threads"  # storage_io.BACKENDS ("aio": Linux AIO)
+    storage_direct: bool = False      # O_DIRECT でページキャッシュを通さない
+    storage_verify: bool = True       # 書いたブロックを読んだときに検証する (storage_patterns)
+    storage_per_controller: int = 4   # 同じホストコントローラ / 外付けハブで同時にテストするデバイス数 (0: 無制限)
+    storage_per_hub: int = 2
+    network: bool = False
+    network_target: str = "8.8.8.8"
+    network_interval: int = 5
+    sound: bool = False
+    sound_threshold: float = 0.6
+    record_rate: float = 0.0          # 0 なら記録しない
+    record_path: str | None = None
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "BurnInProfile":
+        known = {f.name for f in fields(cls)}
+        unknown = set(data) - known
+        if unknown:
+            raise ValueError(f"unknown profile keys: {', '.join(sorted(unknown))}")
+        profile = cls(**data)
+        profile.validate()
+        return profile
+
+    @classmethod
+    def preset(cls, stress: str, duration: int, **overrides) -> "BurnInProfile":
+        """GUI の Low / Mid / High と同じ負荷レベル"""
+        if stress not in STRESS_PRESETS:
+            raise ValueError(f"invalid stress level: {stress!r}")
+        level = STRESS_PRESETS[stress]
+        return cls.from_dict({"duration": duration, "cpu": level, "gpu": level, "vram": level, **overrides})
+
+    def validate(self):
+        if self.duration <= 0:
+            raise ValueError("duration must be positive")
+        for name in ("cpu", "gpu", "vram"):
+            if not 0 <= getattr(self, name) <= 100:
+                raise ValueError(f"{name} level must be within 0-100")
+        if self.cpu_type not in CPU_TYPES:
+            raise ValueError(f"cpu_type must be one of {CPU_TYPES}")
+        if self.gpu_type not in GPU_TYPES:
+            raise ValueError(f"gpu_type must be one of {GPU_TYPES}")
+        if self.gpu_workload not in GPU_WORKLOADS:
+            raise ValueError(f"gpu_workload must be one of {tuple(GPU_WORKLOADS)}")
+        if self.gpu_mode not in GPU_MODES:
+            raise ValueError(f"gpu_mode must be one of {tuple(GPU_MODES)}")
+        if not re.fullmatch(r"[1-9]\d*x[1-9]\d*", self.render_size):
+            raise ValueError("render_size must look like 1920x1080")
+        if self.render_overdraw < 1 or self.render_batches < 1:
+            raise ValueError("render_overdraw and render_batches must be at least 1")
+        if self.storage_pattern not in IO_PATTERNS:
+            raise ValueError(f"storage_pattern must be one of {IO_PATTERNS}")
+        if self.storage_backend not in IO_BACKENDS:
+            raise ValueError(f"storage_backend must be one of {IO_BACKENDS}")
+        if self.storage_per_controller < 0 or self.storage_per_hub < 0:
+            raise ValueError("storage_per_controller and storage_per_hub must be 0 (unlimited) or more")
+        self.io_job()
+
+    def io_job(self) -> IoJob:
+        return IoJob(parse_size(self.storage_block_size), self.storage_queue_depth, self.storage_pattern,
+                     self.storage_read_pct, parse_size(self.storage_file_size),
+                     backend=self.storage_backend, direct=self.storage_direct, verify=self.storage_verify).validate()
+
+
+def load_profile(path: str) -> BurnInProfile:
+    with open(path) as f:
+        return BurnInProfile.from_dict(json.load(f))
+
+
+def _thread_failures(threads, results) -> dict:
+    """スレッドで動かした負荷の失敗: 例外で終わったもの ({"error": ...}) と、停止後も終わらないもの"""
+    for t in threads:
+        t.join(timeout=WORKER_JOIN_TIMEOUT)
+    failed = {key: r["error"] for key, r in results.items() if isinstance(r, dict) and r.get("error")}
+    failed.update({t.name: "still running after stop" for t in threads if t.is_alive()})
+    return failed
+
+
+class BurnInOrchestrator:
+    """
+    orch = BurnInOrchestrator(profile, log=print)
+    orch.start(); report = orch.wait()      # report["passed"] で合否
+    log は文字列 1 行を受け取る関数 (GUI ではテキストエリア、CLI では print)。
+    """
+
+    def __init__(self, profile: BurnInProfile, log=print, storage_progress=None,
+                 on_finish=None, sampler=None, live=()):
+        self.profile = profile
+        self.live = set(live)          # 0% でも起動しておく負荷 (後から set_level で上げる)
+        self.log = log
+        self.storage_progress = storage_progress or (lambda index, percent: None)
+        self.on_finish = on_finish
+        self.sampler = sampler
+        self.stop_event = multiprocessing.Event()
+        self.levels = {name: make_load_level(getattr(profile, name)) for name in LIVE_LEVELS}
+        self.start_event = threading.Event()      # 全ワーカーの開始を揃える
+        self.done = threading.Event()
+        self.threads: list[threading.Thread] = []
+        self.jobs: list[str] = []                 # 起動したジョブ名 (結果が来なければ不合格)
+        self.results: dict[str, dict] = {}
+        self.storage = None
+        self.recorder = None
+        self.started = None
+        self.finished = None
+        self._lock = threading.Lock()
+
+    # ── 起動 ───────────────────────────────────────────────
+    def start(self):
+        p = self.profile
+        self.log(f"[Burn-in] Starting for {p.duration} sec "
+                 f"(CPU {p.cpu}% {p.cpu_type}, GPU {p.gpu}% {p.gpu_type}/{p.gpu_workload}, VRAM {p.vram}%)")
+        if p.cpu > 0 or "cpu" in self.live:
+            self._spawn("cpu", self._cpu_job)
+        if p.gpu > 0 or p.vram > 0 or "gpu" in self.live:
+            gpu_ids = cuda_device_ids()
+            if not gpu_ids:
+                self._result("gpu", "skipped", reason="no CUDA device")
+            else:
+                if p.gpu > 0 or "gpu" in self.live:
+                    self._spawn("gpu", self._gpu_job, gpu_ids)
+                if p.vram > 0:
+                    self._spawn("vram", self._vram_job, gpu_ids)
+        if p.storage:
+            self._spawn("storage", self._storage_job)
+        if p.network:
+            self._spawn("network", self._network_job)
+        if p.sound:
+            self._spawn("sound", self._sound_job)
+        if p.record_rate > 0:
+            self._start_recorder()
+
+        self.started = time.time()
+        self.start_event.set()
+        threading.Thread(target=self._timer, daemon=True).start()
+        return self
+
+    def stop(self):
+        """時間切れ前でも止められる。何度呼んでもよい"""
+        self.stop_event.set()
+        if self.storage is not None:
+            self.storage.stop_test()
+        for t in self.threads:
+            t.join(timeout=JOB_JOIN_TIMEOUT)
+        with self._lock:
+            if self.finished is None:
+                for name in self.jobs:
+                    if name not in self.results:
+                        self._result(name, "error", error="no result: worker still running after stop")
+                        self.log(f"[ERROR] {name} worker did not finish after stop")
+                self.finished = time.time()
+                self._stop_recorder()
+                self.log(f"[Burn-in] {'PASSED' if self.passed() else 'FAILED'}")
+                self.done.set()
+                if self.on_finish:
+                    self.on_finish(self.report())
+
+    def set_level(self, name: str, percent: float):
+        """CPU / GPU の負荷率を実行中に変更する (次のスライスから反映)"""
+        if name not in LIVE_LEVELS:
+            raise ValueError(f"{name} level cannot be changed while running")
+        percent = min(100.0, max(0.0, float(percent)))
+        self.levels[name].value = percent
+        setattr(self.profile, name, percent)
+        self.log(f"[Burn-in] {name.upper()} level -> {percent:g}%")
+
+    def wait(self, timeout=None) -> dict:
+        self.done.wait(timeout)
+        return self.report()
+
+    def _timer(self):
+        if not self.stop_event.wait(self.profile.duration):
+            self.log("[Burn-in] Duration reached, stopping workers...")
+        self.stop()
+
+    # ── 結果 ───────────────────────────────────────────────
+    def _result(self, name: str, status: str, **details):
+        if self.finished is not None and name in self.results:
+            return                        # 締め切った後に届いた結果で判定を書き換えない
+        self.results[name] = {"status": status, **details}
+
+    def passed(self) -> bool:
+        # 結果の来ていないジョブ (まだ走っている / 黙って落ちた) は合格にしない
+        return (all(name in self.results for name in self.jobs)
+                and all(r["status"] in ("pass", "skipped") for r in self.results.values()))
+
+    def report(self) -> dict:
+        return {
+            "profile": asdict(self.profile),
+            "started": self.started,
+            "finished": self.finished,
+            "elapsed": (self.finished or time.time()) - (self.started or time.time()),
+            "results": self.results,
+            "recording": self.recorder.path if self.recorder else self.profile.record_path,
+            "recording_error": self.recorder.error if self.recorder else None,
+            "passed": self.passed(),
+        }
+
+    def _spawn(self, name: str, job, *args):
+        def run():
+            self.start_event.wait()
+            try:
+                job(*args)
+            except Exception as e:
+                self._result(name, "error", error=f"{type(e).__name__}: {e}")
+                self.log(f"[ERROR] {name} worker: {e}")
+        t = threading.Thread(target=run, name=f"burnin-{name}", daemon=True)
+        self.jobs.append(name)
+        self.threads.append(t)
+        t.start()
+
+    # ── 各ワーカー ─────────────────────────────────────────
+    def _cpu_job(self):
+        p = self.profile
+        if p.cpu_type == "x86":
+            summary = apply_cpu_load_x86(p.cpu, self.stop_event, placement=p.cpu_placement,
+                                         tolerance=p.cpu_tolerance, level=self.levels["cpu"])
+        else:
+            summary = apply_cpu_load(p.cpu, self.stop_event, kernel=p.cpu_kernel,
+                                     placement=p.cpu_placement, tolerance=p.cpu_tolerance,
+                                     level=self.levels["cpu"])
+        if summary is None:
+            self._result("cpu", "error", error="mixed_load binary not available")
+            return
+        summary = {k: v for k, v in summary.items() if k != "series"}
+        ok = not summary.get("samples") or summary["mean_abs_error"] <= p.cpu_tolerance
+        self._result("cpu", "pass" if ok else "fail", **summary)
+
+    def _gpu_job(self, gpu_ids):
+        p = self.profile
+        render = {"offscreen": p.render_offscreen, "size": p.render_size,
+                  "passes": p.render_overdraw, "batches": p.render_batches}
+        if p.gpu_processes:
+            kind = "combined" if p.gpu_type == "3D Render" else "tensor"
+            self._isolated_job("gpu", kind, p.gpu, gpu_ids, level=self.levels["gpu"],
+                               workload=p.gpu_workload, mode=p.gpu_mode, render=render)
+            return
+        # GPU 系は関数がスレッドを起動してすぐ返るので、停止まで待つ
+        try:
+            from gpu_load.gpu_load import apply_gpu_tensor_load, apply_combined_load
+        except ImportError:
+            from gpu_load import apply_gpu_tensor_load, apply_combined_load
+        results = {}
+        if p.gpu_type == "3D Render":
+            threads = apply_combined_load(p.gpu, self.stop_event, gpu_ids, level=self.levels["gpu"],
+                                          workload=p.gpu_workload, mode=p.gpu_mode, render=render, results=results)
+        else:
+            threads = apply_gpu_tensor_load(p.gpu, self.stop_event, gpu_ids, level=self.levels["gpu"],
+                                            workload=p.gpu_workload, mode=p.gpu_mode, results=results)
+        self.stop_event.wait()
+        failed = _thread_failures(threads, results)
+        workers = {key: {k: v for k, v in r.items() if k != "series"} if isinstance(r, dict) else r
+                   for key, r in results.items()}
+        self._result("gpu", "fail" if failed else "pass", gpus=gpu_ids, type=p.gpu_type,
+                     workload=p.gpu_workload, mode=p.gpu_mode, failed=failed, workers=workers)
+
+    def _vram_job(self, gpu_ids):
+        p = self.profile
+        if p.gpu_processes:
+            self._isolated_job("vram", "vram", p.vram, gpu_ids, verify=p.vram_verify)
+            return
+        try:
+            from gpu_load.gpu_load import apply_gpu_vram_load
+        except ImportError:
+            from gpu_load import apply_gpu_vram_load
+        results = {}
+        threads = apply_gpu_vram_load(p.vram, self.stop_event, gpu_ids, verify=p.vram_verify, results=results)
+        self.stop_event.wait()
+        failed = _thread_failures(threads, results)
+        errors = {gpu: r["errors"] for gpu, r in results.items() if isinstance(r, dict) and r.get("errors")}
+        self._result("vram", "fail" if errors or failed else "pass", gpus=gpu_ids, verify=p.vram_verify,
+                     errors=errors, failed=failed, workers=results)
+
+    def _isolated_job(self, name, kind, percentage, gpu_ids, **options):
+        # 子プロセスが落ちてもここでは例外にせず、そのデバイスを不合格として記録する
+        try:
+            from gpu_load.gpu_workers import run_isolated
+        except ImportError:
+            from gpu_workers import run_isolated
+        results = run_isolated(kind, percentage, self.stop_event, gpu_ids, log=self.log, **options)
+        failed = {gpu: r["error"] or f"exit code {r['exitcode']}" for gpu, r in results.items()
+                  if r["state"] in ("crashed", "failed")}
+        failed.update({gpu: f"{r['summary']['errors']} VRAM pattern errors" for gpu, r in results.items()
+                       if (r["summary"] or {}).get("errors")})
+        self._result(name, "fail" if failed else "pass", gpus=gpu_ids, processes=True,
+                     failed=failed, workers={gpu: r["summary"] for gpu, r in results.items()},
+                     **{k: v for k, v in options.items() if k != "level"})
+
+    def _storage_job(self):
+        try:
+            from storage_load.storage_test import StorageTest
+        except ImportError:
+            try:
+                from storage_test import StorageTest
+            except ImportError:
+                self._result("storage", "skipped", reason="storage test module not found")
+                return
+        p = self.profile
+        self.storage = StorageTest(gui_callback=self.log, io_job=p.io_job(),
+                                   per_controller=p.storage_per_controller, per_hub=p.storage_per_hub)
+        self.storage.detect_usb_devices()
+        if self.stop_event.is_set():
+            self.storage.stop_event.set()
+        self.storage.run_storage_test(self.storage_progress, p.duration)
+        failures = sum(f for _, f in self.storage.results.values())
+        self._result("storage", "pass" if failures == 0 else "fail",
+                     devices={k: {"success": s, "fail": f, **self.storage.io_stats.get(k, {})}
+                              for k, (s, f) in self.storage.results.items()})
+
+    def _network_job(self):
+        try:
+            from network_test.nettest import run_network_test_loop
+        except ImportError:
+            self._result("network", "skipped", reason="network test module not found")
+            return
+        samples = []
+
+        def on_result(result):
+            samples.append(result)
+            self.log(f"[Network Test] Result: {result}")
+            rtt = result.get("rtt_ms") if isinstance(result, dict) else result
+            if self.recorder is not None and isinstance(rtt, (int, float)):
+                self.recorder.set_gauge("net.rtt_ms", rtt)
+
+        p = self.profile
+        run_network_test_loop(self.stop_event, p.network_target, p.network_interval, callback=on_result)
+        self._result("network", "pass", samples=len(samples))
+
+    def _sound_job(self):
+        try:
+            from sound_test.noisetester import play_and_record_main
+        except ImportError:
+            self._result("sound", "skipped", reason="sound test module not found")
+            self.log("[Sound Loop] Sound test module not found. Skipping sound test.")
+            return
+        threshold = self.profile.sound_threshold
+        correlations = []
+        if self.stop_event.wait(3):
+            return
+        # 120 秒未満の Burn-in では 1 回だけ、それ以上は停止まで繰り返す
+        while not self.stop_event.is_set():
+            corr = play_and_record_main()
+            correlations.append(corr)
+            self.log(f"[Sound Loop] Mean correlation: {corr:.4f}")
+            self.log("[Sound Loop] Warning: Low correlation detected." if corr < threshold
+                     else "[Sound Loop] Sound test passed.")
+            if self.profile.duration < 120 or self.stop_event.wait(3):
+                break
+        worst = min(correlations) if correlations else None
+        self._result("sound", "pass" if worst is None or worst >= threshold else "fail",
+                     runs=len(correlations), min_correlation=worst, threshold=threshold)
+
+    # ── 記録 ───────────────────────────────────────────────
+    def _start_recorder(self):
+        try:
+            from system_info.recorder import TimeSeriesRecorder
+            from system_info.telemetry import get_sampler
+        except ImportError:
+            from recorder import TimeSeriesRecorder
+            from telemetry import get_sampler
+        path = self.profile.record_path or time.strftime("burnin_%Y%m%d_%H%M%S")
+        try:
+            self.recorder = TimeSeriesRecorder(path, rate=self.profile.record_rate,
+                                               sampler=self.sampler or get_sampler(), log=self.log)
+            self.recorder.add_gauge("net.rtt_ms")
+            self.recorder.start()
+            self.log(f"[Recorder] Recording {len(self.recorder.channels)} channels at "
+                     f"{self.profile.record_rate:g} Hz to {path}/")
+        except Exception as e:
+            self.recorder = None
+            self.log(f"[WARN] Recorder could not start: {e}")
+
+    def _stop_recorder(self):
+        if self.recorder is not None:
+            self.recorder.stop()
+            self.log(f"[Recorder] {self.recorder.committed} samples saved to {self.recorder.path}/")
+            if self.recorder.error:
+                self.log(f"[WARN] Recording stopped early ({self.recorder.error}); "
+                         f"samples after that point are missing")
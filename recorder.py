@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+recorder.py  ―  Burn-in 用 時系列レコーダー (列指向・追記専用・memmap で読める形式)
+
+記録ディレクトリの中身:
+  meta.json        チャネル名、dtype、サンプリングレート、開始時刻 (追記しても最初の開始時刻を残し、
+                   再開のたびに sessions に開始時刻と先頭行を足す)
+  index.json       確定済みの行数 (committed)。chunk_rows 行たまるか flush_sec 秒たつたびに
+                   書き込み + fsync の後にだけ更新する
+  t.f64            タイムスタンプ列 (float64, little endian)
+  <channel>.f32    チャネルごとの列 (float32, 欠測は NaN)
+
+クラッシュした場合も index.json の committed 行までは必ず揃っているので、
+読み出し側はそこまでを np.memmap で開くだけでよい (テキスト解析不要)。
+周波数・温度の sysfs ファイルは開始時に開いたままにして、毎サンプル pread で読み直す。
+コア使用率は /proc/stat (USER_HZ = 100 刻み) の差分なので、サンプル間隔ではなく直近 CPU_WINDOW_SEC 秒の
+窓で出す (10 ms 間隔の差分では 0% / 100% / 欠測にしかならない)。
+書き込みの失敗 (ENOSPC など) で記録が止まったときは [WARN] を出し、error に理由を残す。
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+try:
+    from cpu_load.cpu_load import read_core_times, core_utilization
+    from system_info.telemetry import CPUFREQ_ROOT, THERMAL_ROOT, read_cpu_freqs, read_temperatures
+except ImportError:
+    from cpu_load import read_core_times, core_utilization
+    from telemetry import CPUFREQ_ROOT, THERMAL_ROOT, read_cpu_freqs, read_temperatures
+
+MAX_RATE_HZ = 100.0
+CPU_WINDOW_SEC = 0.25    # コア使用率を出す窓 (USER_HZ = 100 なので 1 tick = 4%)
+SECTOR_BYTES = 512
+
+
+def _write_json_atomic(path: str, obj):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(obj, f, indent=1)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _safe_name(name: str) -> str:
+    return "".join(c if c.isalnum() or c in "._-" else "_" for c in name)
+
+
+def read_diskstats(path: str = "/proc/diskstats") -> dict[str, tuple[int, int]]:
+    """/sys/block にある (パーティションでない) デバイスごとの (読み, 書き) セクタ累計"""
+    try:
+        disks = set(os.listdir("/sys/block"))
+    except OSError:
+        disks = set()
+    stats = {}
+    try:
+        with open(path) as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) > 9 and fields[2] in disks and not fields[2].startswith(("loop", "ram", "zram")):
+                    stats[fields[2]] = (int(fields[5]), int(fields[9]))
+    except OSError:
+        pass
+    return stats
+
+
+class TimeSeriesRecorder:
+    """
+    rec = TimeSeriesRecorder("burnin_run", rate=50, sampler=get_sampler())
+    rec.add_gauge("net.rtt_ms")          # 他スレッドから set_gauge() で値を入れる
+    rec.start(); ...; rec.stop()
+    GPU チャネルは sampler の更新周期で値が変わる (それ以外は rate で直接読む)。
+    """
+
+    def __init__(self, path: str, rate: float = 10.0, chunk_rows: int = 512, sampler=None,
+                 per_core: bool = True, disks: bool = True, flush_sec: float = 5.0, log=print):
+        if not 0 < rate <= MAX_RATE_HZ:
+            raise ValueError(f"rate must be in (0, {MAX_RATE_HZ:g}] Hz")
+        self.path = path
+        self.rate = rate
+        self.chunk_rows = chunk_rows
+        self.flush_sec = flush_sec      # 行数が貯まらなくてもこの間隔で確定する (低レートでの取りこぼし対策)
+        self.sampler = sampler
+        self.per_core = per_core
+        self.disks = disks
+        self.log = log
+        self.error = None               # 記録が途中で止まったときの理由
+        self.probes: dict[str, callable] = {}
+        self.gauges: dict[str, float] = {}
+        self.channels: list[str] = []
+        self.committed = 0
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.fds: dict[str, int] = {}
+        self._sysfs: list[tuple[int, int]] = []    # (列番号, 開いたままの sysfs ファイル)。値は 1/1000 して入れる
+
+    # ── チャネル登録 (start 前) ─────────────────────────────
+    def add_channel(self, name: str, fn):
+        """fn() -> float を毎サンプル呼ぶ (pull 型)"""
+        self.probes[name] = fn
+
+    def add_gauge(self, name: str):
+        """set_gauge() で最新値を入れておく (push 型: ネットワーク RTT など)"""
+        self.gauges[name] = float("nan")
+
+    def set_gauge(self, name: str, value: float):
+        self.gauges[name] = float(value)
+
+    # ── 記録 ───────────────────────────────────────────────
+    def _discover(self):
+        cores = sorted(read_core_times()) if self.per_core else []
+        freqs = read_cpu_freqs()
+        temps = read_temperatures()
+        gpus = self.sampler.latest()["gpus"] if self.sampler else []
+        disks = sorted(read_diskstats()) if self.disks else []
+        channels = [f"cpu{c}.util" for c in cores]
+        channels += [f"cpu{c}.mhz" for c in sorted(freqs)]
+        channels += [f"temp.{z}" for z in sorted(temps)]
+        for g in gpus:
+            channels += [f"gpu{g['index']}.util", f"gpu{g['index']}.power", f"gpu{g['index']}.vram_mb"]
+        for d in disks:
+            channels += [f"disk.{d}.read_mbs", f"disk.{d}.write_mbs"]
+        channels += list(self.probes) + list(self.gauges)
+        return channels, cores, disks
+
+    def start(self):
+        os.makedirs(self.path, exist_ok=True)
+        self.channels, self._cores, self._disks = self._discover()
+        self._index = {name: k for k, name in enumerate(self.channels)}
+        self.committed = _read_committed(self.path)
+        if self.committed:
+            # 既存の記録に追記する場合は列構成が同じでなければならない
+            existing = Recording(self.path).channels
+            if existing != self.channels:
+                raise ValueError(f"{self.path} already holds a recording with different channels")
+        self._write_meta(time.time())
+        flags = os.O_WRONLY | os.O_CREAT | os.O_APPEND
+        self.fds = {"t": os.open(os.path.join(self.path, "t.f64"), flags, 0o644)}
+        for c in self.channels:
+            self.fds[c] = os.open(os.path.join(self.path, _safe_name(c) + ".f32"), flags, 0o644)
+        self._truncate_to_committed()
+        self._open_sysfs()
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+        self.thread.start()
+        return self
+
+    def _write_meta(self, start: float):
+        """meta.json を書く。既存の記録に追記するときは最初の開始時刻を残して再開を sessions に足す"""
+        path = os.path.join(self.path, "meta.json")
+        meta = {}
+        if self.committed:
+            try:
+                with open(path) as f:
+                    meta = json.load(f)
+            except (OSError, ValueError):
+                meta = {}
+        sessions = meta.get("sessions") or [{"start": meta.get("start", start), "row": 0}]
+        if self.committed:
+            sessions.append({"start": start, "row": self.committed})
+        meta.update({
+            "version": 1, "rate_hz": self.rate, "start": meta.get("start", start), "sessions": sessions,
+            "channels": [{"name": c, "file": _safe_name(c) + ".f32", "dtype": "<f4"} for c in self.channels],
+            "time": {"file": "t.f64", "dtype": "<f8"},
+        })
+        _write_json_atomic(path, meta)
+
+    def _open_sysfs(self):
+        """周波数・温度の列の sysfs ファイルを開いておく (毎サンプルのディレクトリ走査と open を省く)"""
+        paths = {f"cpu{c}.mhz": os.path.join(CPUFREQ_ROOT, f"cpu{c}", "cpufreq", "scaling_cur_freq")
+                 for c in read_cpu_freqs()}
+        for zone in read_temperatures():
+            paths[f"temp.{zone}"] = os.path.join(THERMAL_ROOT, "thermal_zone" + zone.rsplit(":", 1)[1], "temp")
+        self._sysfs = []
+        for name, path in paths.items():
+            if name not in self._index:
+                continue
+            try:
+                self._sysfs.append((self._index[name], os.open(path, os.O_RDONLY)))
+            except OSError:
+                pass   # 開けない列は NaN のまま
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join(timeout=5)
+        for fd in list(self.fds.values()) + [fd for _, fd in self._sysfs]:
+            os.close(fd)
+        self.fds = {}
+        self._sysfs = []
+
+    def _truncate_to_committed(self):
+        """前回クラッシュ時の未確定の末尾を切り落としてから追記する"""
+        os.ftruncate(self.fds["t"], self.committed * 8)
+        for c in self.channels:
+            os.ftruncate(self.fds[c], self.committed * 4)
+
+    def _loop(self):
+        try:
+            self._record()
+        except Exception as e:
+            # 記録スレッドが黙って止まると Burn-in は何も残さず走り続けるので、理由を残して知らせる
+            self.error = f"{type(e).__name__}: {e}"
+            self.log(f"[WARN] Recorder stopped after {self.committed} samples: {self.error}")
+
+    def _record(self):
+        n_ch = len(self.channels)
+        times = np.empty(self.chunk_rows, dtype="<f8")
+        rows = np.full((self.chunk_rows, n_ch), np.nan, dtype="<f4")
+        fill = 0
+        period = 1.0 / self.rate
+        prev_disk, prev_t = read_diskstats(), time.time()
+        cpu_window = deque([(prev_t, read_core_times())])      # (時刻, /proc/stat) の直近の窓
+        last_flush = time.perf_counter()
+        next_t = last_flush + period
+        while not self.stop_event.is_set():
+            delay = next_t - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            next_t += period
+            now = time.time()
+            cur_cpu, cur_disk = read_core_times(), read_diskstats()
+            cpu_window.append((now, cur_cpu))
+            # 窓の起点は CPU_WINDOW_SEC 以上前のうち最も新しい時点 (開始直後はそれより短い)
+            while len(cpu_window) > 1 and cpu_window[1][0] <= now - CPU_WINDOW_SEC:
+                cpu_window.popleft()
+            row = rows[fill]
+            row[:] = np.nan
+            self._sample(row, cpu_window[0][1], cur_cpu, prev_disk, cur_disk, now - prev_t)
+            prev_disk, prev_t = cur_disk, now
+            times[fill] = now
+            fill += 1
+            if fill == self.chunk_rows or time.perf_counter() - last_flush >= self.flush_sec:
+                self._flush(times, rows, fill)
+                fill, last_flush = 0, time.perf_counter()
+        if fill:
+            self._flush(times, rows, fill)
+
+    def _sample(self, row, prev_cpu, cur_cpu, prev_disk, cur_disk, dt):
+        i = 0
+        for c in self._cores:
+            u = core_utilization(prev_cpu, cur_cpu, c)
+            row[i] = np.nan if u is None else u * 100.0
+            i += 1
+        index = self._index
+        for k, fd in self._sysfs:
+            try:
+                row[k] = int(os.pread(fd, 32, 0)) / 1000.0      # kHz → MHz, m°C → °C
+            except (OSError, ValueError):
+                pass   # CPU のオフラインなど。欠測は NaN のまま
+        if self.sampler:
+            for g in self.sampler.latest()["gpus"]:
+                for key, suffix in (("util", "util"), ("power", "power"), ("mem_used", "vram_mb")):
+                    k = index.get(f"gpu{g['index']}.{suffix}")
+                    if k is not None and g.get(key) is not None:
+                        row[k] = g[key]
+        if dt > 0:
+            for d in self._disks:
+                if d in prev_disk and d in cur_disk:
+                    row[index[f"disk.{d}.read_mbs"]] = (cur_disk[d][0] - prev_disk[d][0]) * SECTOR_BYTES / dt / 1e6
+                    row[index[f"disk.{d}.write_mbs"]] = (cur_disk[d][1] - prev_disk[d][1]) * SECTOR_BYTES / dt / 1e6
+        for name, fn in self.probes.items():
+            try:
+                row[index[name]] = fn()
+            except Exception:
+                pass   # 欠測は NaN のまま
+        for name, value in self.gauges.items():
+            row[index[name]] = value
+
+    def _flush(self, times, rows, fill):
+        """チャンクを列ごとに追記 → fsync → committed を更新 (この順序でクラッシュ安全)"""
+        os.write(self.fds["t"], times[:fill].tobytes())
+        for k, c in enumerate(self.channels):
+            os.write(self.fds[c], np.ascontiguousarray(rows[:fill, k]).tobytes())
+        for fd in self.fds.values():
+            os.fsync(fd)
+        self.committed += fill
+        _write_json_atomic(os.path.join(self.path, "index.json"), {"committed": self.committed})
+
+
+def _read_committed(path: str) -> int:
+    try:
+        with open(os.path.join(path, "index.json")) as f:
+            return int(json.load(f)["committed"])
+    except (OSError, ValueError, KeyError):
+        return 0
+
+
+class Recording:
+    """記録済みディレクトリを memmap で開く。rec.t, rec["cpu0.util"], rec.channels"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, "meta.json")) as f:
+            self.meta = json.load(f)
+        self.rows = _read_committed(path)
+        self.channels = [c["name"] for c in self.meta["channels"]]
+        self._files = {c["name"]: (c["file"], c["dtype"]) for c in self.meta["channels"]}
+        self.t = self._open(self.meta["time"]["file"], self.meta["time"]["dtype"])
+
+    def _open(self, filename: str, dtype: str):
+        if self.rows == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(os.path.join(self.path, filename), dtype=dtype, mode="r", shape=(self.rows,))
+
+    def __getitem__(self, name: str):
+        filename, dtype = self._files[name]
+        return self._open(filename, dtype)
+
+    def summary(self) -> dict[str, tuple[float, float, float]]:
+        """チャネルごとの (min, mean, max)"""
+        out = {}
+        for name in self.channels:
+            col = self[name]
+            if col.size and not np.all(np.isnan(col)):
+                out[name] = (float(np.nanmin(col)), float(np.nanmean(col)), float(np.nanmax(col)))
+        return out
+
+
+if __name__ == "__main__":
+    import sys
+    rec = Recording(sys.argv[1])
+    duration = rec.t[-1] - rec.t[0] if rec.rows else 0.0
+    print(f"{rec.path}: {rec.rows} rows, {len(rec.channels)} channels, {duration:.1f} s")
+    for name, (lo, mean, hi) in rec.summary().items():
+        print(f"  {name:28s} min {lo:10.2f}  mean {mean:10.2f}  max {hi:10.2f}")
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+startup.py  ―  GUI 起動時間の計測と重いバックエンドの遅延読み込み
+  ・install(): import をフックし、モジュールごとの読み込み時間 (内包 / 自身) を記録する
+  ・report(): プロセス起動からウィンドウ表示までの時間と、トップレベルパッケージ別の import 時間を表示
+  ・LazyBackend: torch / pygame / OpenGL を含むモジュールを初回使用時 (またはバックグラウンド) に読み込む
+GUI の先頭で install() を呼んでから他のモジュールを import すること。
+さらに細かく見るときは python -X importtime main.py を使う。
+"""
+
+import importlib
+import importlib.machinery
+import os
+import shutil
+import sys
+import threading
+import time
+
+_T0 = time.perf_counter()
+_LOADERS = (importlib.machinery.SourceFileLoader, importlib.machinery.ExtensionFileLoader)
+
+
+def process_uptime() -> float:
+    """インタプリタ起動からの経過秒 (/proc が読めなければ startup.py 読み込みからの秒)"""
+    try:
+        with open("/proc/self/stat") as f:
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return uptime - start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return time.perf_counter() - _T0
+
+
+class ImportProfiler:
+    """
+    sys.meta_path の先頭に入り、ファイルから読み込むモジュールの exec_module を計時する。
+    records[name] = (内包時間, 自身の時間) [s]。自身の時間 = 内包 − 入れ子の import。
+    """
+
+    def __init__(self):
+        self.records: dict[str, tuple[float, float]] = {}
+        self._local = threading.local()
+
+    def find_spec(self, name, path=None, target=None):
+        if getattr(self._local, "busy", False):
+            return None
+        self._local.busy = True
+        try:
+            spec = importlib.machinery.PathFinder.find_spec(name, path, target)
+        finally:
+            self._local.busy = False
+        # 組み込み / frozen / 独自ローダーは計測せず通常の finder に任せる
+        if spec is None or not isinstance(spec.loader, _LOADERS):
+            return None
+        exec_module = spec.loader.exec_module
+
+        def timed_exec(module):
+            stack = self._local.__dict__.setdefault("stack", [])
+            stack.append(0.0)
+            t0 = time.perf_counter()
+            try:
+                exec_module(module)
+            finally:
+                total = time.perf_counter() - t0
+                nested = stack.pop()
+                if stack:
+                    stack[-1] += total
+                self.records[name] = (total, total - nested)
+
+        spec.loader.exec_module = timed_exec
+        return spec
+
+    def by_package(self) -> dict[str, tuple[float, int]]:
+        """トップレベルパッケージごとの (自身の時間の合計, モジュール数)"""
+        totals = {}
+        for name, (_, own) in list(self.records.items()):
+            top = name.split(".")[0]
+            seconds, count = totals.get(top, (0.0, 0))
+            totals[top] = (seconds + own, count + 1)
+        return totals
+
+
+_profiler = None
+
+
+def install() -> ImportProfiler:
+    global _profiler
+    if _profiler is None:
+        _profiler = ImportProfiler()
+        sys.meta_path.insert(0, _profiler)
+    return _profiler
+
+
+def report(label: str = "window ready", top: int = 10, log=print):
+    """起動から label までの時間と、import 時間の内訳 (重い順) を出力する"""
+    log(f"[STARTUP] {label} {process_uptime() * 1000:.0f} ms after process start")
+    if _profiler is None:
+        return
+    packages = sorted(_profiler.by_package().items(), key=lambda kv: kv[1][0], reverse=True)
+    total = sum(seconds for _, (seconds, _) in packages)
+    log(f"[STARTUP] imports: {total * 1000:.0f} ms in {len(_profiler.records)} modules")
+    for name, (seconds, count) in packages[:top]:
+        log(f"[STARTUP]   {name:24s} {seconds * 1000:8.1f} ms  ({count} modules)")
+
+
+class LazyBackend:
+    """
+    gpu = LazyBackend("gpu_load.gpu_load")
+    gpu.apply_gpu_tensor_load(...)     # 初回の属性アクセスで import (以後はキャッシュ)
+    gpu.preload()                      # 先にバックグラウンドで読み込んでおく
+    """
+
+    def __init__(self, module_name: str, log=print):
+        self.module_name = module_name
+        self.log = log
+        self.load_seconds = None
+        self._module = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._module is not None
+
+    def load(self):
+        with self._lock:
+            if self._module is None:
+                t0 = time.perf_counter()
+                self._module = importlib.import_module(self.module_name)
+                self.load_seconds = time.perf_counter() - t0
+                self.log(f"[STARTUP] {self.module_name} loaded in {self.load_seconds * 1000:.0f} ms")
+        return self._module
+
+    def preload(self, on_done=None):
+        def run():
+            try:
+                self.load()
+            except Exception as e:
+                self.log(f"[WARN] Could not preload {self.module_name}: {e}")
+                return
+            if on_done:
+                on_done(self)
+        threading.Thread(target=run, name=f"preload-{self.module_name}", daemon=True).start()
+
+    def __getattr__(self, attr):
+        return getattr(self.load(), attr)
+
+
+def gpu_present() -> bool:
+    """NVIDIA ドライバがありそうか (torch を読まずに判定する)"""
+    return os.path.exists("/proc/driver/nvidia") or shutil.which("nvidia-smi") is not None
+
+
+def cuda_device_ids() -> list[int]:
+    """CUDA デバイス番号。GPU が無ければ torch を読み込まずに空を返す"""
+    if not gpu_present():
+        return []
+    try:
+        import torch
+    except ImportError:
+        return []
+    return list(range(torch.cuda.device_count()))
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+storage_aio.py  ―  Linux ネイティブ AIO (io_setup / io_submit / io_getevents) の最小バインディング
+  ・libaio を使わず libc の syscall() を ctypes で呼ぶ (x86_64 / aarch64)
+  ・1 スレッドでキュー深さ分の I/O を出したままにできる (スレッドの切り替えも GIL も挟まない)
+  ・非同期になるのは O_DIRECT で開いたファイルだけ (バッファ I/O は io_submit の中で同期的に完了する)
+  ・使えない環境 (他のアーキテクチャ / カーネルで無効 / 上限超え) では AioUnavailable を送出する。
+    呼び出し側 (storage_io) はスレッドプールに戻す
+"""
+
+import ctypes
+import errno
+import os
+import platform
+
+# (io_setup, io_destroy, io_submit, io_getevents)
+SYSCALLS = {"x86_64": (206, 207, 209, 208), "aarch64": (0, 1, 2, 4)}
+IOCB_CMD_PREAD, IOCB_CMD_PWRITE = 0, 1
+
+
+class AioUnavailable(OSError):
+    pass
+
+
+class IoCB(ctypes.Structure):
+    """struct iocb (リトルエンディアン 64 bit)"""
+    _fields_ = [("aio_data", ctypes.c_uint64), ("aio_key", ctypes.c_uint32), ("aio_rw_flags", ctypes.c_int32),
+                ("aio_lio_opcode", ctypes.c_uint16), ("aio_reqprio", ctypes.c_int16),
+                ("aio_fildes", ctypes.c_uint32), ("aio_buf", ctypes.c_uint64), ("aio_nbytes", ctypes.c_uint64),
+                ("aio_offset", ctypes.c_int64), ("aio_reserved2", ctypes.c_uint64), ("aio_flags", ctypes.c_uint32),
+                ("aio_resfd", ctypes.c_uint32)]
+
+
+class IoEvent(ctypes.Structure):
+    _fields_ = [("data", ctypes.c_uint64), ("obj", ctypes.c_uint64), ("res", ctypes.c_int64),
+                ("res2", ctypes.c_int64)]
+
+
+class _Timespec(ctypes.Structure):
+    _fields_ = [("tv_sec", ctypes.c_long), ("tv_nsec", ctypes.c_long)]
+
+
+class AioContext:
+    """
+    aio = AioContext(depth)
+    aio.prepare(iocbs[i], fd, is_read, address, nbytes, offset, tag=i)
+    aio.submit([iocbs[i], ...])          # 受け付けた数
+    n = aio.getevents(events, timeout)   # 完了した数 (events[k].data が tag, .res が転送バイト数 / -errno)
+    aio.close()
+    """
+
+    def __init__(self, depth):
+        numbers = SYSCALLS.get(platform.machine())
+        if numbers is None or not hasattr(ctypes, "CDLL"):
+            raise AioUnavailable(errno.ENOSYS, f"Linux AIO binding not available on {platform.machine()}")
+        self._setup, self._destroy, self._submit, self._getevents = numbers
+        self._libc = ctypes.CDLL(None, use_errno=True)
+        self._libc.syscall.restype = ctypes.c_long
+        self.ctx = ctypes.c_ulong(0)
+        if self._call(self._setup, ctypes.c_long(depth), ctypes.byref(self.ctx)) < 0:
+            err = ctypes.get_errno()
+            raise AioUnavailable(err, f"io_setup({depth}): {os.strerror(err)}")
+
+    def _call(self, number, *args):
+        return self._libc.syscall(ctypes.c_long(number), *args)
+
+    @staticmethod
+    def prepare(iocb, fd, is_read, address, nbytes, offset, tag=0):
+        ctypes.memset(ctypes.addressof(iocb), 0, ctypes.sizeof(IoCB))
+        iocb.aio_data = tag
+        iocb.aio_lio_opcode = IOCB_CMD_PREAD if is_read else IOCB_CMD_PWRITE
+        iocb.aio_fildes = fd
+        iocb.aio_buf = address
+        iocb.aio_nbytes = nbytes
+        iocb.aio_offset = offset
+
+    def submit(self, iocbs) -> int:
+        pointers = (ctypes.POINTER(IoCB) * len(iocbs))(*(ctypes.pointer(cb) for cb in iocbs))
+        while True:
+            n = self._call(self._submit, self.ctx, ctypes.c_long(len(iocbs)), pointers)
+            if n >= 0:
+                return n
+            err = ctypes.get_errno()
+            if err == errno.EAGAIN:
+                return 0                  # カーネル側が一杯: 完了を待ってから出し直す
+            if err != errno.EINTR:
+                raise OSError(err, f"io_submit: {os.strerror(err)}")
+
+    def getevents(self, events, timeout=0.1, min_nr=1) -> int:
+        ts = _Timespec(int(timeout), int(timeout % 1 * 1e9))
+        while True:
+            n = self._call(self._getevents, self.ctx, ctypes.c_long(min_nr), ctypes.c_long(len(events)),
+                           events, ctypes.byref(ts))
+            if n >= 0:
+                return n
+            err = ctypes.get_errno()
+            if err != errno.EINTR:
+                raise OSError(err, f"io_getevents: {os.strerror(err)}")
+
+    def close(self):
+        if self.ctx.value:
+            self._call(self._destroy, self.ctx)
+            self.ctx = ctypes.c_ulong(0)
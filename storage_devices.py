@@ -0,0 +1,381 @@
+#!/usr/bin/env python3
+"""
+storage_devices.py  ―  sysfs から USB / ブロックデバイスを読み、索引付きのモデルにする
+  ・ディスク → パーティション → マウントポイント と、ディスクがつながる USB ポート / 速度 / コントローラ / ハブ
+  ・lsusb / lsblk / シェルは起動しない。/sys/bus/usb/devices, /sys/block と /proc/self/mountinfo を読むだけ (ミリ秒単位)
+  ・マウントはデバイス番号 (major:minor) で突き合わせるので /media/ 以外に自動マウントされたものも拾える
+  ・refresh() は前回から変わったデバイスだけ読み直し、追加 / 削除 / 変更されたものを返す
+  ・watch() は netlink の uevent と mountinfo の変化でホットプラグを待つ (使えなければ interval ごとのポーリング)
+  ・root を変えると固定の sysfs ツリー (ROOT/sys/..., ROOT/proc/self/mountinfo) で動く。テスト用フィクスチャに使う
+python storage_devices.py [--root DIR] [--watch]
+"""
+
+import os
+import re
+import select
+import socket
+from dataclasses import dataclass, field
+
+NETLINK_KOBJECT_UEVENT = 15
+PCI_ADDRESS = re.compile(r"^[0-9a-f]{4}:[0-9a-f]{2}:[0-9a-f]{2}\.[0-9a-f]$")
+USB_PORT = re.compile(r"^\d+-\d+(\.\d+)*$")       # 1-2, 2-1.4 (インターフェース 2-1:1.0 は含まない)
+ROOT_HUB = re.compile(r"^usb\d+$")
+HUB_CLASS = "09"
+MASS_STORAGE_CLASS = "08"
+
+
+def _read(directory, name, default=""):
+    try:
+        with open(os.path.join(directory, name)) as f:
+            return f.read().strip()
+    except OSError:
+        return default                    # 読んでいる途中に抜かれた / その属性がない
+
+
+def _listdir(directory):
+    try:
+        return sorted(os.listdir(directory))
+    except OSError:
+        return []
+
+
+def _unescape(path):
+    return re.sub(r"\\([0-7]{3})", lambda m: chr(int(m.group(1), 8)), path)
+
+
+def _topology(path):
+    """sysfs の実パスから (USB ポート, コントローラ, ハブ) を取り出す (USB でなければポートは None)"""
+    parts = path.split(os.sep)
+    ports = [i for i, p in enumerate(parts) if USB_PORT.match(p)]
+    roots = [i for i, p in enumerate(parts) if ROOT_HUB.match(p)]
+    pci = [p for p in parts if PCI_ADDRESS.match(p)]
+    if roots:
+        root = roots[0]
+        controller = parts[root - 1] if root > 0 and parts[root - 1] != "devices" else parts[root]
+    else:
+        controller = pci[-1] if pci else ""
+    if not ports:
+        return None, controller, ""
+    port = parts[ports[-1]]
+    hub = parts[ports[-2]] if len(ports) > 1 else (parts[roots[0]] if roots else "")
+    return port, controller, hub
+
+
+@dataclass
+class UsbDevice:
+    port: str                             # sysfs 名 (バス-ポート.ポート…)。差し直しても同じポートなら同じ
+    bus: int
+    devnum: int
+    vendor_id: str
+    product_id: str
+    manufacturer: str
+    product: str
+    speed_mbps: float                     # 1.5 / 12 / 480 / 5000 / 10000 / 20000
+    version: str                          # bcdUSB ("2.00", "3.20")
+    device_class: str
+    interface_classes: tuple
+    controller: str                       # ホストコントローラ (PCI アドレスなど)
+    hub: str                              # つながっているハブのポート名 (ルートハブなら usbN)
+
+    @property
+    def is_hub(self):
+        return self.device_class == HUB_CLASS
+
+    @property
+    def is_storage(self):
+        return MASS_STORAGE_CLASS in self.interface_classes
+
+    def __str__(self):
+        # lsusb と同じ並び (6 番目の語が VID:PID)
+        name = " ".join(p for p in (self.manufacturer, self.product) if p)
+        return f"Bus {self.bus:03d} Device {self.devnum:03d}: ID {self.vendor_id}:{self.product_id} {name}".rstrip()
+
+    def details(self):
+        classes = ",".join(self.interface_classes) or "-"
+        return (f"USB {self.version}, {self.speed_mbps:g} Mbit/s, class {self.device_class} "
+                f"(interfaces {classes}), port {self.port} on {self.controller}")
+
+
+@dataclass
+class Mount:
+    path: str
+    source: str
+    fstype: str
+    read_only: bool
+
+
+@dataclass
+class Partition:
+    name: str
+    dev: str                              # major:minor
+    size: int                             # バイト
+    mounts: list = field(default_factory=list)
+
+
+@dataclass
+class BlockDevice:
+    name: str
+    dev: str
+    size: int
+    removable: bool
+    model: str
+    usb_port: object                      # USB でつながっていればポート名、それ以外は None
+    controller: str
+    hub: str
+    partitions: list = field(default_factory=list)
+    mounts: list = field(default_factory=list)    # パーティションなしで直接マウントされているとき
+
+    @property
+    def external_hub(self):
+        """外付けハブ経由ならそのハブのポート名 (ルートポートに直結なら None)"""
+        return self.hub if self.hub and not ROOT_HUB.match(self.hub) else None
+
+    def filesystems(self):
+        """(マウント, パーティション or None) を全部"""
+        yield from ((m, None) for m in self.mounts)
+        for part in self.partitions:
+            yield from ((m, part) for m in part.mounts)
+
+
+class DeviceIndex:
+    """
+    index = DeviceIndex()                 # root="/tmp/fixture" で固定の sysfs ツリーを読む
+    changes = index.refresh()             # {"added": [...], "removed": [...], "changed": [...]} (USB ポート名 / ディスク名)
+    index.usb["1-2"], index.disks["sdb"], index.by_mount["/media/usb0"]
+    for mountpoint, disk, partition in index.storage_targets(): ...
+    index.watch(stop_event, on_change)    # ホットプラグのたびに refresh して on_change(changes)
+    """
+
+    def __init__(self, root="/", log=print):
+        self.root = root
+        self.log = log
+        self.usb = {}                     # ポート名 → UsbDevice
+        self.disks = {}                   # ディスク名 → BlockDevice
+        self.by_dev = {}                  # major:minor → (BlockDevice, Partition or None)
+        self.by_mount = {}                # マウントポイント → (BlockDevice, Partition or None)
+        self._usb_keys = {}
+        self._disk_keys = {}
+        self._mountinfo = None
+
+    def _path(self, *parts):
+        return os.path.join(self.root, *parts)
+
+    # ── 読み込み ──
+    def _read_usb(self, port, path):
+        interfaces = tuple(sorted({_read(os.path.join(path, name), "bInterfaceClass")
+                                   for name in _listdir(path) if name.startswith(port + ":")} - {""}))
+        _, controller, hub = _topology(path)
+        try:
+            speed = float(_read(path, "speed", "0"))
+        except ValueError:
+            speed = 0.0
+        return UsbDevice(port=port, bus=int(_read(path, "busnum", "0") or 0),
+                         devnum=int(_read(path, "devnum", "0") or 0), vendor_id=_read(path, "idVendor"),
+                         product_id=_read(path, "idProduct"), manufacturer=_read(path, "manufacturer"),
+                         product=_read(path, "product"), speed_mbps=speed, version=_read(path, "version"),
+                         device_class=_read(path, "bDeviceClass"), interface_classes=interfaces,
+                         controller=controller, hub=hub)
+
+    def _read_disk(self, name, path):
+        port, controller, hub = _topology(path)
+        device = os.path.join(path, "device")
+        model = _read(device, "model")
+        if model:
+            model = f"{_read(device, 'vendor')} {model}".strip()
+        partitions = [Partition(name=p, dev=_read(os.path.join(path, p), "dev"),
+                                size=int(_read(os.path.join(path, p), "size", "0") or 0) * 512)
+                      for p in _listdir(path) if os.path.exists(os.path.join(path, p, "partition"))]
+        return BlockDevice(name=name, dev=_read(path, "dev"), size=int(_read(path, "size", "0") or 0) * 512,
+                           removable=_read(path, "removable") == "1", model=model, usb_port=port,
+                           controller=controller, hub=hub, partitions=partitions)
+
+    def _scan(self, directory, key, skip=lambda name: False):
+        """directory の各エントリの (実パス, 変化の目印) を読む"""
+        found = {}
+        for name in _listdir(directory):
+            if skip(name):
+                continue
+            path = os.path.realpath(os.path.join(directory, name))
+            if not os.path.isdir(path):
+                continue                  # 抜かれた直後のリンク切れ
+            found[name] = (path, key(name, path))
+        return found
+
+    def _sync(self, found, keys, table, read, changes):
+        for name in keys.keys() - found.keys():
+            del keys[name]
+            table.pop(name, None)
+            changes["removed"].append(name)
+        for name, (path, key) in found.items():
+            if keys.get(name) == key:
+                continue
+            changes["changed" if name in keys else "added"].append(name)
+            keys[name] = key
+            table[name] = read(name, path)
+
+    def _apply_mounts(self, text):
+        by_dev, by_source = {}, {}
+        for line in text.splitlines():
+            fields = line.split()
+            try:
+                sep = fields.index("-", 6)
+            except ValueError:
+                continue
+            mount = Mount(path=_unescape(fields[4]), source=_unescape(fields[sep + 2]), fstype=fields[sep + 1],
+                          read_only="ro" in fields[5].split(","))
+            by_dev.setdefault(fields[2], []).append(mount)
+            by_source.setdefault(mount.source, []).append(mount)
+        self.by_dev, self.by_mount = {}, {}
+        changed = []
+        for disk in self.disks.values():
+            before = [m.path for m, _ in disk.filesystems()]
+            for item, part in [(disk, None)] + [(p, p) for p in disk.partitions]:
+                # btrfs などはデバイス番号が合わないのでデバイス名でも探す
+                item.mounts = by_dev.get(item.dev) or by_source.get("/dev/" + item.name, [])
+                self.by_dev[item.dev] = (disk, part)
+                for mount in item.mounts:
+                    self.by_mount[mount.path] = (disk, part)
+            if [m.path for m, _ in disk.filesystems()] != before:
+                changed.append(disk.name)
+        return changed
+
+    def refresh(self):
+        """前回から変わった USB デバイス / ディスクだけ読み直し、マウントを付け直す"""
+        changes = {"added": [], "removed": [], "changed": []}
+        usb = self._scan(self._path("sys/bus/usb/devices"), lambda name, path: _read(path, "devnum"),
+                         skip=lambda name: ":" in name)
+        self._sync(usb, self._usb_keys, self.usb, self._read_usb, changes)
+        disks = self._scan(self._path("sys/block"),
+                           lambda name, path: (_read(path, "dev"), _read(path, "diskseq"), _read(path, "size"),
+                                               tuple(p for p in _listdir(path) if p.startswith(name))))
+        disk_changes = {"added": [], "removed": [], "changed": []}
+        self._sync(disks, self._disk_keys, self.disks, self._read_disk, disk_changes)
+        try:
+            with open(self._path("proc/self/mountinfo")) as f:
+                text = f.read()
+        except OSError:
+            text = ""
+        if text != self._mountinfo or any(disk_changes.values()):
+            self._mountinfo = text
+            remounted = self._apply_mounts(text)
+            disk_changes["changed"] += [n for n in remounted if n not in disk_changes["added"]
+                                        and n not in disk_changes["changed"]]
+        for kind in changes:
+            changes[kind] += disk_changes[kind]
+        return changes
+
+    # ── 問い合わせ ──
+    def usb_devices(self, include_hubs=False):
+        return [d for port, d in sorted(self.usb.items())
+                if not ROOT_HUB.match(port) and (include_hubs or not d.is_hub)]
+
+    def storage_ports(self):
+        """ブロックデバイスがぶら下がっている USB ポート"""
+        return {disk.usb_port for disk in self.disks.values() if disk.usb_port}
+
+    def storage_targets(self, usb_only=True):
+        """書き込みテストに使える [(マウントポイント, BlockDevice, Partition or None)] (ファイルシステムごとに 1 つ)"""
+        targets = []
+        for name, disk in sorted(self.disks.items()):
+            if usb_only and not disk.usb_port:
+                continue
+            for item in [disk] + disk.partitions:
+                writable = [m for m in item.mounts if not m.read_only]
+                if writable:
+                    targets.append((writable[0].path, disk, None if item is disk else item))
+        return targets
+
+    def format_tree(self, usb_only=False):
+        lines = []
+        for name, disk in sorted(self.disks.items()):
+            if not disk.usb_port and (usb_only or not disk.size):
+                continue                  # 中身のない loop / zram などは出さない
+            usb = self.usb.get(disk.usb_port)
+            link = (f"USB {usb.version} {usb.speed_mbps:g}M port {disk.usb_port}" if usb
+                    else f"port {disk.usb_port}" if disk.usb_port else "internal")
+            lines.append(f"{name}  {_size(disk.size)}  {link} ({disk.controller or '?'})  {disk.model}".rstrip())
+            for item in [disk] + disk.partitions:
+                for mount in item.mounts:
+                    prefix = "" if item is disk else f"{item.name}  {_size(item.size)}  "
+                    lines.append(f"  {prefix}{mount.path} ({mount.fstype}{', ro' if mount.read_only else ''})")
+                if item is not disk and not item.mounts:
+                    lines.append(f"  {item.name}  {_size(item.size)}  (not mounted)")
+        lines.append("USB devices:")
+        for device in self.usb_devices(include_hubs=True):
+            lines.append(f"  {device}  [{device.speed_mbps:g}M, port {device.port}, hub {device.hub}]")
+        return "\n".join(lines)
+
+    # ── ホットプラグ ──
+    def watch(self, stop_event, on_change=None, interval=2.0):
+        """
+        stop_event が立つまでホットプラグを待って refresh し、変化があれば on_change(changes) を呼ぶ。
+        uevent (netlink) と mountinfo の更新で起きる。どちらも使えないとき (フィクスチャなど) は interval ごとのポーリング
+        """
+        poller = select.poll()
+        sock = mount_fd = None
+        if self.root == "/":
+            try:
+                sock = socket.socket(socket.AF_NETLINK, socket.SOCK_DGRAM, NETLINK_KOBJECT_UEVENT)
+                sock.bind((0, 1))         # カーネルの uevent マルチキャストグループ
+                sock.setblocking(False)
+                poller.register(sock, select.POLLIN)
+            except (OSError, AttributeError) as e:
+                self.log(f"[WARN] uevent socket unavailable ({e}); polling every {interval:g} s")
+                sock = None
+            try:
+                mount_fd = os.open("/proc/self/mountinfo", os.O_RDONLY)
+                poller.register(mount_fd, select.POLLPRI)
+            except OSError:
+                mount_fd = None
+        try:
+            while not stop_event.is_set():
+                for fd, _ in poller.poll(interval * 1000):
+                    if sock is not None and fd == sock.fileno():
+                        while True:       # 溜まった uevent は 1 回の refresh でまとめて反映する
+                            try:
+                                sock.recv(65536)
+                            except BlockingIOError:
+                                break
+                            except OSError:
+                                break     # ENOBUFS (取りこぼし): refresh で全体を見直すので問題ない
+                    elif fd == mount_fd:
+                        os.lseek(mount_fd, 0, os.SEEK_SET)   # 読み切ると次の変化まで POLLPRI が下りる
+                        while os.read(mount_fd, 65536):
+                            pass
+                changes = self.refresh()
+                if on_change and any(changes.values()):
+                    on_change(changes)
+        finally:
+            if sock is not None:
+                sock.close()
+            if mount_fd is not None:
+                os.close(mount_fd)
+
+
+def _size(nbytes):
+    for unit in ("B", "K", "M", "G", "T"):
+        if nbytes < 1024 or unit == "T":
+            return f"{nbytes:.1f}{unit}" if unit != "B" else f"{nbytes}B"
+        nbytes /= 1024
+
+
+if __name__ == "__main__":
+    import argparse
+    import threading
+    import time
+    parser = argparse.ArgumentParser(description="USB / block device discovery from sysfs")
+    parser.add_argument("--root", default="/", help="filesystem root holding sys/ and proc/self/mountinfo")
+    parser.add_argument("--watch", action="store_true", help="keep running and print hotplug changes")
+    args = parser.parse_args()
+    index = DeviceIndex(args.root)
+    t0 = time.perf_counter()
+    index.refresh()
+    print(index.format_tree())
+    print(f"[INFO] {len(index.disks)} disks, {len(index.usb)} USB devices, "
+          f"{len(index.storage_targets())} USB storage targets in {(time.perf_counter() - t0) * 1000:.1f} ms")
+    if args.watch:
+        stop = threading.Event()
+        try:
+            index.watch(stop, lambda changes: print(f"[INFO] {changes}\n{index.format_tree()}"))
+        except KeyboardInterrupt:
+            stop.set()
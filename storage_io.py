@@ -0,0 +1,572 @@
+#!/usr/bin/env python3
+"""
+storage_io.py  ―  プロセス内で動くストレージ I/O エンジン (fio の簡易版)
+  ・ブロックサイズ / キュー深さ / シーケンシャル or ランダム / 読み書き比率を指定して
+    テストファイルに pread / pwrite を発行し続ける (キュー深さ = 同時に I/O を出すスレッド数)
+  ・ページキャッシュを測らないように、準備で書いたファイルは fsync + POSIX_FADV_DONTNEED で追い出し、
+    計測の最後の fdatasync までを時間に含める
+  ・結果は MB/s・IOPS・読み / 書きそれぞれのレイテンシ p50 / p95 / p99 / p99.9
+  ・direct=True は O_DIRECT (ページキャッシュを通さない)。バッファは mmap で確保してページ境界に揃える。
+    ファイルシステムが O_DIRECT を受け付けなければ警告してバッファ I/O に戻す
+  ・backend: "threads" = キュー深さ分のスレッドが preadv / pwritev、
+             "aio" = 1 スレッドから Linux AIO でキュー深さ分を出したままにする (storage_aio.py)。
+    AIO が使えなければ警告して threads に戻す
+  ・verify=True は書くブロックを seed + ブロック番号 + 世代から生成し (storage_patterns.py)、読んだ時点で
+    ヘッダとチェックサムを確かめる。元ファイルも読み直しも不要。壊れたブロックはオフセットと原因を報告する。
+    処理中のブロックには次の I/O を出さない (書き込み中の読み込みや同時書き込みを誤検出しない)
+python storage_io.py /media/usb0 --block-size 4K --queue-depth 16 --pattern rand --read-pct 70 --direct --backend aio
+"""
+
+import ctypes
+import errno
+import mmap
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass, replace
+
+import numpy as np
+
+try:
+    from storage_load.storage_aio import IOCB_CMD_PREAD, AioContext, AioUnavailable, IoCB, IoEvent
+except ImportError:
+    from storage_aio import IOCB_CMD_PREAD, AioContext, AioUnavailable, IoCB, IoEvent
+try:
+    from storage_load.storage_patterns import CHECKSUM, BlockPattern, format_corruption
+except ImportError:
+    from storage_patterns import CHECKSUM, BlockPattern, format_corruption
+
+PATTERNS = ("seq", "rand")
+BACKENDS = ("threads", "aio")
+LATENCY_CAPACITY = 1 << 16        # スレッドごとに記録するレイテンシの上限 (超えたら古いものから上書き)
+MAX_REPORT = 16                   # 結果に載せる壊れたブロック / エラーの数
+FREE_SPACE_SHARE = 0.9            # テストファイルに使ってよい空き容量の割合
+MIN_RUN_SHARE = 0.5               # 準備が長引いても計測に残す duration の割合
+TEST_FILE = "lin_bench_io.dat"
+_UNITS = {"": 1, "K": 1 << 10, "M": 1 << 20, "G": 1 << 30, "T": 1 << 40}
+
+
+def parse_size(text) -> int:
+    """"4K" / "1M" / "2G" / "65536" → バイト数 (2 の累乗単位)"""
+    if isinstance(text, int):
+        return text
+    m = re.fullmatch(r"\s*(\d+)\s*([KMGT]?)(?:i?B)?\s*", str(text).upper())
+    if not m:
+        raise ValueError(f"invalid size: {text!r}")
+    return int(m.group(1)) * _UNITS[m.group(2)]
+
+
+def format_size(nbytes) -> str:
+    for unit in ("T", "G", "M", "K"):
+        if nbytes >= _UNITS[unit] and nbytes % _UNITS[unit] == 0:
+            return f"{nbytes // _UNITS[unit]}{unit}"
+    return str(nbytes)
+
+
+@dataclass
+class IoJob:
+    block_size: int = 1 << 20
+    queue_depth: int = 4
+    pattern: str = "seq"              # PATTERNS
+    read_pct: int = 50                # 読み込みの割合 (0: 書き込みのみ, 100: 読み込みのみ)
+    file_size: int = 1 << 30
+    seed: int = 0
+    backend: str = "threads"          # BACKENDS
+    direct: bool = False              # O_DIRECT
+    verify: bool = False              # 生成パターンを書いて読んだときに検証する
+
+    def validate(self):
+        if self.pattern not in PATTERNS:
+            raise ValueError(f"I/O pattern must be one of {PATTERNS}")
+        if self.backend not in BACKENDS:
+            raise ValueError(f"I/O backend must be one of {BACKENDS}")
+        if self.block_size <= 0 or self.block_size % 512:
+            raise ValueError("block size must be a positive multiple of 512 bytes")
+        if self.queue_depth < 1:
+            raise ValueError("queue depth must be at least 1")
+        if not 0 <= self.read_pct <= 100:
+            raise ValueError("read percentage must be within 0-100")
+        if self.file_size < self.block_size:
+            raise ValueError("file size must be at least one block")
+        if self.verify and self.file_size // self.block_size <= self.queue_depth:
+            raise ValueError("verification needs more blocks in the file than the queue depth")
+        return self
+
+    def describe(self) -> str:
+        rw = {0: "write", 100: "read"}.get(self.read_pct, f"{self.read_pct}% read")
+        return (f"{format_size(self.block_size)} {self.pattern} {rw}, QD {self.queue_depth}, "
+                f"file {format_size(self.file_size)}, {self.backend}{', O_DIRECT' if self.direct else ''}"
+                f"{', verify' if self.verify else ''}")
+
+
+class _LatencyLog:
+    """1 スレッド分のレイテンシ (秒) と読み / 書きの別。配列は最初に確保しておく"""
+
+    def __init__(self, capacity=LATENCY_CAPACITY):
+        self.seconds = np.empty(capacity, dtype=np.float64)
+        self.is_read = np.empty(capacity, dtype=bool)
+        self.count = 0
+
+    def add(self, seconds, is_read):
+        i = self.count % len(self.seconds)
+        self.seconds[i] = seconds
+        self.is_read[i] = is_read
+        self.count += 1
+
+    def recorded(self):
+        n = min(self.count, len(self.seconds))
+        return self.seconds[:n], self.is_read[:n]
+
+
+def aligned_buffer(nbytes) -> mmap.mmap:
+    """ページ境界に揃った書き込み可能なバッファ (O_DIRECT 用)。中身は乱数で埋める"""
+    buf = mmap.mmap(-1, nbytes)
+    buf.write(os.urandom(nbytes))
+    buf.seek(0)
+    return buf
+
+
+class IoEngine:
+    """
+    engine = IoEngine("/media/usb0/lin_bench_io.dat", IoJob(block_size=4096, queue_depth=16, pattern="rand"))
+    engine.prepare(stop_event, progress)      # ファイルを作って書き込み、キャッシュから追い出す
+    result = engine.run(60, stop_event)       # 60 秒 (または停止まで) I/O を出し続ける
+    file_size は空き容量の FREE_SPACE_SHARE までに切り詰める (engine.job に実際の大きさが入る)。
+    engine.cleanup()
+    result: {"seconds", "read_mbps", "write_mbps", "iops", "read_iops", "write_iops",
+             "read_lat_ms": {"p50", "p95", "p99", "p99.9"}, "write_lat_ms": {...}, "ops", "errors",
+             "backend", "direct", "verify": {"checked", "corrupt" (壊れていたブロック数), "corruptions"} (verify のとき), ...}
+    backend / direct は実際に使えたもの。
+    """
+
+    def __init__(self, path, job: IoJob | None = None, log=print):
+        self.path = path
+        self.log = log
+        self.job = self._fit_free_space((job or IoJob()).validate())
+        self.blocks = self.job.file_size // self.job.block_size
+        self.errors = []                      # [(オフセット, 読み / 書き, メッセージ)]
+        self.backend = self.job.backend
+        self.direct = self.job.direct
+        self.pattern = BlockPattern(self.job.seed, self.job.block_size) if self.job.verify else None
+        self.generations = np.zeros(self.blocks, dtype=np.int64)   # ブロックに最後に書いた世代 (-1: 不明)
+        self.corruptions = {}                 # ブロック番号 → 最初に見つけた {"offset", "block", "reason", ...}
+        self.checked = 0
+        self._generation = 0
+        self._busy = set()
+        self._cursor = 0
+        self._lock = threading.Lock()
+
+    # ── 準備 / 後始末 ──
+    def _fit_free_space(self, job: IoJob) -> IoJob:
+        """file_size を空き容量 (既存のテストファイル分を含む) の FREE_SPACE_SHARE までに切り詰める"""
+        try:
+            st = os.statvfs(os.path.dirname(self.path) or ".")
+        except OSError:
+            return job
+        existing = os.path.getsize(self.path) if os.path.isfile(self.path) else 0
+        room = int((st.f_bavail * st.f_frsize + existing) * FREE_SPACE_SHARE) // job.block_size * job.block_size
+        if room >= job.file_size:
+            return job
+        fitted = replace(job, file_size=room)
+        if room < job.block_size or (job.verify and room // job.block_size <= job.queue_depth):
+            raise OSError(errno.ENOSPC, f"not enough free space for the test file "
+                                        f"({format_size(room)} usable, {job.describe()})", self.path)
+        self.log(f"[WARN] Test file on {os.path.dirname(self.path)} reduced from {format_size(job.file_size)} "
+                 f"to {room >> 20} MiB to fit the free space")
+        return fitted
+
+    def prepare(self, stop_event=None, progress=None) -> bool:
+        """
+        テストファイルを全ブロック書いてから fsync し、ページキャッシュから追い出す。
+        progress(書いた割合 0〜1) は chunk ごと。stop_event が立ったら途中でやめて False を返す
+        """
+        job = self.job
+        total = self.blocks * job.block_size
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            if hasattr(os, "posix_fallocate"):
+                os.posix_fallocate(fd, 0, total)
+            chunk = max(job.block_size, 1 << 20) // job.block_size * job.block_size
+            if self.pattern is not None:
+                # 全ブロックを世代 0 のパターンで書く
+                data = bytearray(chunk)
+                view = memoryview(data)
+
+                def write(offset, n):
+                    for i in range(0, n, job.block_size):
+                        self.pattern.fill(view[i:i + job.block_size], (offset + i) // job.block_size, 0)
+                    os.pwrite(fd, view[:n], offset)
+            elif job.read_pct > 0:
+                # 穴のままだと読み込みがデバイスに届かないので実データで埋める
+                data = os.urandom(chunk)
+
+                def write(offset, n):
+                    os.pwrite(fd, data[:n], offset)
+            else:
+                write = None
+            if write is not None:
+                for offset in range(0, total, chunk):
+                    if stop_event is not None and stop_event.is_set():
+                        return False
+                    write(offset, min(chunk, total - offset))
+                    if progress:
+                        progress(min(1.0, (offset + chunk) / total))
+            os.fsync(fd)
+            self._drop_cache(fd)
+        finally:
+            os.close(fd)
+        return True
+
+    @staticmethod
+    def _drop_cache(fd):
+        if hasattr(os, "posix_fadvise"):
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+
+    def _open(self):
+        if self.direct:
+            try:
+                return os.open(self.path, os.O_RDWR | os.O_DIRECT)
+            except (AttributeError, OSError) as e:
+                if isinstance(e, OSError) and e.errno != errno.EINVAL:
+                    raise
+                self.log(f"[WARN] O_DIRECT not supported for {self.path}; using buffered I/O")
+                self.direct = False
+        return os.open(self.path, os.O_RDWR)
+
+    def cleanup(self):
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+    # ── 計測 ──
+    def _next_io(self, rng):
+        """
+        次の I/O の (ブロック番号, 読み込みか, 世代)。検証ありでは処理中のブロックを避けて使用中にし、
+        書き込みには新しい世代、読み込みには最後に書いた世代を付ける
+        """
+        job = self.job
+        is_read = job.read_pct == 100 or (job.read_pct > 0 and rng.random() * 100 < job.read_pct)
+        with self._lock:
+            while True:
+                if job.pattern == "rand":
+                    block = int(rng.integers(self.blocks))
+                else:
+                    block = self._cursor
+                    self._cursor = (self._cursor + 1) % self.blocks
+                if self.pattern is None:
+                    return block, is_read, 0
+                if block not in self._busy:
+                    break
+            self._busy.add(block)
+            if is_read:
+                return block, True, int(self.generations[block])
+            self._generation += 1
+            return block, False, self._generation
+
+    def _check(self, buf, block, generation):
+        """読んだブロックを検証して結果を記録する (世代が不明なブロックは飛ばす)"""
+        if generation < 0:
+            return
+        problem = self.pattern.check(buf, block, generation)
+        with self._lock:
+            self.checked += 1
+            if problem and block not in self.corruptions:
+                self.corruptions[block] = {"offset": block * self.job.block_size, "block": block, **problem}
+
+    def _finish_io(self, buf, block, is_read, generation, ok):
+        """I/O の完了処理 (検証ありのとき): 読んだブロックを検証し、書いた世代を記録して使用中を外す"""
+        if self.pattern is None:
+            return
+        if is_read and ok:
+            self._check(buf, block, generation)
+        with self._lock:
+            if not is_read:
+                self.generations[block] = generation if ok else -1   # 失敗した書き込みは中身が分からない
+            self._busy.discard(block)
+
+    def _thread_worker(self, fd, index, deadline, stop_event, latency, totals):
+        job = self.job
+        rng = np.random.default_rng((job.seed, index))
+        buf = aligned_buffer(job.block_size)
+        read_bytes = write_bytes = reads = writes = 0
+        try:
+            while not stop_event.is_set() and time.perf_counter() < deadline:
+                block, is_read, generation = self._next_io(rng)
+                offset = block * job.block_size
+                if not is_read and self.pattern is not None:
+                    self.pattern.fill(buf, block, generation)
+                t0 = time.perf_counter()
+                try:
+                    if is_read:
+                        read_bytes += os.preadv(fd, [buf], offset)
+                        reads += 1
+                    else:
+                        write_bytes += os.pwritev(fd, [buf], offset)
+                        writes += 1
+                except OSError as e:
+                    self.errors.append((offset, "read" if is_read else "write", str(e)))
+                    self._finish_io(buf, block, is_read, generation, False)
+                    continue
+                latency.add(time.perf_counter() - t0, is_read)
+                self._finish_io(buf, block, is_read, generation, True)
+        finally:
+            totals[index] = (read_bytes, write_bytes, reads, writes)
+            buf.close()
+
+    def _aio_worker(self, fd, index, deadline, stop_event, latency, totals, aio):
+        """キュー深さ分の iocb を出したままにし、完了したスロットから次の I/O を出し直す"""
+        job = self.job
+        depth, size = job.queue_depth, job.block_size
+        rng = np.random.default_rng((job.seed, index))
+        buf = aligned_buffer(depth * size)
+        view = ctypes.c_char.from_buffer(buf)
+        base = ctypes.addressof(view)
+        slots = [memoryview(buf)[slot * size:(slot + 1) * size] for slot in range(depth)]
+        iocbs = (IoCB * depth)()
+        events = (IoEvent * depth)()
+        started = [0.0] * depth
+        issued = [(0, 0)] * depth             # スロット → (ブロック番号, 世代)
+        idle, in_flight = list(range(depth)), 0
+        failed = False
+        read_bytes = write_bytes = reads = writes = 0
+        try:
+            while True:
+                if failed or stop_event.is_set() or time.perf_counter() >= deadline:
+                    idle = []                 # 出し直さずに残りの完了だけ待つ
+                if idle:
+                    for slot in idle:
+                        block, is_read, generation = self._next_io(rng)
+                        if not is_read and self.pattern is not None:
+                            self.pattern.fill(slots[slot], block, generation)
+                        issued[slot] = (block, generation)
+                        aio.prepare(iocbs[slot], fd, is_read, base + slot * size, size, block * size, tag=slot)
+                        started[slot] = time.perf_counter()
+                    try:
+                        submitted = aio.submit([iocbs[slot] for slot in idle])
+                    except OSError as e:
+                        # EINVAL (O_DIRECT とセクタサイズが合わない) など: 記録して新しい I/O は出さない
+                        cb = iocbs[idle[0]]
+                        self.errors.append((cb.aio_offset, "read" if cb.aio_lio_opcode == IOCB_CMD_PREAD
+                                            else "write", str(e)))
+                        submitted, failed = 0, True
+                    with self._lock:
+                        for slot in idle[submitted:]:  # 受け付けられなかった分は使用中を外して選び直す
+                            self._busy.discard(issued[slot][0])
+                    in_flight += submitted
+                    idle = idle[submitted:]
+                    if not submitted and not in_flight and not failed:
+                        time.sleep(0.001)     # EAGAIN で 1 つも出ていない: 少し待って出し直す
+                        continue
+                if not in_flight:
+                    break
+                done = aio.getevents(events, timeout=0.1)
+                now = time.perf_counter()
+                for event in events[:done]:
+                    slot = event.data
+                    cb = iocbs[slot]
+                    block, generation = issued[slot]
+                    is_read = cb.aio_lio_opcode == IOCB_CMD_PREAD
+                    in_flight -= 1
+                    idle.append(slot)
+                    if event.res != size:
+                        reason = os.strerror(-event.res) if event.res < 0 else f"short transfer ({event.res} bytes)"
+                        self.errors.append((cb.aio_offset, "read" if is_read else "write", reason))
+                        self._finish_io(slots[slot], block, is_read, generation, False)
+                        continue
+                    if is_read:
+                        read_bytes += size
+                        reads += 1
+                    else:
+                        write_bytes += size
+                        writes += 1
+                    latency.add(now - started[slot], is_read)
+                    self._finish_io(slots[slot], block, is_read, generation, True)
+        except OSError as e:
+            self.errors.append((0, "aio", str(e)))   # io_getevents の失敗など: 黙って 0 件で終わらせない
+        finally:
+            totals[index] = (read_bytes, write_bytes, reads, writes)
+            for slot in slots:
+                slot.release()
+            del view                          # バッファの参照を外してから閉じる
+            buf.close()
+
+    def verify_all(self, fd):
+        """ファイル全体を読んで全ブロックを検証する (書き込みだけのジョブの最後に使う)"""
+        size = self.job.block_size
+        chunk = max(size, 1 << 20) // size
+        buf = aligned_buffer(chunk * size)
+        view = memoryview(buf)
+        try:
+            for first in range(0, self.blocks, chunk):
+                n = min(chunk, self.blocks - first)
+                try:
+                    got = os.preadv(fd, [view[:n * size]], first * size)
+                except OSError as e:
+                    self.errors.append((first * size, "read", str(e)))
+                    continue
+                for i in range(min(n, got // size)):
+                    self._check(view[i * size:(i + 1) * size], first + i, int(self.generations[first + i]))
+        finally:
+            view.release()
+            buf.close()
+
+    def _start_workers(self, fd, deadline, stop_event):
+        """backend に合わせてワーカースレッドを作る: [(スレッド, レイテンシログ)], totals, 後始末"""
+        job = self.job
+        if self.backend == "aio":
+            try:
+                aio = AioContext(job.queue_depth)
+            except AioUnavailable as e:
+                self.log(f"[WARN] Linux AIO unavailable ({e}); using the thread pool")
+                self.backend = "threads"
+            else:
+                if not self.direct:
+                    self.log("[WARN] Linux AIO without O_DIRECT completes inside io_submit (effectively QD 1)")
+                logs, totals = [_LatencyLog()], [(0, 0, 0, 0)]
+                thread = threading.Thread(target=self._aio_worker, daemon=True,
+                                          args=(fd, 0, deadline, stop_event, logs[0], totals, aio))
+                return [thread], logs, totals, aio.close
+        logs = [_LatencyLog() for _ in range(job.queue_depth)]
+        totals = [(0, 0, 0, 0)] * job.queue_depth
+        threads = [threading.Thread(target=self._thread_worker, daemon=True,
+                                    args=(fd, i, deadline, stop_event, logs[i], totals))
+                   for i in range(job.queue_depth)]
+        return threads, logs, totals, lambda: None
+
+    def run(self, duration, stop_event=None, progress=None) -> dict:
+        """duration 秒 (または stop_event まで) I/O を出し続けて集計を返す。progress(経過割合 0〜1)"""
+        stop_event = stop_event or threading.Event()
+        fd = self._open()
+        self._cursor = 0
+        t0 = time.perf_counter()
+        deadline = t0 + duration
+        try:
+            threads, logs, totals, close = self._start_workers(fd, deadline, stop_event)
+            try:
+                for t in threads:
+                    t.start()
+                while any(t.is_alive() for t in threads):
+                    next(t for t in threads if t.is_alive()).join(timeout=0.5)
+                    if progress:
+                        progress(min(1.0, (time.perf_counter() - t0) / duration))
+            finally:
+                close()
+            if self.job.read_pct < 100:
+                os.fdatasync(fd)              # 書いたデータがデバイスに届くまでを計測に含める
+            seconds = max(1e-9, time.perf_counter() - t0)
+            self._drop_cache(fd)
+            if self.pattern is not None and self.job.read_pct == 0:
+                self.verify_all(fd)           # 計測時間には含めない
+        finally:
+            os.close(fd)
+        return self._summary(logs, totals, seconds)
+
+    def _summary(self, logs, totals, seconds) -> dict:
+        lat = np.concatenate([log.recorded()[0] for log in logs])
+        is_read = np.concatenate([log.recorded()[1] for log in logs])
+        read_bytes, write_bytes, reads, writes = (sum(column) for column in zip(*totals))
+        ops = reads + writes
+        result = {
+            "job": replace(self.job, backend=self.backend, direct=self.direct).describe(),
+            "backend": self.backend, "direct": self.direct, "seconds": seconds, "ops": ops, "errors": len(self.errors),
+            "read_mbps": read_bytes / seconds / 1e6, "write_mbps": write_bytes / seconds / 1e6,
+            "iops": ops / seconds, "read_iops": reads / seconds, "write_iops": writes / seconds,
+            "read_lat_ms": _percentiles(lat[is_read]), "write_lat_ms": _percentiles(lat[~is_read]),
+        }
+        if self.pattern is not None:
+            result["verify"] = {"checksum": CHECKSUM, "checked": self.checked, "corrupt": len(self.corruptions),
+                                "corruptions": [self.corruptions[b] for b in sorted(self.corruptions)][:MAX_REPORT]}
+        return result
+
+
+def _percentiles(seconds) -> dict:
+    if not len(seconds):
+        return {}
+    values = np.percentile(seconds, (50, 95, 99, 99.9)) * 1000.0
+    return dict(zip(("p50", "p95", "p99", "p99.9"), (float(v) for v in values)))
+
+
+def format_result(result) -> str:
+    line = (f"{result['job']}: read {result['read_mbps']:.1f} MB/s, write {result['write_mbps']:.1f} MB/s, "
+            f"{result['iops']:.0f} IOPS, {result['errors']} errors")
+    for kind in ("read", "write"):
+        lat = result[f"{kind}_lat_ms"]
+        if lat:
+            line += (f"\n    {kind} latency p50 {lat['p50']:.3f} / p95 {lat['p95']:.3f} / "
+                     f"p99 {lat['p99']:.3f} / p99.9 {lat['p99.9']:.3f} ms")
+    verify = result.get("verify")
+    if verify:
+        line += f"\n    verified {verify['checked']} blocks ({verify['checksum']}), {verify['corrupt']} corrupt"
+        for item in verify["corruptions"]:
+            line += f"\n      {format_corruption(item)}"
+    return line
+
+
+def run_job(directory, job: IoJob, duration, stop_event=None, progress=None, log=print) -> dict:
+    """
+    directory にテストファイルを作って job を実行し、ファイルを消して結果を返す。
+    準備の時間も duration に含める (計測には少なくとも duration の MIN_RUN_SHARE を残す)。
+    progress(0〜1) は準備の見込み時間と計測時間の合計に対する割合
+    """
+    engine = IoEngine(os.path.join(directory, TEST_FILE), job, log=log)
+    t0 = time.perf_counter()
+
+    def prepare_progress(fraction):
+        # 準備にかかる時間は書いた割合から見積もる
+        if progress and fraction > 0:
+            spent = time.perf_counter() - t0
+            progress(min(1.0, spent / max(duration, spent / fraction + duration * MIN_RUN_SHARE)))
+
+    try:
+        if not engine.prepare(stop_event, prepare_progress):
+            log(f"[WARN] Stopped while preparing {engine.path}")
+        spent = time.perf_counter() - t0
+        run_seconds = max(duration - spent, duration * MIN_RUN_SHARE)
+        start = spent / (spent + run_seconds)
+        result = engine.run(run_seconds, stop_event,
+                            (lambda fraction: progress(start + (1 - start) * fraction)) if progress else None)
+    finally:
+        engine.cleanup()
+    result["prepare_seconds"] = spent
+    result["error_offsets"] = [offset for offset, _, _ in engine.errors[:MAX_REPORT]]
+    return result
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="In-process storage I/O benchmark")
+    parser.add_argument("directory", help="directory on the device under test")
+    parser.add_argument("--block-size", default="1M")
+    parser.add_argument("--queue-depth", type=int, default=4)
+    parser.add_argument("--pattern", choices=PATTERNS, default="seq")
+    parser.add_argument("--read-pct", type=int, default=50)
+    parser.add_argument("--file-size", default="1G")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--backend", choices=BACKENDS, default="threads")
+    parser.add_argument("--direct", action="store_true", help="bypass the page cache with O_DIRECT")
+    parser.add_argument("--verify", action="store_true", help="write generated blocks and check them on read")
+    parser.add_argument("--inject", type=int, default=0, metavar="N",
+                        help="flip one byte in N random blocks after preparing (shows detection with --verify)")
+    args = parser.parse_args()
+    job = IoJob(parse_size(args.block_size), args.queue_depth, args.pattern, args.read_pct,
+                parse_size(args.file_size), backend=args.backend, direct=args.direct, verify=args.verify)
+    engine = IoEngine(os.path.join(args.directory, TEST_FILE), job)
+    try:
+        engine.prepare()
+        if args.inject:
+            rng = np.random.default_rng()
+            fd = os.open(engine.path, os.O_RDWR)
+            try:
+                for block in rng.choice(engine.blocks, size=min(args.inject, engine.blocks), replace=False):
+                    offset = int(block) * job.block_size + int(rng.integers(job.block_size))
+                    os.pwrite(fd, bytes([os.pread(fd, 1, offset)[0] ^ 0xFF]), offset)
+                    print(f"[INFO] corrupted byte at 0x{offset:x} (block {block})")
+                os.fsync(fd)
+                engine._drop_cache(fd)
+            finally:
+                os.close(fd)
+        print(format_result(engine.run(args.seconds)))
+    finally:
+        engine.cleanup()
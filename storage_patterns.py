@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+storage_patterns.py  ―  ストレージに書くブロックを seed とブロック番号から生成し、読んだ時点で検証する
+  ・ブロック = 64 バイトのヘッダ (マジック, seed, ブロック番号, 世代, チェックサム) + ペイロード
+  ・ペイロードは seed ごとの乱数列をブロック番号と世代で XOR したもの (NumPy で 1 回の演算)
+  ・検証はヘッダの各フィールドとチェックサム (xxh3 / CRC32C / zlib.crc32 のうち使えるもの) だけで行い、
+    元ファイルもう 1 回の読み込みも要らない。不一致のときだけ期待値を作り直して最初の壊れたバイトを探す
+  ・取り違え (別ブロックのデータ)・古いデータ (前の世代)・ビット化けを区別して報告する
+"""
+
+import struct
+import zlib
+
+import numpy as np
+
+try:
+    import xxhash
+
+    def checksum(*parts) -> int:
+        h = xxhash.xxh3_64()
+        for part in parts:
+            h.update(part)
+        return h.intdigest() & 0xFFFFFFFF
+    CHECKSUM = "xxh3"
+except ImportError:
+    try:
+        import crc32c as _crc32c
+
+        def checksum(*parts) -> int:
+            value = 0
+            for part in parts:
+                value = _crc32c.crc32c(part, value)
+            return value
+        CHECKSUM = "crc32c"
+    except ImportError:
+        def checksum(*parts) -> int:
+            value = 0
+            for part in parts:
+                value = zlib.crc32(part, value)
+            return value
+        CHECKSUM = "crc32"
+
+MAGIC = b"LBIOBLK1"
+HEADER = struct.Struct("<8sQQQ")       # マジック, seed, ブロック番号, 世代 (この 32 バイトもチェックサムに含める)
+CHECKSUM_AT = HEADER.size              # 32: チェックサム (uint32)
+HEADER_BYTES = 64
+BLOCK_MULT = 0x9E3779B97F4A7C15
+GENERATION_MULT = 0xD1B54A32D192ED03
+MASK64 = (1 << 64) - 1
+
+
+class BlockPattern:
+    """
+    pattern = BlockPattern(seed, block_size)
+    pattern.fill(buf, block, generation)             # buf (書き込み可能, block_size バイト) に生成する
+    problem = pattern.check(buf, block, generation)  # 正しければ None、壊れていれば理由の dict
+    """
+
+    def __init__(self, seed, block_size):
+        if block_size <= HEADER_BYTES or block_size % 8:
+            raise ValueError("block size must be a multiple of 8 bytes and larger than the header")
+        self.seed = seed
+        self.block_size = block_size
+        self.words = (block_size - HEADER_BYTES) // 8
+        self.base = np.frombuffer(np.random.default_rng(seed).bytes(self.words * 8), dtype=np.uint64)
+
+    @staticmethod
+    def _key(block, generation):
+        return np.uint64((block * BLOCK_MULT + (generation + 1) * GENERATION_MULT) & MASK64)
+
+    def fill(self, buf, block, generation):
+        view = memoryview(buf)
+        payload = np.frombuffer(view, dtype=np.uint64, count=self.words, offset=HEADER_BYTES)
+        np.bitwise_xor(self.base, self._key(block, generation), out=payload)
+        HEADER.pack_into(view, 0, MAGIC, self.seed, block, generation)
+        struct.pack_into("<I", view, CHECKSUM_AT, checksum(view[:HEADER.size], view[HEADER_BYTES:]))
+        view[CHECKSUM_AT + 4:HEADER_BYTES] = bytes(HEADER_BYTES - CHECKSUM_AT - 4)
+
+    def check(self, buf, block, generation):
+        view = memoryview(buf)
+        stored = struct.unpack_from("<I", view, CHECKSUM_AT)[0]
+        magic, seed, found_block, found_generation = HEADER.unpack_from(view, 0)
+        if (stored == checksum(view[:HEADER.size], view[HEADER_BYTES:]) and magic == MAGIC
+                and seed == self.seed and found_block == block and found_generation == generation):
+            return None
+        # 不一致: 期待値を作り直して原因と最初の壊れたバイトを調べる
+        if magic != MAGIC or seed != self.seed:
+            reason = "header corrupted"
+        elif found_block != block:
+            reason = f"misplaced data (holds block {found_block})"
+        elif found_generation != generation:
+            reason = f"stale data (generation {found_generation}, expected {generation})"
+        else:
+            reason = "checksum mismatch"
+        expected = bytearray(self.block_size)
+        self.fill(expected, block, generation)
+        diff = np.frombuffer(view, np.uint8) != np.frombuffer(expected, np.uint8)
+        bad = np.flatnonzero(diff)
+        return {"reason": reason, "first_bad_byte": int(bad[0]) if len(bad) else None, "bad_bytes": int(len(bad))}
+
+
+def format_corruption(item) -> str:
+    first = item["first_bad_byte"]
+    where = f"first bad byte +{first}" if first is not None else "no byte differs from the expected block"
+    return f"offset 0x{item['offset']:x} (block {item['block']}): {item['reason']}, {where}, {item['bad_bytes']} bytes differ"
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+storage_scheduler.py  ―  デバイスごとのテストを、コントローラ / ハブごとに同時実行数を抑えて回す
+  ・同じ外付けハブ (上りリンクを共有) や同じホストコントローラのデバイスを一度に走らせすぎない
+  ・空きが出たら、入れる待ちタスクから起動する (1 つのハブが詰まっていても他のハブのデバイスは進む)
+  ・終わった順に結果を返す (遅いデバイスが他のデバイスの報告を止めない)
+  ・stop_event が立ったら新しいタスクは起動せず、待っていたものは NotStarted のエラーとして返す
+    (走っているものは終了を待つ)
+"""
+
+import queue
+from concurrent.futures import ThreadPoolExecutor
+
+
+class NotStarted(Exception):
+    """停止したので起動しなかったタスク (テストされていない)"""
+
+
+class DeviceScheduler:
+    """
+    scheduler = DeviceScheduler(per_controller=4, per_hub=2)          # 0 は上限なし
+    scheduler.add("/media/usb0", fn, controller="0000:00:14.0", hub="2-1")   # None のグループは数えない
+    for key, result, error in scheduler.run(stop_event): ...           # 終わった順 (error は例外 or None)
+    全タスクが 1 回ずつ返る (停止で起動しなかったものは error が NotStarted)。
+    """
+
+    def __init__(self, per_controller=0, per_hub=0, log=print):
+        self.limits = {"controller": per_controller, "hub": per_hub}
+        self.log = log
+        self.pending = []                 # [(key, fn, groups)] (追加順に起動を試す)
+        self.running = {}                 # (種類, 名前) → 実行中の数
+
+    def add(self, key, fn, controller=None, hub=None):
+        groups = tuple((kind, name) for kind, name in (("controller", controller), ("hub", hub))
+                       if name and self.limits[kind] > 0)
+        self.pending.append((key, fn, groups))
+
+    def _fits(self, groups):
+        return all(self.running.get(group, 0) < self.limits[group[0]] for group in groups)
+
+    def run(self, stop_event=None):
+        done = queue.Queue()
+        active = 0
+        waiting = set()
+        with ThreadPoolExecutor(max_workers=max(1, len(self.pending))) as executor:
+            while self.pending or active:
+                if stop_event is not None and stop_event.is_set() and self.pending:
+                    self.log(f"[WARN] Stopped before testing: {[key for key, _, _ in self.pending]}")
+                    skipped, self.pending = self.pending, []
+                    for key, _, _ in skipped:
+                        yield key, None, NotStarted("stopped before the test started")
+                for task in list(self.pending):
+                    key, fn, groups = task
+                    if not self._fits(groups):
+                        if key not in waiting:
+                            waiting.add(key)
+                            busy = ", ".join(f"{kind} {name}" for kind, name in groups)
+                            self.log(f"[INFO] {key} is waiting for a free slot ({busy})")
+                        continue
+                    self.pending.remove(task)
+                    for group in groups:
+                        self.running[group] = self.running.get(group, 0) + 1
+                    future = executor.submit(fn)
+                    future.add_done_callback(lambda f, key=key, groups=groups: done.put((key, groups, f)))
+                    active += 1
+                if not active:
+                    break
+                key, groups, future = done.get()
+                active -= 1
+                for group in groups:
+                    self.running[group] -= 1
+                error = future.exception()
+                yield key, None if error else future.result(), error
@@ -1,102 +1,127 @@
-import os
 import time
-import subprocess
 import tkinter as tk
 from tkinter import ttk
 import threading
-import random
-import string
-import hashlib
-from concurrent.futures import ThreadPoolExecutor
-
-# テスト用の小さなテキストファイルを作成（100文字）
-def create_test_file(file_path, text="Sample text for USB transfer verification. " * 2):
-    with open(file_path, 'w') as f:
-        f.write(text[:100])  # 100文字に制限
-
-# ファイルのハッシュを計算（テキストファイル用）
-def calculate_hash(file_path):
-    hash_md5 = hashlib.md5()
-    with open(file_path, "rb") as f:
-        for chunk in iter(lambda: f.read(4096), b""):
-            hash_md5.update(chunk)
-    return hash_md5.hexdigest()
+from functools import partial
+
+try:
+    from storage_load.storage_io import IoJob, format_result, run_job
+except ImportError:
+    from storage_io import IoJob, format_result, run_job
+try:
+    from storage_load.storage_devices import DeviceIndex
+except ImportError:
+    from storage_devices import DeviceIndex
+try:
+    from storage_load.storage_scheduler import DeviceScheduler, NotStarted
+except ImportError:
+    from storage_scheduler import DeviceScheduler, NotStarted
 
 class StorageTest:
-    def __init__(self, gui_callback=None):
+    def __init__(self, gui_callback=None, io_job=None, device_root="/", per_controller=4, per_hub=2):
         self.stop_event = threading.Event()
         self.gui_callback = gui_callback  # GUIに進行状況を表示するためのコールバック関数
-        self.usb_devices = []  # USBデバイスのリストを保持
-        self.storage_devices = []  # ストレージデバイスのリスト
+        self.devices = DeviceIndex(device_root, log=self.update_gui)  # sysfs のデバイスモデル (device_root はフィクスチャ用)
+        self.usb_devices = []  # USBデバイス (storage_devices.UsbDevice、ハブは除く)
+        self.storage_devices = []  # テストするマウントポイント
+        self.storage_ports = set()  # ストレージがつながっている USB ポート
+        self.targets = {}  # mountpoint -> (BlockDevice, Partition or None)
+        self.results = {}  # mountpoint / device_info -> (success_count, fail_count)
+        self.io_job = io_job or IoJob(verify=True)  # ストレージに流す I/O (storage_io.IoJob)
+        self.io_stats = {}  # mountpoint -> storage_io の集計 (MB/s, IOPS, レイテンシ)
+        self.per_controller = per_controller  # 同じホストコントローラで同時に走らせるストレージの数 (0: 無制限)
+        self.per_hub = per_hub  # 同じ外付けハブで同時に走らせるストレージの数 (0: 無制限)
+        self.progress = {}  # mountpoint / device_info -> 進捗 (%)
+        self._progress_index = {}
+        self._progress_lock = threading.Lock()
 
     def detect_usb_devices(self):
-        # USBデバイスのリストを探す（lsusbコマンドで検出）
-        self.usb_devices = []
-        self.storage_devices = []
-        result = subprocess.run(["lsusb"], capture_output=True, text=True)
-        if result.returncode == 0:
-            for line in result.stdout.splitlines():
-                if line:
-                    self.usb_devices.append(line)
-        self.update_gui(f"[INFO] Detected USB devices: {self.usb_devices}")
-
-        # ストレージデバイスのリストを探す（lsblkコマンドで検出）
-        try:
-            lsblk_output = subprocess.check_output("lsblk -o NAME,MOUNTPOINT,SIZE,TYPE", shell=True).decode('utf-8')
-            for line in lsblk_output.splitlines():
-                if '/media/' in line and 'part' in line:
-                    parts = line.split()
-                    mountpoint = parts[1]
-                    self.storage_devices.append(mountpoint)
-                    self.update_gui(f"[DEBUG] Detected storage device with mountpoint: {mountpoint}")
-        except subprocess.CalledProcessError as e:
-            self.update_gui(f"[ERROR] Failed to detect storage devices: {e}")
-
-    def run_storage_test(self, progress_callback):
+        # sysfs から USB デバイスと書き込めるマウント済みの USB ストレージを探す (storage_devices.py)
+        # 2 回目以降は変わったデバイスだけ読み直す
+        start_time = time.perf_counter()
+        self.devices.refresh()
+        self.usb_devices = self.devices.usb_devices()
+        self.storage_ports = self.devices.storage_ports()
+        self.targets = {mountpoint: (disk, part) for mountpoint, disk, part in self.devices.storage_targets()}
+        self.storage_devices = list(self.targets)
+        self.update_gui(f"[INFO] Detected USB devices: {[str(device) for device in self.usb_devices]}")
+        for mountpoint, (disk, part) in self.targets.items():
+            self.update_gui(f"[DEBUG] Detected storage device {(part or disk).name} on USB port {disk.usb_port} "
+                            f"with mountpoint: {mountpoint}")
+        self.update_gui(f"[INFO] Device discovery took {(time.perf_counter() - start_time) * 1000:.1f} ms")
+
+    def run_storage_test(self, progress_callback, duration=300, on_result=None):
         # ストレージテストを開始する
-        self.update_gui("[INFO] Starting storage test...")
-        source_file = "/tmp/test_file.txt"
-        create_test_file(source_file)
-        
-        with ThreadPoolExecutor() as executor:
-            futures = []
-            # ストレージデバイスのテスト
-            for idx, mountpoint in enumerate(self.storage_devices):
-                futures.append(executor.submit(self.perform_storage_test, idx, mountpoint, source_file, progress_callback))
-            # 非ストレージデバイスの応答テスト
-            for idx, device_info in enumerate(self.usb_devices):
-                is_storage = any(mount in device_info for mount in self.storage_devices)
-                if not is_storage:
-                    futures.append(executor.submit(self.perform_non_storage_response_test, idx, device_info, progress_callback))
-
-            # 各タスクの完了を待つ
-            for future in futures:
-                future.result()
-        os.remove(source_file)
-
-    def perform_storage_test(self, index, mountpoint, source_file, progress_callback, duration=300):
-        # ストレージデバイスに対して読み書きテストを実行
-        target_file = os.path.join(mountpoint, "test_copy.txt")
-        success_count = 0
-        fail_count = 0
-        start_time = time.time()
-
-        while time.time() - start_time < duration:
-            if self.stop_event.is_set():
-                break
-            try:
-                subprocess.check_call(f"cp {source_file} {target_file}", shell=True)
-                if calculate_hash(source_file) == calculate_hash(target_file):
-                    success_count += 1
-                else:
-                    fail_count += 1
-                os.remove(target_file)
-            except Exception as e:
-                fail_count += 1
-                self.update_gui(f"[ERROR] Failed to write/read to storage device {index + 1}: {e}")
-            progress_callback(index, (time.time() - start_time) / duration * 100)
-            time.sleep(1)
-        self.update_gui(f"[INFO] Storage test completed on {mountpoint}: {success_count} successes, {fail_count} failures.")
+        # 同じ外付けハブ / コントローラのストレージは per_hub / per_controller 台までしか同時に走らせない
+        # (storage_scheduler.py)。結果は終わったデバイスから on_result(key, (success, fail)) と GUI に出す
+        self.results = {}
+        self.io_stats = {}
+        self.progress = {}
+        self._progress_index = {}
+        self.update_gui(f"[INFO] Starting storage test ({self.io_job.describe()})...")
+
+        scheduler = DeviceScheduler(self.per_controller, self.per_hub, log=self.update_gui)
+        # ストレージデバイスのテスト (進捗はそのデバイスの USB デバイス番号に出す)
+        ports = [device.port for device in self.usb_devices]
+        for idx, mountpoint in enumerate(self.storage_devices):
+            disk, _ = self.targets.get(mountpoint, (None, None))
+            index = ports.index(disk.usb_port) if disk and disk.usb_port in ports else len(ports) + idx
+            scheduler.add(mountpoint, partial(self.perform_storage_test, index, mountpoint,
+                                              self._track_progress(mountpoint, index, progress_callback), duration),
+                          controller=disk and disk.controller, hub=disk and disk.external_hub)
+        # 非ストレージデバイスの応答テスト (バスに負荷をかけないので上限には数えない)
+        for idx, device_info in enumerate(self.usb_devices):
+            if device_info.port not in self.storage_ports:
+                key = str(device_info)
+                scheduler.add(key, partial(self.perform_non_storage_response_test, idx, device_info,
+                                           self._track_progress(key, idx, progress_callback), duration))
+
+        # 終わった順に報告する
+        total = len(scheduler.pending)
+        for finished, (key, _, error) in enumerate(scheduler.run(self.stop_event), start=1):
+            if isinstance(error, NotStarted):
+                self.results[key] = (0, 1)           # テストしていないので合格にはしない
+                self.update_gui(f"[WARN] {key} was not tested: {error}")
+            elif error is not None:
+                self.results[key] = (0, 1)
+                self.update_gui(f"[ERROR] Test for {key} failed: {error}")
+            success, fail = self.results.get(key, (0, 1))
+            self.update_gui(f"[INFO] {finished}/{total} devices finished: {key} "
+                            f"{'pass' if fail == 0 else 'fail'} ({success} ok, {fail} failed)")
+            if on_result:
+                on_result(key, (success, fail))
+
+    def _track_progress(self, key, index, progress_callback):
+        # デバイスごとの進捗を別々に記録し、同じ USB デバイスに載っている分 (複数パーティション) は平均して出す
+        self.progress[key] = 0.0
+        self._progress_index[key] = index
+
+        def callback(_, percent):
+            with self._progress_lock:
+                self.progress[key] = percent
+                shared = [self.progress[k] for k, i in self._progress_index.items() if i == index]
+            progress_callback(index, sum(shared) / len(shared))
+        return callback
+
+    def perform_storage_test(self, index, mountpoint, progress_callback, duration=300):
+        # ストレージデバイスに I/O を流し続けて帯域・IOPS・レイテンシを測る (storage_io.py)
+        # success は完了した I/O 数、fail は I/O エラー数 + 壊れていたブロック数 (準備に失敗したら 1)
+        # 1 つも I/O が完了しなければテストできていないので不合格にする
+        try:
+            stats = run_job(mountpoint, self.io_job, duration, self.stop_event,
+                            progress=lambda fraction: progress_callback(index, fraction * 100), log=self.update_gui)
+        except OSError as e:
+            self.results[mountpoint] = (0, 1)
+            self.update_gui(f"[ERROR] Failed to write/read to storage device {index + 1}: {e}")
+            return
+        self.io_stats[mountpoint] = stats
+        corrupt = stats.get("verify", {}).get("corrupt", 0)
+        self.results[mountpoint] = (stats["ops"], stats["errors"] + corrupt + (stats["ops"] == 0))
+        if stats["ops"] == 0:
+            self.update_gui(f"[ERROR] No I/O completed on {mountpoint}")
+        if corrupt:
+            self.update_gui(f"[ERROR] Data corruption on {mountpoint}: {corrupt} blocks failed verification")
+        self.update_gui(f"[INFO] Storage test completed on {mountpoint}: {format_result(stats)}")
 
     def perform_non_storage_response_test(self, index, device_info, progress_callback, duration=300):
         # 非ストレージデバイスに対して応答テストを実行
@@ -104,13 +129,7 @@ class StorageTest:
         success_count = 0
         fail_count = 0
 
-        try:
-            # USB規格・スピードを取得
-            device_id = device_info.split()[5]  # デバイスID（例: 0930:6544）
-            usb_speed_cmd = f"lsusb -v -d {device_id} | grep -i 'bcdUSB\\|bDeviceClass\\|iProduct'"
-            usb_speed_info = subprocess.check_output(usb_speed_cmd, shell=True).decode('utf-8')
-        except Exception as e:
-            usb_speed_info = f"Failed to retrieve info for {device_id}: {e}"
+        usb_speed_info = device_info.details()  # USB規格・スピード (sysfs から読んだもの)
 
         while time.time() - start_time < duration:
             if self.stop_event.is_set():
@@ -124,6 +143,7 @@ class StorageTest:
                 self.update_gui(f"[ERROR] Non-storage device {index + 1} response test failed: {e}")
             progress_callback(index, (time.time() - start_time) / duration * 100)
             time.sleep(1)
+        self.results[str(device_info)] = (success_count, fail_count)
         self.update_gui(f"[INFO] Response test completed for device {index + 1}: {device_info}\nUSB Info:\n{usb_speed_info}")
 
     def stop_test(self):
@@ -182,7 +202,7 @@ class StorageTestApp:
         self.progress_bars = []
 
         for index, device_info in enumerate(self.storage_test.usb_devices, start=1):
-            is_storage = any(mount in device_info for mount in self.storage_test.storage_devices)
+            is_storage = device_info.port in self.storage_test.storage_ports
             label_text = f"USB Device {index}: {device_info}"
             label_color = "red" if is_storage else "blue"
             label = tk.Label(self.device_details_frame, text=label_text, fg=label_color, font=("Helvetica", 12))
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+sweep.py  ―  負荷率 → スループット / 電力 / 効率 (GFLOPS / W) のスイープ計測 (GUI 不要)
+  ・CPU 負荷と GPU Tensor 負荷をグリッド状に段階変更し、各ステップで dwell 秒保持
+  ・各ステップの CPU / GPU スループット・使用率・電力 (RAPL + テレメトリの GPU 値) を記録
+  ・スループットは計測区間 (settle 後の dwell 秒) に届いた仕事量だけで出す。
+    効率は CPU GFLOP/s ÷ CPU パッケージ (RAPL) 電力、GPU TFLOP/s ÷ GPU 電力 (全 GPU 合計)
+  ・GPU の電力・使用率は共有テレメトリ (telemetry.get_sampler) のリングバッファから読む
+    (計測中に nvidia-smi を起動しないので、その CPU 負荷が計測に混ざらない)
+  ・結果を表で表示し、効率カーブを CSV に書き出す
+
+例:
+  python sweep.py --cpu 0:100:10 --dwell 10 --out sweep.csv
+  python sweep.py --cpu 0,50,100 --gpu 0:100:25 --kernel gemm
+"""
+
+import argparse
+import csv
+import multiprocessing
+import threading
+import time
+
+try:
+    from cpu_load.cpu_load import LoadErrorLog, apply_cpu_load, read_core_times, core_utilization
+    from cpu_load.cpu_kernels import scale_of, unit_of
+    from system_info.system_info import read_rapl_energy, rapl_power
+    from system_info.telemetry import get_sampler
+except ImportError:
+    from cpu_load import LoadErrorLog, apply_cpu_load, read_core_times, core_utilization
+    from cpu_kernels import scale_of, unit_of
+    from system_info import read_rapl_energy, rapl_power
+    from telemetry import get_sampler
+
+COLUMNS = ["cpu_pct", "gpu_pct", "cpu_util", "gpu_util", "cpu_w", "gpu_w", "total_w",
+           "cpu_gflops", "cpu_err", "cpu_gflops_per_cpu_w", "gpu_tflops", "gpu_tflops_per_gpu_w"]
+
+
+def parse_levels(spec: str) -> list[int]:
+    """'0:100:10' (start:stop:step, stop を含む) または '0,30,60' を展開"""
+    if ":" in spec:
+        start, stop, step = (int(v) for v in spec.split(":"))
+        return list(range(start, stop + 1, step))
+    return [int(v) for v in spec.split(",") if v.strip()]
+
+
+def _gpu_ids():
+    try:
+        import torch
+        return list(range(torch.cuda.device_count()))
+    except ImportError:
+        return []
+
+
+def _mean(values):
+    values = [v for v in values if v is not None]
+    return sum(values) / len(values) if values else None
+
+
+def _gpu_window(sampler, t0: float, t1: float):
+    """テレメトリの GPU 行のうち t0〜t1 に入ったものの平均 (合計電力 W, 平均使用率 %)"""
+    power, util = [], []
+    for t, gpus in sampler.gpu.snapshot():
+        if t0 <= t <= t1:
+            power.append(sum(g["power"] for g in gpus if g.get("power") is not None) or None)
+            util.append(_mean([g.get("util") for g in gpus]))
+    return _mean(power), _mean(util)
+
+
+def run_step(cpu_pct: int, gpu_pct: int, dwell: float, settle: float = 2.0,
+             kernel: str = "gemm", placement: str | None = None, gpu_ids=None) -> dict:
+    """1 ステップ分の負荷をかけ、settle 秒待ってから dwell 秒計測する"""
+    stop_event = multiprocessing.Event()
+    sampler = get_sampler()
+    cpu_summary, gpu_logs = {}, {}
+    cpu_log = LoadErrorLog(cpu_pct, unit=unit_of(kernel), scale=scale_of(kernel)).track_work()
+
+    def cpu_job():
+        cpu_summary.update(apply_cpu_load(cpu_pct, stop_event, kernel=kernel, placement=placement,
+                                          error_log=cpu_log) or {})
+
+    threads = []
+    if cpu_pct > 0:
+        threads.append(threading.Thread(target=cpu_job, daemon=True))
+        threads[-1].start()
+    if gpu_pct > 0 and gpu_ids:
+        try:                                                   # torch を使うときだけ読み込む
+            from gpu_load.gpu_load import apply_gpu_tensor_load
+        except ImportError:
+            from gpu_load import apply_gpu_tensor_load
+        gpu_logs = {g: LoadErrorLog(gpu_pct).track_work() for g in gpu_ids}
+        threads += apply_gpu_tensor_load(gpu_pct, stop_event, gpu_ids, error_logs=gpu_logs)
+
+    time.sleep(settle)
+    cpu0, rapl0, t0 = read_core_times(), read_rapl_energy(), time.time()
+    time.sleep(dwell)
+    cpu1, rapl1, elapsed = read_core_times(), read_rapl_energy(), time.time() - t0
+
+    stop_event.set()
+    for t in threads:
+        t.join(timeout=10)
+
+    cpu_util = _mean([core_utilization(cpu0, cpu1, c) for c in cpu1])
+    cpu_w = rapl_power(rapl0, rapl1, elapsed)
+    gpu_w, gpu_util = _gpu_window(sampler, t0, t0 + elapsed)
+    total_w = (cpu_w or 0.0) + (gpu_w or 0.0) or None
+    # 立ち上がり (settle) と停止処理を除いた計測区間だけのスループット
+    gflops = cpu_log.throughput_between(t0, t0 + elapsed) if cpu_log.unit == "GFLOP/s" else None
+    per_gpu = [log.throughput_between(t0, t0 + elapsed) for log in gpu_logs.values() if log.unit == "TFLOP/s"]
+    per_gpu = [v for v in per_gpu if v is not None]
+    tflops = sum(per_gpu) if per_gpu else None
+    return {
+        "cpu_pct": cpu_pct,
+        "gpu_pct": gpu_pct,
+        "cpu_util": cpu_util * 100 if cpu_util is not None else None,
+        "gpu_util": gpu_util,
+        "cpu_w": cpu_w,
+        "gpu_w": gpu_w,
+        "total_w": total_w,
+        "cpu_gflops": gflops,
+        "cpu_err": cpu_summary.get("mean_error"),
+        "cpu_gflops_per_cpu_w": gflops / cpu_w if gflops and cpu_w else None,
+        "gpu_tflops": tflops,
+        "gpu_tflops_per_gpu_w": tflops / gpu_w if tflops and gpu_w else None,
+    }
+
+
+def run_sweep(cpu_levels, gpu_levels, dwell: float = 10.0, settle: float = 2.0,
+              kernel: str = "gemm", placement: str | None = None, on_step=None) -> list[dict]:
+    gpu_ids = _gpu_ids() if any(g > 0 for g in gpu_levels) else []
+    if any(g > 0 for g in gpu_levels) and not gpu_ids:
+        print("[WARN] No CUDA device found; GPU levels are recorded without GPU load.")
+    results = []
+    for gpu_pct in gpu_levels:
+        for cpu_pct in cpu_levels:
+            row = run_step(cpu_pct, gpu_pct, dwell, settle, kernel, placement, gpu_ids)
+            results.append(row)
+            if on_step:
+                on_step(row)
+    return results
+
+
+def _fmt(value, width=9):
+    if value is None:
+        return "-".rjust(width)
+    return f"{value:{width}.1f}" if isinstance(value, float) else str(value).rjust(width)
+
+
+def write_csv(rows, path: str):
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=COLUMNS)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow({k: ("" if v is None else round(v, 3) if isinstance(v, float) else v)
+                             for k, v in row.items()})
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless load-level / power efficiency sweep")
+    parser.add_argument("--cpu", default="0:100:10", help="CPU load levels (start:stop:step or a,b,c)")
+    parser.add_argument("--gpu", default="0", help="GPU tensor load levels (start:stop:step or a,b,c)")
+    parser.add_argument("--dwell", type=float, default=10.0, help="measurement seconds per step")
+    parser.add_argument("--settle", type=float, default=2.0, help="seconds to wait before measuring")
+    parser.add_argument("--kernel", default="gemm", help="CPU kernel (see cpu_kernels.KERNELS)")
+    parser.add_argument("--placement", default=None, help="CPU placement policy (see cpu_topology.POLICIES)")
+    parser.add_argument("--out", default="sweep.csv", help="CSV path for the efficiency curve")
+    args = parser.parse_args(argv)
+
+    cpu_levels, gpu_levels = parse_levels(args.cpu), parse_levels(args.gpu)
+    steps = len(cpu_levels) * len(gpu_levels)
+    print(f"[INFO] Sweep: {steps} steps, about {steps * (args.dwell + args.settle) / 60:.1f} min")
+    print(" ".join(c.rjust(9) for c in COLUMNS))
+    rows = run_sweep(cpu_levels, gpu_levels, args.dwell, args.settle, args.kernel, args.placement,
+                     on_step=lambda row: print(" ".join(_fmt(row[c]) for c in COLUMNS), flush=True))
+    write_csv(rows, args.out)
+    print(f"[INFO] Efficiency curve written to {args.out}")
+    return rows
+
+
+if __name__ == "__main__":
+    main()
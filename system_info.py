@@ -1,3 +1,4 @@
+import os
 import subprocess
 
 def get_cpu_info():
@@ -21,3 +22,63 @@ def get_psu_power():
         return f"GPU Power Draw: {power_info} W"
     except Exception as e:
         return str(e)
+
+def _query_gpu_values(field):
+    """nvidia-smi の数値フィールドを GPU ごとの float リストで返す (取得失敗時は空)"""
+    try:
+        out = subprocess.check_output(
+            ["nvidia-smi", f"--query-gpu={field}", "--format=csv,noheader,nounits"],
+            stderr=subprocess.DEVNULL).decode()
+    except Exception:
+        return []
+    values = []
+    for line in out.splitlines():
+        try:
+            values.append(float(line.strip()))
+        except ValueError:
+            pass  # [N/A] など
+    return values
+
+def get_gpu_power_watts():
+    return _query_gpu_values("power.draw")
+
+def get_gpu_utilization():
+    return _query_gpu_values("utilization.gpu")
+
+RAPL_ROOT = "/sys/class/powercap"
+
+def read_rapl_energy():
+    """
+    CPU パッケージ (intel-rapl:N) ごとの累積エネルギー [J] と最大値 [J] を返す。
+    RAPL が無い / 読めない環境では空の dict。
+    """
+    energy = {}
+    try:
+        zones = sorted(d for d in os.listdir(RAPL_ROOT) if d.count(":") == 1)
+    except OSError:
+        return energy
+    for zone in zones:
+        base = os.path.join(RAPL_ROOT, zone)
+        try:
+            with open(os.path.join(base, "energy_uj")) as f:
+                uj = int(f.read())
+            with open(os.path.join(base, "max_energy_range_uj")) as f:
+                max_uj = int(f.read())
+        except (OSError, ValueError):
+            continue
+        energy[zone] = (uj / 1e6, max_uj / 1e6)
+    return energy
+
+def rapl_power(before, after, seconds):
+    """read_rapl_energy() 2 回分からパッケージ電力合計 [W] を求める (カウンタ一周も考慮)"""
+    if not before or seconds <= 0:
+        return None
+    total = 0.0
+    for zone, (e0, max_e) in before.items():
+        if zone not in after:
+            continue
+        delta = after[zone][0] - e0
+        if delta < 0:
+            delta += max_e
+        total += delta
+    return total / seconds
@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+telemetry.py  ―  バックグラウンド計測デーモン
+  ・GPU: nvidia-smi --loop-ms を 1 本だけ常駐させて行を読む (pynvml があれば NVML を直接使用)
+  ・CPU / メモリ / 周波数 / 温度: /proc と /sys を直接読む
+  ・結果はリングバッファに入れ、GUI は latest() で待たずに最新値を取れる
+nvidia-smi のパスは引数か環境変数 LOADPOWER_NVIDIA_SMI で差し替え可能 (GPU の無い機械でも
+偽スクリプトでテストできる)。
+"""
+
+import os
+import subprocess
+import threading
+import time
+
+try:
+    from cpu_load.cpu_load import read_core_times, core_utilization
+except ImportError:
+    from cpu_load import read_core_times, core_utilization
+
+try:
+    import pynvml
+except ImportError:
+    pynvml = None
+
+GPU_FIELDS = ["index", "utilization.gpu", "utilization.memory", "memory.used", "memory.total",
+              "power.draw", "temperature.gpu", "clocks.sm"]
+GPU_KEYS = ["index", "util", "mem_util", "mem_used", "mem_total", "power", "temp", "sm_clock"]
+THERMAL_ROOT = "/sys/class/thermal"
+CPUFREQ_ROOT = "/sys/devices/system/cpu"
+
+
+class RingBuffer:
+    """
+    書き手 1 本・読み手複数の固定長リングバッファ。
+    スロットの差し替えとカウンタ更新はそれぞれ 1 回の代入なので、読み手はロック無しで
+    latest() / snapshot() を呼べる (GIL 下で途中状態は見えない)。
+    """
+
+    def __init__(self, size: int = 1024):
+        self.size = size
+        self.slots = [None] * size
+        self.count = 0
+
+    def append(self, item):
+        self.slots[self.count % self.size] = item
+        self.count += 1
+
+    def latest(self):
+        count = self.count
+        return self.slots[(count - 1) % self.size] if count else None
+
+    def snapshot(self, n: int | None = None) -> list:
+        """古い順に最大 n 件 (既定は保持分すべて)"""
+        count = self.count
+        n = min(count, self.size, n or self.size)
+        return [self.slots[i % self.size] for i in range(count - n, count)]
+
+
+def _to_float(text: str):
+    try:
+        return float(text.strip())
+    except ValueError:
+        return None   # [N/A] / [Not Supported]
+
+
+def parse_gpu_line(line: str) -> dict | None:
+    parts = line.split(",")
+    if len(parts) != len(GPU_KEYS):
+        return None
+    values = [_to_float(p) for p in parts]
+    if values[0] is None:
+        return None
+    gpu = dict(zip(GPU_KEYS, values))
+    gpu["index"] = int(gpu["index"])
+    return gpu
+
+
+def read_meminfo(path: str = "/proc/meminfo") -> dict:
+    info = {}
+    try:
+        with open(path) as f:
+            for line in f:
+                key, _, rest = line.partition(":")
+                info[key] = int(rest.split()[0])
+    except (OSError, ValueError, IndexError):
+        return {}
+    total = info.get("MemTotal", 0)
+    avail = info.get("MemAvailable", info.get("MemFree", 0))
+    return {"total_kb": total, "percent": (total - avail) / total * 100 if total else None}
+
+
+def read_cpu_freqs(root: str = CPUFREQ_ROOT) -> dict[int, float]:
+    """論理 CPU ごとの現在周波数 [MHz] (cpufreq が無ければ空)"""
+    freqs = {}
+    try:
+        names = os.listdir(root)
+    except OSError:
+        return freqs
+    for name in names:
+        if not (name.startswith("cpu") and name[3:].isdigit()):
+            continue
+        try:
+            with open(os.path.join(root, name, "cpufreq", "scaling_cur_freq")) as f:
+                freqs[int(name[3:])] = int(f.read()) / 1000.0
+        except (OSError, ValueError):
+            continue
+    return freqs
+
+
+def read_temperatures(root: str = THERMAL_ROOT) -> dict[str, float]:
+    """thermal_zone ごとの温度 [°C] (type 名をキーにする)"""
+    temps = {}
+    try:
+        zones = sorted(d for d in os.listdir(root) if d.startswith("thermal_zone"))
+    except OSError:
+        return temps
+    for zone in zones:
+        try:
+            with open(os.path.join(root, zone, "type")) as f:
+                name = f.read().strip()
+            with open(os.path.join(root, zone, "temp")) as f:
+                temps[f"{name}:{zone[12:]}"] = int(f.read()) / 1000.0
+        except (OSError, ValueError):
+            continue
+    return temps
+
+
+class TelemetrySampler:
+    """
+    sampler = TelemetrySampler(interval=1.0); sampler.start()
+    sampler.latest() -> {"t", "cpu", "memory", "freq_mhz", "temps", "gpus"}
+    """
+
+    def __init__(self, interval: float = 1.0, history: int = 3600,
+                 nvidia_smi: str | None = None, use_nvml: bool = True):
+        self.interval = interval
+        override = nvidia_smi or os.environ.get("LOADPOWER_NVIDIA_SMI")
+        self.nvidia_smi = override or "nvidia-smi"
+        # nvidia-smi を差し替えたとき (偽スクリプトでのテストなど) は NVML より優先する
+        self.use_nvml = use_nvml and pynvml is not None and not override
+        self.host = RingBuffer(history)
+        self.gpu = RingBuffer(history)
+        self.stop_event = threading.Event()
+        self.proc = None
+        self.threads: list[threading.Thread] = []
+        self.gpu_available = True
+
+    # ── 起動 / 停止 ───────────────────────────────────────
+    def start(self):
+        self.stop_event.clear()
+        gpu_target = self._nvml_loop if self.use_nvml else self._smi_loop
+        self.threads = [threading.Thread(target=self._host_loop, daemon=True),
+                        threading.Thread(target=gpu_target, daemon=True)]
+        for t in self.threads:
+            t.start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+        if self.proc and self.proc.poll() is None:
+            self.proc.terminate()
+            try:
+                self.proc.wait(timeout=2)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+        for t in self.threads:
+            t.join(timeout=2)
+
+    # ── 読み出し (GUI から呼ぶ。ブロックしない) ─────────────
+    def latest(self) -> dict:
+        host = self.host.latest() or {}
+        gpu = self.gpu.latest()
+        result = dict(host)
+        result["gpus"] = gpu[1] if gpu else []
+        return result
+
+    def gpu_power_total(self):
+        gpus = self.latest()["gpus"]
+        powers = [g["power"] for g in gpus if g.get("power") is not None]
+        return sum(powers) if powers else None
+
+    def vram_percent(self, index: int = 0):
+        for g in self.latest()["gpus"]:
+            if g["index"] == index and g.get("mem_used") is not None and g.get("mem_total"):
+                return g["mem_used"] / g["mem_total"] * 100
+        return None
+
+    def format_gpu_info(self) -> str:
+        """get_gpu_info() と同じ並び (util, mem util, total, free, used) の文字列"""
+        lines = []
+        for g in self.latest()["gpus"]:
+            vals = [g.get("util"), g.get("mem_util"), g.get("mem_total"),
+                    None if g.get("mem_total") is None or g.get("mem_used") is None
+                    else g["mem_total"] - g["mem_used"], g.get("mem_used")]
+            lines.append(", ".join("[N/A]" if v is None else f"{v:g}" for v in vals))
+        return "\n".join(lines)
+
+    # ── /proc, /sys ───────────────────────────────────────
+    def _host_loop(self):
+        prev = read_core_times()
+        while not self.stop_event.wait(self.interval):
+            cur = read_core_times()
+            per_core = [core_utilization(prev, cur, c) for c in sorted(cur)]
+            valid = [u for u in per_core if u is not None]
+            prev = cur
+            self.host.append({
+                "t": time.time(),
+                "cpu": {"percent": sum(valid) / len(valid) * 100 if valid else None,
+                        "per_core": [u * 100 if u is not None else None for u in per_core]},
+                "memory": read_meminfo(),
+                "freq_mhz": read_cpu_freqs(),
+                "temps": read_temperatures(),
+            })
+
+    # ── GPU: nvidia-smi 常駐ストリーム ─────────────────────
+    def _smi_loop(self):
+        cmd = [self.nvidia_smi, f"--query-gpu={','.join(GPU_FIELDS)}",
+               "--format=csv,noheader,nounits", f"--loop-ms={int(self.interval * 1000)}"]
+        backoff = 1.0
+        while not self.stop_event.is_set():
+            try:
+                self.proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                             text=True, bufsize=1)
+            except OSError:
+                self.gpu_available = False   # nvidia-smi が無い (GPU 無し環境)
+                return
+            batch, last_index = [], None
+            for line in self.proc.stdout:
+                gpu = parse_gpu_line(line)
+                if gpu is None:
+                    continue
+                # index が巻き戻ったら前の周期は欠けていた (GPU が減った / 行が読めなかった)。
+                # 最後の GPU の番号を覚え直す (最初の周期もここで覚える)
+                if batch and gpu["index"] <= batch[-1]["index"]:
+                    last_index = batch[-1]["index"]
+                    self.gpu.append((time.time(), batch))
+                    batch = []
+                batch.append(gpu)
+                # 最後の GPU の行が来たら次の周期を待たずに確定する
+                if gpu["index"] == last_index:
+                    self.gpu.append((time.time(), batch))
+                    batch = []
+                if self.stop_event.is_set():
+                    break
+            if batch:
+                self.gpu.append((time.time(), batch))
+            self.proc.wait()
+            # ストリームが落ちたら間隔を空けて張り直す
+            if self.stop_event.wait(backoff):
+                return
+            backoff = min(backoff * 2, 30.0)
+
+    # ── GPU: NVML ─────────────────────────────────────────
+    def _nvml_loop(self):
+        try:
+            pynvml.nvmlInit()
+            handles = [pynvml.nvmlDeviceGetHandleByIndex(i) for i in range(pynvml.nvmlDeviceGetCount())]
+        except pynvml.NVMLError:
+            self.gpu_available = False
+            return
+        failing = {}                          # GPU 番号 → 直前の NVML エラー (同じエラーは 1 回だけ出す)
+        try:
+            while not self.stop_event.is_set():
+                batch = []
+                for i, h in enumerate(handles):
+                    try:
+                        util = pynvml.nvmlDeviceGetUtilizationRates(h)
+                        mem = pynvml.nvmlDeviceGetMemoryInfo(h)
+                    except pynvml.NVMLError as e:
+                        # 1 台が落ちても (GPU が外れた等) 他の GPU の計測は続ける
+                        if failing.get(i) != str(e):
+                            print(f"[WARN] NVML read failed for GPU {i}: {e}")
+                        failing[i] = str(e)
+                        batch.append({"index": i, "util": None, "mem_util": None, "mem_used": None,
+                                      "mem_total": None, "power": None, "temp": None, "sm_clock": None})
+                        continue
+                    if failing.pop(i, None) is not None:
+                        print(f"[INFO] NVML readings for GPU {i} recovered")
+                    batch.append({
+                        "index": i, "util": float(util.gpu), "mem_util": float(util.memory),
+                        "mem_used": mem.used / 2**20, "mem_total": mem.total / 2**20,
+                        "power": _nvml_or_none(pynvml.nvmlDeviceGetPowerUsage, h, 1000.0),
+                        "temp": _nvml_or_none(pynvml.nvmlDeviceGetTemperature, h, 1.0,
+                                              pynvml.NVML_TEMPERATURE_GPU),
+                        "sm_clock": _nvml_or_none(pynvml.nvmlDeviceGetClockInfo, h, 1.0,
+                                                  pynvml.NVML_CLOCK_SM),
+                    })
+                self.gpu.append((time.time(), batch))
+                self.stop_event.wait(self.interval)
+        finally:
+            pynvml.nvmlShutdown()
+
+
+def _nvml_or_none(fn, handle, scale, *args):
+    try:
+        return fn(handle, *args) / scale
+    except pynvml.NVMLError:
+        return None
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def get_sampler(interval: float = 1.0) -> TelemetrySampler:
+    """プロセス内で共有するサンプラー (初回呼び出しで起動。複数スレッドから呼んでも 1 つだけ)"""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = TelemetrySampler(interval=interval).start()
+        return _shared
+
+
+if __name__ == "__main__":
+    sampler = TelemetrySampler(interval=1.0).start()
+    try:
+        while True:
+            time.sleep(1.0)
+            snap = sampler.latest()
+            cpu = snap.get("cpu", {}).get("percent")
+            mem = snap.get("memory", {}).get("percent")
+            print(f"CPU {cpu if cpu is None else round(cpu, 1)}%  MEM {mem if mem is None else round(mem, 1)}%  "
+                  f"GPUs {[(g['index'], g['util'], g['power']) for g in snap['gpus']]}")
+    except KeyboardInterrupt:
+        sampler.stop()
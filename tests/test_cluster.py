@@ -0,0 +1,81 @@
+"""コーディネーター + localhost のエージェント 2 つでランプ付きの Burn-in を通す"""
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+from cluster import Coordinator, NodeState, parse_ramp
+from cpu_load import SETTLE_SEC, LoadErrorLog
+from orchestrator import BurnInProfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class _RecordingConnection:
+    def __init__(self):
+        self.sent = []
+
+    def send(self, msg_type, **payload):
+        self.sent.append(msg_type)
+
+
+def test_broadcast_to_no_nodes_sends_nothing():
+    coord = Coordinator(log=lambda msg: None)
+    node = NodeState(name="a", addr="-", conn=_RecordingConnection())
+    coord.nodes["a"] = node
+    coord._broadcast("stop", [])
+    assert node.conn.sent == []
+    coord._broadcast("stop")
+    assert node.conn.sent == ["stop"]
+
+
+def test_samples_right_after_a_level_change_are_not_scored():
+    log = LoadErrorLog(20, tolerance=2.0)
+    t = log.t0 + 10.0
+    log.add(t, 0, 20.5, 0.2)
+    log.set_target(40, t)
+    assert log.add(t + 1.0, 0, 21.0, 0.4) is None          # 古い目標で制御された区間を含む
+    assert log.add(t + SETTLE_SEC + 0.1, 0, 39.0, 0.4) == pytest.approx(-1.0)
+    summary = log.summary()
+    assert (summary["samples"], summary["settling"]) == (2, 1)
+    assert summary["max_abs_error"] == pytest.approx(1.0)
+
+
+@pytest.fixture
+def agents():
+    procs = []
+
+    def start(port, name):
+        procs.append(subprocess.Popen([sys.executable, "cluster.py", "agent", "--connect", f"127.0.0.1:{port}",
+                                       "--name", name], cwd=ROOT, stdout=subprocess.DEVNULL,
+                                      stderr=subprocess.DEVNULL))
+    yield start
+    for proc in procs:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def test_two_local_agents_ramp_and_pass(agents):
+    coord = Coordinator("127.0.0.1", 0, log=lambda msg: None).listen()
+    try:
+        for name in ("node1", "node2"):
+            agents(coord.port, name)
+        assert coord.wait_for_agents(2, timeout=60)
+        # 2 つのエージェントが同じコアを取り合うので、誤差の判定は緩くして連携だけを見る
+        profile = BurnInProfile.from_dict({"duration": 6, "cpu": 20, "cpu_tolerance": 100.0})
+        t0 = time.time()
+        report = coord.run(profile, parse_ramp("2:40"), start_delay=1.0, view_sec=0.5)
+    finally:
+        coord.close()
+    assert time.time() - t0 < 60
+    assert sorted(report["nodes"]) == ["node1", "node2"]
+    assert report["passed"], report["nodes"]
+    for node in report["nodes"].values():
+        assert node["state"] == "done"
+        assert abs(node["offset_ms"]) < 1000
+        assert node["results"]["cpu"]["target"] == 40.0       # ランプが届いている
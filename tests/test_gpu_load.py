@@ -0,0 +1,26 @@
+"""TensorLoadEngine を torch の CPU デバイスで回し、目標使用率の保持とスループットを確かめる (GPU 不要)"""
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("torch")
+
+from gpu_load import TensorLoadEngine  # noqa: E402
+
+
+@pytest.mark.parametrize("mode", ["eager", "graph"])
+def test_engine_holds_target_on_cpu(mode):
+    engine = TensorLoadEngine("cpu", "fp32", mode=mode)
+    stop = threading.Event()
+    timer = threading.Timer(3.0, stop.set)
+    timer.start()
+    t0 = time.time()
+    summary = engine.run(50, stop)
+    timer.cancel()
+    assert time.time() - t0 < 5.0                 # 停止に反応する
+    assert summary["samples"] >= 2
+    assert summary["mean_abs_error"] <= 5.0
+    assert summary["unit"] == "TFLOP/s"
+    assert summary["throughput"] > 0
+    assert summary["busy_seconds"] == pytest.approx(1.5, abs=0.5)
@@ -0,0 +1,77 @@
+"""TimeSeriesRecorder の時間による確定、追記時の meta.json の引き継ぎ、コア使用率の窓と書き込み失敗"""
+import errno
+import json
+import os
+import time
+
+import numpy as np
+
+from recorder import Recording, TimeSeriesRecorder
+
+
+def _record(path, seconds, **kwargs):
+    rec = TimeSeriesRecorder(path, rate=20, per_core=False, disks=False, **kwargs)
+    rec.add_gauge("g")
+    rec.start()
+    time.sleep(seconds)
+    return rec
+
+
+def test_flushes_on_time_before_chunk_fills(tmp_path):
+    rec = _record(str(tmp_path), 1.0, chunk_rows=10_000, flush_sec=0.2)
+    try:
+        assert Recording(str(tmp_path)).rows > 0     # chunk_rows には届いていないが確定済み
+    finally:
+        rec.stop()
+
+
+def test_append_keeps_first_start(tmp_path):
+    path = str(tmp_path)
+    _record(path, 0.5, flush_sec=0.1).stop()
+    with open(os.path.join(path, "meta.json")) as f:
+        first = json.load(f)
+    rows = Recording(path).rows
+    assert rows > 0
+
+    _record(path, 0.5, flush_sec=0.1).stop()
+    with open(os.path.join(path, "meta.json")) as f:
+        meta = json.load(f)
+    assert meta["start"] == first["start"]
+    assert [s["row"] for s in meta["sessions"]] == [0, rows]
+    assert meta["sessions"][1]["start"] > first["start"]
+    assert Recording(path).rows > rows
+
+
+def test_write_error_stops_recording_with_warning(tmp_path):
+    messages = []
+    rec = TimeSeriesRecorder(str(tmp_path), rate=20, per_core=False, disks=False, flush_sec=0.1,
+                             log=messages.append)
+
+    def full_disk(times, rows, fill):
+        raise OSError(errno.ENOSPC, "No space left on device")
+
+    rec._flush = full_disk
+    rec.start()
+    rec.thread.join(timeout=5)
+    assert not rec.thread.is_alive()
+    rec.stop()
+    assert "No space left on device" in rec.error
+    assert messages and messages[0].startswith("[WARN] Recorder stopped")
+
+
+def test_core_utilization_uses_a_trailing_window(tmp_path):
+    # 100 Hz でも /proc/stat の tick (10 ms) 単位の 0% / 100% / 欠測にならず、半分の負荷は中間の値になる
+    rec = TimeSeriesRecorder(str(tmp_path), rate=100, disks=False, flush_sec=0.1).start()
+    deadline = time.time() + 2.0
+    while time.time() < deadline:
+        t = time.perf_counter()
+        while time.perf_counter() - t < 0.005:
+            pass                                # 5 ms 回して 5 ms 休む
+        time.sleep(0.005)
+    rec.stop()
+    recording = Recording(str(tmp_path))
+    cores = [c for c in recording.channels if c.startswith("cpu") and c.endswith(".util")]
+    assert cores and recording.rows > 100
+    util = np.nanmax(np.stack([recording[c][50:] for c in cores]), axis=0)   # 負荷の載ったコア
+    assert not np.isnan(util).any()
+    assert 10 < np.median(util) < 90
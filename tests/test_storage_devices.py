@@ -0,0 +1,100 @@
+"""DeviceIndex.refresh() を固定の sysfs ツリーで確かめる (追加 / 変化なし / 差し直し / マウント変更 / 削除)"""
+import os
+
+import pytest
+
+from storage_devices import DeviceIndex
+
+CONTROLLER = "devices/pci0000:00/0000:00:14.0"
+USB_DISK = f"{CONTROLLER}/usb2/2-1"
+SCSI = f"{USB_DISK}/2-1:1.0/host0/target0:0:0/0:0:0:0"
+MOUNTINFO = "36 25 8:17 / /media/usb0 rw,relatime shared:1 - vfat /dev/sdb1 rw\n"
+
+
+def _write(root, path, **attrs):
+    directory = os.path.join(root, path)
+    os.makedirs(directory, exist_ok=True)
+    for name, value in attrs.items():
+        with open(os.path.join(directory, name), "w") as f:
+            f.write(f"{value}\n")
+    return directory
+
+
+def _link(root, link, target):
+    link = os.path.join(root, link)
+    os.makedirs(os.path.dirname(link), exist_ok=True)
+    os.symlink(os.path.relpath(os.path.join(root, target), os.path.dirname(link)), link)
+
+
+@pytest.fixture
+def sysfs(tmp_path):
+    """ルートハブ usb2 の 2-1 に USB メモリ (sdb, パーティション sdb1 を /media/usb0 にマウント)"""
+    root = str(tmp_path)
+    _write(root, f"{CONTROLLER}/usb2", busnum=2, devnum=1, bDeviceClass="09", speed=5000, version=" 3.10")
+    _write(root, USB_DISK, busnum=2, devnum=3, idVendor="0781", idProduct="5581", manufacturer="SanDisk",
+           product="Ultra", speed=5000, version=" 3.20", bDeviceClass="00")
+    _write(root, f"{USB_DISK}/2-1:1.0", bInterfaceClass="08")
+    _write(root, SCSI, vendor="SanDisk", model="Ultra")
+    disk = f"{SCSI}/block/sdb"
+    _write(root, disk, dev="8:16", size=2048, removable=1, diskseq=7)
+    _write(root, f"{disk}/sdb1", dev="8:17", size=2000, partition=1)
+    _link(root, f"{disk}/device", SCSI)
+    for name, target in (("usb2", f"{CONTROLLER}/usb2"), ("2-1", USB_DISK), ("2-1:1.0", f"{USB_DISK}/2-1:1.0")):
+        _link(root, f"sys/bus/usb/devices/{name}", target)
+    _link(root, "sys/block/sdb", disk)
+    _write(root, "proc/self")
+    with open(os.path.join(root, "proc/self/mountinfo"), "w") as f:
+        f.write(MOUNTINFO)
+    return root
+
+
+def test_initial_refresh_reads_topology_and_mounts(sysfs):
+    index = DeviceIndex(sysfs, log=lambda msg: None)
+    changes = index.refresh()
+    assert sorted(changes["added"]) == ["2-1", "sdb", "usb2"]
+    assert changes["removed"] == changes["changed"] == []
+    usb = index.usb["2-1"]
+    assert (usb.controller, usb.hub, usb.speed_mbps, usb.is_storage) == ("0000:00:14.0", "usb2", 5000.0, True)
+    disk = index.disks["sdb"]
+    assert (disk.usb_port, disk.model, disk.size, disk.external_hub) == ("2-1", "SanDisk Ultra", 2048 * 512, None)
+    assert [(path, d.name, p.name) for path, d, p in index.storage_targets()] == [("/media/usb0", "sdb", "sdb1")]
+    assert index.storage_ports() == {"2-1"}
+
+
+def test_refresh_without_changes_reports_nothing(sysfs):
+    index = DeviceIndex(sysfs, log=lambda msg: None)
+    index.refresh()
+    assert index.refresh() == {"added": [], "removed": [], "changed": []}
+
+
+def test_replug_and_remount_are_changes(sysfs):
+    index = DeviceIndex(sysfs, log=lambda msg: None)
+    index.refresh()
+    # 同じポートに差し直すと devnum が変わる
+    _write(sysfs, USB_DISK, devnum=4)
+    assert index.refresh()["changed"] == ["2-1"]
+    assert index.usb["2-1"].devnum == 4
+    # アンマウント
+    with open(os.path.join(sysfs, "proc/self/mountinfo"), "w") as f:
+        f.write("")
+    assert index.refresh()["changed"] == ["sdb"]
+    assert index.storage_targets() == [] and index.by_mount == {}
+
+
+def test_unplug_removes_device_and_disk(sysfs):
+    index = DeviceIndex(sysfs, log=lambda msg: None)
+    index.refresh()
+    for link in ("sys/bus/usb/devices/2-1", "sys/bus/usb/devices/2-1:1.0", "sys/block/sdb"):
+        os.remove(os.path.join(sysfs, link))
+    changes = index.refresh()
+    assert sorted(changes["removed"]) == ["2-1", "sdb"]
+    assert "2-1" not in index.usb and "sdb" not in index.disks
+    assert index.storage_targets() == []
+
+
+def test_dangling_link_is_skipped(sysfs):
+    # 抜かれた直後はリンク先が消えていることがある
+    os.symlink("../../devices/gone/sdc", os.path.join(sysfs, "sys/block/sdc"))
+    index = DeviceIndex(sysfs, log=lambda msg: None)
+    assert "sdc" not in index.refresh()["added"]
+    assert "sdc" not in index.disks
@@ -0,0 +1,105 @@
+"""IoEngine の検証付き往復 (threads / aio) と、準備後に壊したブロックの検出 (tmpfs があればそこで)"""
+import os
+import threading
+
+import numpy as np
+import pytest
+
+from storage_aio import AioContext, AioUnavailable
+from storage_io import IoEngine, IoJob, TEST_FILE
+
+BLOCK = 4096
+BLOCKS = 64
+
+
+@pytest.fixture
+def directory(tmp_path):
+    """tmpfs (/dev/shm) があればその下、無ければ pytest の一時ディレクトリ"""
+    if os.path.isdir("/dev/shm") and os.access("/dev/shm", os.W_OK):
+        path = os.path.join("/dev/shm", f"lin_bench_test_{os.getpid()}_{tmp_path.name}")
+        os.makedirs(path)
+        yield path
+        for name in os.listdir(path):
+            os.remove(os.path.join(path, name))
+        os.rmdir(path)
+    else:
+        yield str(tmp_path)
+
+
+def _require_backend(backend):
+    """aio は AIO が使えない環境 (コンテナの制限など) では飛ばす。黙って threads で通さない"""
+    if backend == "aio":
+        try:
+            AioContext(4).close()
+        except AioUnavailable as e:
+            pytest.skip(f"Linux AIO unavailable: {e}")
+
+
+def _engine(directory, backend, read_pct):
+    job = IoJob(block_size=BLOCK, queue_depth=4, pattern="seq", read_pct=read_pct,
+                file_size=BLOCK * BLOCKS, backend=backend, verify=True)
+    return IoEngine(os.path.join(directory, TEST_FILE), job, log=lambda msg: None)
+
+
+def _corrupt(engine, blocks):
+    """準備したファイルの各ブロックの 1 バイトを反転する"""
+    fd = os.open(engine.path, os.O_RDWR)
+    try:
+        for block in blocks:
+            offset = block * BLOCK + 100
+            os.pwrite(fd, bytes([os.pread(fd, 1, offset)[0] ^ 0xFF]), offset)
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+@pytest.mark.parametrize("backend", ["threads", "aio"])
+def test_round_trip_is_clean(directory, backend):
+    _require_backend(backend)
+    engine = _engine(directory, backend, read_pct=50)
+    try:
+        assert engine.prepare()
+        result = engine.run(0.5)
+    finally:
+        engine.cleanup()
+    assert result["backend"] == backend
+    assert result["ops"] > 0 and result["errors"] == 0
+    assert result["verify"]["checked"] > 0 and result["verify"]["corrupt"] == 0
+    assert not os.path.exists(engine.path)
+
+
+@pytest.mark.parametrize("backend", ["threads", "aio"])
+def test_injected_corruption_is_reported(directory, backend):
+    _require_backend(backend)
+    engine = _engine(directory, backend, read_pct=100)
+    bad = [3, 40]
+    try:
+        assert engine.prepare()
+        _corrupt(engine, bad)
+        result = engine.run(0.5)       # 64 ブロックを順に読み続けるので全ブロックに届く
+    finally:
+        engine.cleanup()
+    assert result["backend"] == backend
+    verify = result["verify"]
+    assert verify["corrupt"] == len(bad)
+    assert sorted(item["block"] for item in verify["corruptions"]) == bad
+    assert sorted(item["offset"] for item in verify["corruptions"]) == [b * BLOCK for b in bad]
+
+
+def test_prepare_stops_early(directory):
+    engine = _engine(directory, "threads", read_pct=50)
+    stop = threading.Event()
+    stop.set()
+    try:
+        assert engine.prepare(stop) is False
+    finally:
+        engine.cleanup()
+
+
+def test_file_is_fitted_to_free_space(directory):
+    job = IoJob(block_size=BLOCK, file_size=1 << 50)
+    engine = IoEngine(os.path.join(directory, TEST_FILE), job, log=lambda msg: None)
+    st = os.statvfs(directory)
+    assert 0 < engine.job.file_size <= st.f_bavail * st.f_frsize
+    assert engine.job.file_size % BLOCK == 0 and engine.blocks == engine.job.file_size // BLOCK
+    assert np.asarray(engine.generations).shape == (engine.blocks,)
@@ -0,0 +1,61 @@
+"""偽の nvidia-smi (LOADPOWER_NVIDIA_SMI) で GPU 行の読み取りを確かめる (GPU も pynvml も不要)"""
+import stat
+import time
+
+import telemetry
+from telemetry import TelemetrySampler
+
+FAKE_SMI = """#!/bin/sh
+# --loop-ms を真似て 2 GPU 分の 8 項目 CSV を出し続ける
+while true; do
+    echo "0, 40, 10, 1024, 8192, 120.5, 55, 1500"
+    echo "1, 80, 20, 2048, 8192, 200.25, 60, 1600"
+    sleep 0.1
+done
+"""
+
+
+def _fake_smi(tmp_path):
+    path = tmp_path / "nvidia-smi"
+    path.write_text(FAKE_SMI)
+    path.chmod(path.stat().st_mode | stat.S_IXUSR)
+    return str(path)
+
+
+def _wait_for_gpus(sampler, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if len(sampler.latest()["gpus"]) == 2:
+            return sampler.latest()["gpus"]
+        time.sleep(0.05)
+    raise AssertionError(f"no GPU rows within {timeout} s: {sampler.latest()}")
+
+
+def test_fake_nvidia_smi_from_environment(tmp_path, monkeypatch):
+    monkeypatch.setenv("LOADPOWER_NVIDIA_SMI", _fake_smi(tmp_path))
+    monkeypatch.setattr(telemetry, "pynvml", object())   # pynvml があっても環境変数を優先する
+    sampler = TelemetrySampler(interval=0.1)
+    assert not sampler.use_nvml
+    sampler.start()
+    try:
+        gpus = _wait_for_gpus(sampler)
+        assert [g["index"] for g in gpus] == [0, 1]
+        assert gpus[1]["util"] == 80.0
+        assert gpus[1]["mem_used"] == 2048.0
+        assert sampler.gpu_power_total() == 320.75
+        assert sampler.vram_percent(0) == 12.5
+    finally:
+        sampler.stop()
+
+
+def test_missing_nvidia_smi_marks_gpu_unavailable(tmp_path):
+    sampler = TelemetrySampler(interval=0.1, nvidia_smi=str(tmp_path / "missing")).start()
+    try:
+        deadline = time.time() + 5.0
+        while sampler.gpu_available and time.time() < deadline:
+            time.sleep(0.05)
+        assert not sampler.gpu_available
+        assert sampler.latest()["gpus"] == []
+        assert sampler.gpu_power_total() is None
+    finally:
+        sampler.stop()
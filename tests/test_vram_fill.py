@@ -0,0 +1,89 @@
+"""VramFiller のスラブ確保と OOM 時の半分化を SimulatedVram で確かめる (GPU 不要)"""
+import threading
+
+import pytest
+
+from vram_fill import GiB, MiB, SimulatedVram, VramFiller
+
+
+class FragmentedVram(SimulatedVram):
+    """空きはあっても max_block より大きい連続領域は確保できない (断片化の模擬)"""
+
+    def __init__(self, total, max_block, **kwargs):
+        super().__init__(total, **kwargs)
+        self.max_block = max_block
+        self.requests = []
+
+    def allocate(self, nbytes):
+        self.requests.append(nbytes)
+        if nbytes > self.max_block:
+            self.calls["allocate"] += 1
+            self.calls["oom"] += 1
+            raise MemoryError(f"simulated fragmentation: no {nbytes} byte block")
+        return super().allocate(nbytes)
+
+
+def _usage(sim):
+    free, total = sim.mem_info()
+    return (total - free) / total * 100.0
+
+
+def test_fill_reaches_target_with_a_few_slabs():
+    sim = SimulatedVram(80 * GiB, other=3 * GiB)
+    filler = VramFiller(sim, 90)
+    err = filler.fill()
+    assert abs(err) <= 0.5
+    assert _usage(sim) == pytest.approx(90, abs=0.5)
+    assert len(filler.slabs) <= filler.slabs_up_front + 2
+    assert sim.calls["oom"] == 0
+
+
+def test_oom_halves_the_slab_until_it_fits():
+    sim = FragmentedVram(16 * GiB, max_block=1 * GiB)
+    filler = VramFiller(sim, 80)
+    err = filler.fill()
+    assert abs(err) <= 0.5
+    assert sim.calls["oom"] > 0
+    assert all(size <= sim.max_block for _, size in filler.slabs)
+    # 失敗した要求の次はちょうど半分で再試行している
+    for failed, retry in zip(sim.requests, sim.requests[1:]):
+        if failed > sim.max_block:
+            assert retry == failed // 2
+
+
+def test_gives_up_when_nothing_fits():
+    sim = FragmentedVram(16 * GiB, max_block=0)
+    filler = VramFiller(sim, 80, min_slab=64 * MiB)
+    filler.fill()
+    assert filler.slabs == []
+    assert min(sim.requests) < 64 * MiB        # 最小スラブ未満の端数も 1 回は試す
+
+
+def test_adjust_follows_other_processes():
+    sim = SimulatedVram(80 * GiB, other=3 * GiB)
+    filler = VramFiller(sim, 90)
+    filler.fill()
+    assert not filler.adjust()                 # hysteresis 内なら触らない
+    sim.other += 4 * GiB
+    assert filler.adjust()
+    assert _usage(sim) == pytest.approx(90, abs=0.5)
+    sim.other -= 6 * GiB
+    assert filler.adjust()
+    assert _usage(sim) == pytest.approx(90, abs=0.5)
+    filler.release_all()
+    assert sim.live == {} and sim.cached == 0
+
+
+def test_hold_ticks_until_stopped():
+    sim = SimulatedVram(8 * GiB)
+    filler = VramFiller(sim, 50)
+    filler.fill()
+    stop, ticks = threading.Event(), []
+
+    def tick():
+        ticks.append(1)
+        if len(ticks) == 3:
+            stop.set()
+
+    filler.hold(stop, interval=0.01, on_tick=tick)
+    assert len(ticks) == 3
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+vram_fill.py  ―  VRAM を目標使用率まで素早く埋めて保持する
+  ・最初に残り容量を数枚の大きなスラブで確保し、mem_get_info を読み直して誤差を詰める
+  ・確保に失敗したらサイズを半分にして再試行 (二分探索)、行き過ぎたら末尾のスラブを縮める
+  ・保持中は hysteresis を超えてずれたときだけ調整する (キャッシュアロケータを揺らさない)
+  ・メモリ情報と確保はプロバイダ経由: TorchVramProvider (CUDA) / SimulatedVram (GPU 無しで検証)
+"""
+
+import time
+
+MiB = 1 << 20
+GiB = 1 << 30
+
+
+class TorchVramProvider:
+    """torch.cuda の mem_get_info / 確保 / empty_cache を包む"""
+
+    def __init__(self, device, touch=True):
+        import torch
+        self.torch = torch
+        self.device = torch.device(device)
+        self.touch = touch
+
+    def mem_info(self):
+        return self.torch.cuda.mem_get_info(device=self.device)
+
+    def allocate(self, nbytes):
+        slab = self.torch.empty(nbytes, dtype=self.torch.uint8, device=self.device)
+        if self.touch:
+            slab.fill_(0xA5)     # 実際に書き込んで物理ページを確定させる
+        return slab
+
+    def release(self, slab):
+        del slab
+
+    def trim(self):
+        self.torch.cuda.empty_cache()
+
+
+class SimulatedVram:
+    """
+    mem_get_info を模したメモリ。確保は granularity に切り上げ、解放したブロックは
+    trim() (empty_cache 相当) まで使用中のまま残る。other は他プロセスの使用量 (途中で変えてよい)。
+    """
+
+    def __init__(self, total, other=0, granularity=2 * MiB, context=512 * MiB):
+        self.total = total
+        self.other = other
+        self.granularity = granularity
+        self.context = context
+        self.live = {}
+        self.cached = 0
+        self._next = 0
+        self.calls = {"allocate": 0, "oom": 0, "release": 0, "trim": 0, "mem_info": 0}
+
+    def _used(self):
+        return self.other + self.context + sum(self.live.values()) + self.cached
+
+    def mem_info(self):
+        self.calls["mem_info"] += 1
+        return max(0, self.total - self._used()), self.total
+
+    def allocate(self, nbytes):
+        self.calls["allocate"] += 1
+        size = -(-nbytes // self.granularity) * self.granularity
+        reuse = min(self.cached, size)            # キャッシュ済みブロックは再利用される
+        if self._used() - reuse + size > self.total:
+            self.calls["oom"] += 1
+            raise MemoryError(f"simulated OOM allocating {size} bytes")
+        self.cached -= reuse
+        self._next += 1
+        self.live[self._next] = size
+        return self._next
+
+    def release(self, slab):
+        self.calls["release"] += 1
+        self.cached += self.live.pop(slab)
+
+    def trim(self):
+        self.calls["trim"] += 1
+        self.cached = 0
+
+
+class VramFiller:
+    """
+    filler = VramFiller(provider, 80)
+    filler.fill()               # 目標 ± tolerance まで (通常 1 秒未満)
+    filler.hold(stop_event)     # 他プロセスの増減に合わせて必要なときだけ調整
+    filler.release_all()
+    目標は他プロセスを含めた総使用量 (total × percentage)。
+    """
+
+    def __init__(self, provider, percentage, slabs=4, tolerance=0.005, hysteresis=0.02,
+                 min_slab=64 * MiB, max_steps=32):
+        self.provider = provider
+        self.percentage = percentage
+        self.slabs_up_front = slabs
+        self.tolerance = tolerance        # fill の収束判定 (total に対する割合)
+        self.hysteresis = hysteresis      # hold で調整を始めるずれ (total に対する割合)
+        self.min_slab = min_slab
+        self.max_steps = max_steps
+        self.slabs = []                   # [(handle, nbytes)]
+        self.steps = 0
+
+    @property
+    def allocated(self):
+        return sum(size for _, size in self.slabs)
+
+    def error(self):
+        """目標 − 現在の使用量 [bytes] (正なら不足)"""
+        free, total = self.provider.mem_info()
+        return int(total * self.percentage / 100.0) - (total - free), total
+
+    def fill(self) -> float:
+        """目標まで確保し、最終的な誤差 (total に対する %) を返す"""
+        err, total = self.error()
+        if err > self.min_slab and not self.slabs:
+            # 最初の不足分は数枚の大きなスラブで一気に確保 (以降の補充は 1 枚ずつ)
+            size = err // self.slabs_up_front
+            for _ in range(self.slabs_up_front):
+                self._grow(size)
+        for self.steps in range(1, self.max_steps + 1):
+            err, total = self.error()
+            if abs(err) <= self.tolerance * total:
+                break
+            if err > 0:
+                if not self._grow(err):
+                    break                 # これ以上確保できない (他プロセスに取られた等)
+            elif self.slabs:
+                self._shrink(-err)
+            else:
+                break                     # 他プロセスだけで目標を超えている
+        return err / total * 100.0
+
+    def _grow(self, nbytes) -> bool:
+        """nbytes を 1 枚で確保。失敗したら半分にして再試行する"""
+        while nbytes >= self.min_slab or (nbytes > 0 and not self.slabs):
+            try:
+                self.slabs.append((self.provider.allocate(nbytes), nbytes))
+                return True
+            except (RuntimeError, MemoryError):
+                nbytes //= 2
+        # 最小スラブ未満の端数は 1 回だけ試す (半分にし続けると細かい断片が増える)
+        if nbytes > 0:
+            try:
+                self.slabs.append((self.provider.allocate(nbytes), nbytes))
+                return True
+            except (RuntimeError, MemoryError):
+                pass
+        return False
+
+    def _shrink(self, excess):
+        """末尾のスラブから excess だけ返す。はみ出すスラブは小さく確保し直す"""
+        while excess > 0 and self.slabs:
+            handle, size = self.slabs.pop()
+            self.provider.release(handle)
+            del handle                    # 参照が残ると empty_cache で返せない
+            if size > excess:
+                self.provider.trim()
+                self._grow(size - excess)
+                return
+            excess -= size
+        self.provider.trim()
+
+    def adjust(self) -> bool:
+        """hysteresis を超えてずれていれば fill し直す。調整したら True"""
+        err, total = self.error()
+        if abs(err) <= self.hysteresis * total:
+            return False
+        self.fill()
+        return True
+
+    def hold(self, stop_event, interval=1.0, on_adjust=None, on_tick=None):
+        while not stop_event.wait(interval):
+            if on_tick:
+                on_tick()
+            if self.adjust() and on_adjust:
+                on_adjust(self)
+
+    def release_all(self):
+        while self.slabs:
+            handle, _ = self.slabs.pop()
+            self.provider.release(handle)
+            del handle
+        self.provider.trim()
+
+
+if __name__ == "__main__":
+    # GPU 無しで収束を確認: python vram_fill.py --total 80 --other 5 --load 90
+    import argparse
+    parser = argparse.ArgumentParser(description="VRAM fill against a simulated mem_get_info")
+    parser.add_argument("--total", type=float, default=80.0, help="simulated VRAM in GiB")
+    parser.add_argument("--other", type=float, default=3.0, help="GiB used by other processes")
+    parser.add_argument("--load", type=float, default=90.0, help="target usage %%")
+    args = parser.parse_args()
+    sim = SimulatedVram(int(args.total * GiB), other=int(args.other * GiB))
+    filler = VramFiller(sim, args.load)
+    t0 = time.perf_counter()
+    err = filler.fill()
+    print(f"fill: error {err:+.3f}% in {(time.perf_counter() - t0) * 1000:.2f} ms, "
+          f"{len(filler.slabs)} slabs, {filler.steps} steps, calls {sim.calls}")
+    sim.other += 4 * GiB                 # 他プロセスが 4 GiB 使い始めた
+    filler.adjust()
+    free, total = sim.mem_info()
+    print(f"after +4 GiB elsewhere: usage {(total - free) / total * 100:.2f}%, {len(filler.slabs)} slabs, calls {sim.calls}")
+    sim.other -= 6 * GiB
+    filler.adjust()
+    free, total = sim.mem_info()
+    print(f"after -6 GiB elsewhere: usage {(total - free) / total * 100:.2f}%, {len(filler.slabs)} slabs, calls {sim.calls}")
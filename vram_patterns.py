@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+vram_patterns.py  ―  確保した VRAM スラブにパターンを書いて読み戻す整合性 + 帯域テスト
+  ・address        : (スラブ番号 × 定数 + ワード番号) × 黄金比定数 (アドレス線の短絡 / スラブをまたぐエイリアスも検出)
+  ・inversion_*    : moving inversions (p を全面に書く → 昇順で p を検証して ~p → 降順で ~p を検証して p)
+  ・walking_ones   : 1 ビットだけ立てた値 (ビット 0/8/16/24) で moving inversions (スタックビット / 隣接ビット干渉)
+比較は chunk ごとにデバイス上で行い、不一致数と最初の不一致位置をデバイス上のベクタに溜める。
+ホスト同期はパスの終わりに 1 回だけ。パスごとに読み書きの達成帯域 (GB/s) を出す。
+torch の CPU デバイスでも動く (python vram_patterns.py --device cpu --inject 3)。
+"""
+
+import time
+
+import torch
+
+MiB = 1 << 20
+ADDRESS_MULT = 0x9E3779B1            # 隣り合うワードで多くのビットが変わるように
+SLAB_MULT = 0x85EBCA6B               # スラブごとに下位 32 ビットのずらし量を変える (奇数)
+PATTERNS = ("address", "inversion_zero", "inversion_5a", "walking_ones")
+
+
+def _i32(value: int) -> int:
+    """0 〜 2^32-1 の値を int32 テンソルに書ける符号付き値にする"""
+    value &= 0xFFFFFFFF
+    return value - (1 << 32) if value >= 1 << 31 else value
+
+
+class VramPatternTest:
+    """
+    test = VramPatternTest(device)        # スクラッチ領域を先に確保 (VRAM を埋める前に作る)
+    results = test.run(filler.slabs)      # [(uint8 スラブ, nbytes)] または uint8 テンソルのリスト
+    results の各要素: {"pattern", "errors", "bad", "read_gbps", "write_gbps", "seconds"}
+    bad は不一致のあった chunk ごとの (スラブ番号, デバイスアドレス, 期待値, 実測値, chunk 内の不一致数)。
+    """
+
+    def __init__(self, device, chunk_bytes=16 * MiB, max_report=16):
+        self.device = torch.device(device)
+        self.chunk_words = chunk_bytes // 4
+        self.max_report = max_report
+        n = self.chunk_words
+        self._index = torch.empty(n, dtype=torch.int64, device=self.device)
+        self._expected = torch.empty(n, dtype=torch.int32, device=self.device)
+        self._mask = torch.empty(n, dtype=torch.bool, device=self.device)
+        self.chunks = []
+
+    # ── chunk 分割 ──
+    def _split(self, slabs):
+        """スラブを int32 の chunk ビューに分ける: [(スラブ番号, 先頭ワード, ビュー)]"""
+        chunks = []
+        for s, slab in enumerate(slabs):
+            tensor = slab[0] if isinstance(slab, tuple) else slab
+            words = tensor[: tensor.numel() // 4 * 4].view(torch.int32)
+            for start in range(0, words.numel(), self.chunk_words):
+                chunks.append((s, start, words[start:start + self.chunk_words]))
+        return chunks
+
+    def _sync(self):
+        if self.device.type == "cuda":
+            torch.cuda.synchronize(self.device)
+
+    # ── 比較 (デバイス上で集計) ──
+    def _expected_address(self, slab, start, n, seed):
+        idx = self._index[:n]
+        torch.arange(start, start + n, out=idx)
+        idx.add_(slab * SLAB_MULT).mul_(ADDRESS_MULT).bitwise_xor_(seed).bitwise_and_(0xFFFFFFFF)
+        exp = self._expected[:n]
+        exp.copy_(idx)                   # int64 → int32 は下位 32 ビット
+        return exp
+
+    def _check(self, i, view, expected):
+        mask = torch.ne(view, expected, out=self._mask[:view.numel()])
+        self._errors[i] = mask.sum()
+        first = mask.view(torch.uint8).argmax()
+        self._first[i] = first
+        self._actual[i] = view[first]
+
+    def _begin(self):
+        n = len(self.chunks)
+        self._errors = torch.zeros(n, dtype=torch.int64, device=self.device)
+        self._first = torch.zeros(n, dtype=torch.int64, device=self.device)
+        self._actual = torch.zeros(n, dtype=torch.int32, device=self.device)
+        self._sync()
+        return time.perf_counter()
+
+    def _finish(self, pattern, t0, read_bytes, write_bytes, expected_of):
+        self._sync()
+        seconds = max(1e-9, time.perf_counter() - t0)
+        errors = self._errors.cpu()
+        bad = []
+        for i in torch.nonzero(errors).flatten().tolist()[: self.max_report]:
+            slab, start, view = self.chunks[i]
+            first = int(self._first[i])
+            address = view.data_ptr() + first * 4
+            bad.append((slab, address, f"0x{expected_of(i, start + first) & 0xFFFFFFFF:08x}",
+                        f"0x{int(self._actual[i]) & 0xFFFFFFFF:08x}", int(errors[i])))
+        return {"pattern": pattern, "errors": int(errors.sum()), "bad": bad, "seconds": seconds,
+                "read_gbps": read_bytes / seconds / 1e9, "write_gbps": write_bytes / seconds / 1e9}
+
+    # ── パターン ──
+    def address_pass(self, seed=0):
+        """アドレス依存の値を書いてから全 chunk を検証する"""
+        total = sum(v.numel() for _, _, v in self.chunks) * 4
+        t0 = self._begin()
+        for slab, start, view in self.chunks:
+            view.copy_(self._expected_address(slab, start, view.numel(), seed))
+        for i, (slab, start, view) in enumerate(self.chunks):
+            self._check(i, view, self._expected_address(slab, start, view.numel(), seed))
+
+        def expected_of(i, word):
+            slab = self.chunks[i][0]
+            return ((slab * SLAB_MULT + word) * ADDRESS_MULT ^ seed) & 0xFFFFFFFF
+        return self._finish("address" if not seed else f"address^{seed:#x}", t0, total, total, expected_of)
+
+    def inversion_pass(self, pattern, name):
+        """moving inversions: 全面に p → 昇順で p を検証して ~p → 降順で ~p を検証して p"""
+        p, q = _i32(pattern), _i32(~pattern)
+        total = sum(v.numel() for _, _, v in self.chunks) * 4
+        t0 = self._begin()
+        for _, _, view in self.chunks:
+            view.fill_(p)
+        for i, (_, _, view) in enumerate(self.chunks):
+            self._check(i, view, p)
+            view.fill_(q)
+        up = self._errors.clone(), self._first.clone(), self._actual.clone()
+        for i in range(len(self.chunks) - 1, -1, -1):
+            view = self.chunks[i][2]
+            self._check(i, view, q)
+            view.fill_(p)
+        # 昇順で見つかったものを優先して報告 (どちらの向きでも不一致数は合算)
+        down_errors = self._errors
+        self._errors = up[0] + down_errors
+        hit_up = up[0] > 0
+        self._first = torch.where(hit_up, up[1], self._first)
+        self._actual = torch.where(hit_up, up[2], self._actual)
+        up_hits = up[0].cpu()
+
+        def expected_of(i, word):
+            return p if up_hits[i] else q
+        return self._finish(name, t0, 2 * total, 3 * total, expected_of)
+
+    def run(self, slabs, patterns=PATTERNS, stop_event=None, log=None, on_pass=None) -> list[dict]:
+        """patterns を順に実行する。on_pass(result) はパスが終わるたびに呼ぶ"""
+        self.chunks = self._split(slabs)
+        results = []
+        for name in patterns:
+            if stop_event is not None and stop_event.is_set():
+                break
+            if name == "address":
+                passes = [lambda: self.address_pass(0), lambda: self.address_pass(0xFFFFFFFF)]
+            elif name == "inversion_zero":
+                passes = [lambda: self.inversion_pass(0x00000000, "inversion_zero")]
+            elif name == "inversion_5a":
+                passes = [lambda: self.inversion_pass(0x55555555, "inversion_5a")]
+            elif name == "walking_ones":
+                passes = [lambda bit=bit: self.inversion_pass(1 << bit, f"walking_ones[{bit}]") for bit in range(0, 32, 8)]
+            else:
+                raise ValueError(f"unknown VRAM pattern: {name!r} (choose from {', '.join(PATTERNS)})")
+            for run_pass in passes:
+                if stop_event is not None and stop_event.is_set():
+                    break
+                result = run_pass()
+                results.append(result)
+                if on_pass:
+                    on_pass(result)
+                if log:
+                    log(format_result(result))
+        return results
+
+
+def format_result(result) -> str:
+    line = (f"{result['pattern']:18s} errors {result['errors']:>8d}  "
+            f"read {result['read_gbps']:8.2f} GB/s  write {result['write_gbps']:8.2f} GB/s")
+    for slab, address, expected, actual, count in result["bad"]:
+        line += f"\n    slab {slab} address 0x{address:x}: expected {expected} got {actual} ({count} in chunk)"
+    return line
+
+
+if __name__ == "__main__":
+    # GPU 無しでも CPU デバイスで動作確認: --inject N で書き込み後にワードを壊して検出を確かめる
+    import argparse
+    import threading
+    parser = argparse.ArgumentParser(description="VRAM pattern test")
+    parser.add_argument("--device", default="cuda:0" if torch.cuda.is_available() else "cpu")
+    parser.add_argument("--mib", type=int, default=256, help="MiB to test (split into 4 slabs)")
+    parser.add_argument("--inject", type=int, default=0, help="corrupt this many words after each write")
+    args = parser.parse_args()
+    test = VramPatternTest(args.device)
+    slabs = [torch.empty(args.mib * MiB // 4, dtype=torch.uint8, device=args.device) for _ in range(4)]
+    if args.inject:
+        # 書き込みの後、検証の直前にランダムな chunk の 1 ワードを壊す
+        check = test._check
+        gen = torch.Generator().manual_seed(1)
+
+        def corrupting_check(i, view, expected):
+            if int(torch.randint(0, len(test.chunks), (1,), generator=gen)) < args.inject:
+                view[int(torch.randint(0, view.numel(), (1,), generator=gen))] ^= 0x10
+            check(i, view, expected)
+        test._check = corrupting_check
+    results = test.run(slabs, stop_event=threading.Event(), log=print)
+    print(f"total errors: {sum(r['errors'] for r in results)}")